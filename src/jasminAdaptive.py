@@ -0,0 +1,259 @@
+"""
+
+    Feedback driven adaptive weights for the grammar distributions.
+
+    The probabilities in jasminDistribution are hand tuned constants. In adaptive mode the fuzzer reports after every
+    program whether it was rewarding (it hit a new error bucket or was not safe) and AdaptiveWeights moves probability
+    mass towards the productions that occurred in rewarding programs.
+
+    The update is a multiplicative bandit step per table: every enabled production is scaled by
+    exp(learning_rate * (reward - baseline) * (drawn - expected) / draws), where the baseline is a running average of
+    the reward, drawn is how often the program drew the production, draws how often it drew from the table and
+    expected = draws * the probability it was drawn with, and the table is renormalised. A production drawn more often
+    than its weights predict gains mass in a rewarding program, one drawn less often loses it, so the weights move
+    even when a program used every production of a table. Tables without a draw in the program are left as they
+    are. The stored weights are never
+    mixed: only the tables a generator is built with are mixed with the uniform distribution over their enabled
+    productions (exploration) so no production starves. Productions that are disabled in the hand tuned tables
+    (probability 0) stay disabled.
+
+    The learned weights are saved as JSON. Every update is appended to a JSON lines log with the seed, the reward and
+    the hash of the (mixed) weights the program was generated with; every distinct set of weights is logged once as a
+    snapshot, so any program of a run can be regenerated with JasminGenerator(seed, weights=snapshot(hash)).
+
+
+    Usage:
+
+        python jasminAdaptive.py <weights.json>
+
+            - print the learned weights next to the hand tuned ones
+
+"""
+
+import hashlib
+import json
+import math
+import os
+import sys
+
+import jasminGenerator as JPG
+
+
+"""
+
+    The tables that are learned, distribution name -> encoded table names
+
+"""
+
+LEARNED_TABLES = {
+
+    "Instructions"  : ["JN.Pinstr", "JN.Peqop"],
+    "Expressions"   : ["JN.Pexpr", "artemtic", "compare"],
+    "Types"         : ["JN.Ptype", "JN.Utype"]
+
+}
+
+
+def weights_hash(weights):
+
+    return hashlib.sha1(json.dumps(weights, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def initial_weights():
+
+    """
+
+        The hand tuned probabilities of the learned tables, in the encoded form JasminGenerator takes
+
+    """
+
+    generator = JPG.JasminGenerator(0)
+    weights   = {}
+
+    for name, table_names in LEARNED_TABLES.items():
+
+        tables = generator.distributions[name].tables()
+        weights[name] = {}
+
+        for table_name in table_names:
+
+            weights[name][table_name] = {JPG.JD.encode_key(key): value for key, value in tables[table_name][1].items()}
+
+    return weights
+
+
+class AdaptiveWeights:
+
+    def __init__(self, path=None, log_path=None, learning_rate=0.1, exploration=0.05, baseline_decay=0.99):
+
+        self.path           = path
+        self.log_path       = log_path
+        self.learning_rate  = learning_rate
+        self.exploration    = exploration
+        self.baseline_decay = baseline_decay
+        self.baseline       = 0.0
+        self.updates        = 0
+        self.weights        = initial_weights()
+        self.logged         = set()
+
+        if path is not None and os.path.exists(path):
+
+            with open(path, "r") as file:
+                state = json.load(file)
+
+            self.weights  = state["weights"]
+            self.baseline = state["baseline"]
+            self.updates  = state["updates"]
+
+    def explored(self):
+
+        """
+
+            The weights a generator is built with: every table mixed with the uniform distribution over its enabled
+            productions
+
+        """
+
+        explored = {}
+
+        for name, tables in self.weights.items():
+
+            explored[name] = {}
+
+            for table_name, table in tables.items():
+
+                enabled = [x for x in table if table[x] > 0]
+                total   = sum(table[x] for x in enabled)
+
+                explored[name][table_name] = {x: ((1 - self.exploration) * table[x] / total
+                                                  + self.exploration / len(enabled)) if table[x] > 0 else table[x]
+                                              for x in table}
+
+        return explored
+
+    def hash(self):
+
+        return weights_hash(self.explored())
+
+    def generator(self, seed, **kwargs):
+
+        return JPG.JasminGenerator(seed, weights=self.explored(), **kwargs)
+
+    def update(self, seed, generator, reward):
+
+        """
+
+            Reward (0 or 1) the productions the generator used for the program of seed
+
+        """
+
+        snapshot  = self.explored()
+        used_hash = weights_hash(snapshot)
+        advantage = reward - self.baseline
+        drawn     = {}
+
+        for production in generator.productions():
+
+            drawn[production] = drawn.get(production, 0) + 1
+
+        for name, tables in self.weights.items():
+
+            for table_name, table in tables.items():
+
+                enabled = [x for x in table if table[x] > 0]
+                draws   = sum(drawn.get((name, table_name, x), 0) for x in enabled)
+
+                if draws == 0:
+
+                    continue
+
+                for production in enabled:
+
+                    expected = draws * snapshot[name][table_name][production]
+                    surprise = (drawn.get((name, table_name, production), 0) - expected) / draws
+
+                    table[production] *= math.exp(self.learning_rate * advantage * surprise)
+
+                self.normalise(table)
+
+        self.baseline = self.baseline_decay * self.baseline + (1 - self.baseline_decay) * reward
+        self.updates += 1
+
+        self.log(seed, reward, used_hash, snapshot)
+
+    def normalise(self, table):
+
+        enabled = [x for x in table if table[x] > 0]
+        total   = sum(table[x] for x in enabled)
+
+        for production in enabled:
+
+            table[production] = table[production] / total
+
+    def log(self, seed, reward, used_hash, weights):
+
+        if self.log_path is None:
+
+            return
+
+        with open(self.log_path, "a") as file:
+
+            if used_hash not in self.logged:
+
+                file.write(json.dumps({"snapshot": used_hash, "weights": weights}) + "\n")
+                self.logged.add(used_hash)
+
+            file.write(json.dumps({"seed": seed, "reward": reward, "weights": used_hash}) + "\n")
+
+    def save(self):
+
+        tmp = self.path + ".tmp"
+
+        with open(tmp, "w") as file:
+            json.dump({"version": 1, "weights": self.weights, "baseline": self.baseline, "updates": self.updates},
+                      file, indent=1, sort_keys=True)
+
+        os.replace(tmp, self.path)
+
+
+def snapshot(log_path, snapshot_hash):
+
+    """
+
+        The weights with the given hash from a log, to regenerate a program of an adaptive run
+
+    """
+
+    with open(log_path, "r") as file:
+
+        for line in file:
+
+            entry = json.loads(line)
+
+            if entry.get("snapshot") == snapshot_hash:
+
+                return entry["weights"]
+
+    raise KeyError(snapshot_hash)
+
+
+def main():
+
+    learned = AdaptiveWeights(sys.argv[1])
+    initial = initial_weights()
+
+    print("UPDATES:", learned.updates, "BASELINE:", round(learned.baseline, 4), "HASH:", learned.hash())
+
+    for name, tables in learned.weights.items():
+
+        for table_name, table in tables.items():
+
+            print(name, table_name)
+
+            for production, value in table.items():
+
+                print("    %-12s %.4f  (hand tuned %.4f)" % (production, value, initial[name][table_name][production]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,481 @@
+"""
+
+    Campaign statistics over all result shards.
+
+    The statistics of the analysis notebook (safe ratio, error class frequencies, generation and safety check time
+    distributions against the program size, the Slowest - Fastest spread of the timing runs) computed with vectorised
+    pandas and NumPy over the columnar shards of jasminColumnar and the timing CSVs.
+
+    Every shard is reduced to a partial aggregate of counts, sums, minima, maxima and fixed bin histograms, which
+    merge by addition. The partial aggregates are cached by shard and modification time, so after a new campaign only
+    its shard is read and the summary of everything else comes from the cache.
+
+    Shards can overlap (results_0_100 and a later results_0_5000 rerun of the same seeds), a program (seed and
+    config) is counted in the newest shard that has it only. A shard's aggregate leaves out the programs of the newer
+    shards whose seed range overlaps its own, and is cached with their modification times too.
+
+
+    Methods:
+
+        aggregate_programs / aggregate_timing:
+
+            - the partial aggregate of one result shard / one timing CSV
+
+        Analysis.update / summary / markdown:
+
+            - bring the cached aggregates up to date, merge them and report
+
+
+    Usage:
+
+        python jasminAnalysis.py <columnar_dir> [results_*.csv | time_measure_results_*.csv ...] [--json <path>]
+                                 [--markdown <path>]
+
+            - export new result CSVs into columnar_dir, update the cache and print the Markdown summary
+
+"""
+
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+import jasminColumnar as JC
+
+
+SIZE_BINS   = [0, 128, 256, 512, 1024, 2048, 4096, 8192, 16384]
+TIME_BINS   = list(np.logspace(-6, 2, 33))
+CACHE_FILE  = "analysis_cache.json"
+VERSION     = 4
+RANGE_RE    = re.compile(r"_(\d+)_(\d+)$")
+
+
+def distribution(values, bins):
+
+    """
+
+        count, sum, min, max and histogram (last bin open ended) of the finite values
+
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+
+    if len(values) == 0:
+
+        return {"count": 0, "sum": 0.0, "min": None, "max": None, "hist": [0] * len(bins)}
+
+    hist = np.bincount(np.clip(np.searchsorted(bins, values, side="right") - 1, 0, len(bins) - 1),
+                       minlength=len(bins))
+
+    return {"count": int(len(values)), "sum": float(values.sum()), "min": float(values.min()),
+            "max": float(values.max()), "hist": hist.tolist()}
+
+
+def merge(left, right):
+
+    """
+
+        Merge two partial aggregates, counts and histograms add up, min and max combine
+
+    """
+
+    if left is None:
+
+        return right
+
+    result = dict(left)
+
+    for key, value in right.items():
+
+        if key not in result or result[key] is None:
+
+            result[key] = value
+
+        elif value is None:
+
+            continue
+
+        elif key == "min":
+
+            result[key] = min(result[key], value)
+
+        elif key == "max":
+
+            result[key] = max(result[key], value)
+
+        elif isinstance(value, dict):
+
+            result[key] = merge(result[key], value)
+
+        elif isinstance(value, list):
+
+            result[key] = [x + y for x, y in zip(result[key], value)]
+
+        else:
+
+            result[key] = result[key] + value
+
+    return result
+
+
+def overlap(left, right):
+
+    """
+
+        Whether the seed ranges in two shard names (results_<start>_<end>) overlap, shards without a range might
+
+    """
+
+    left, right = RANGE_RE.search(left), RANGE_RE.search(right)
+
+    if left is None or right is None:
+
+        return True
+
+    return int(left.group(1)) < int(right.group(2)) and int(right.group(1)) < int(left.group(2))
+
+
+def without(frame, covered):
+
+    merged = frame.merge(covered, on=["seed", "config"], how="left", indicator=True)
+
+    return merged.loc[merged["_merge"] == "left_only"].drop(columns="_merge")
+
+
+def aggregate_programs(programs, errors, covered=None):
+
+    """
+
+        The partial aggregate of one shard, programs and errors as loaded by jasminColumnar. The programs in covered
+        (a seed and config DataFrame) are counted by another shard and left out.
+
+    """
+
+    import pandas as pd
+
+    programs    = pd.DataFrame(programs)
+    errors      = pd.DataFrame(errors)
+
+    if covered is not None and len(covered) > 0:
+
+        programs = without(programs, covered).reset_index(drop=True)
+        errors   = without(errors, covered).reset_index(drop=True)
+
+    # A program is truly safe (the notebook's secure programs) when it is safe and only hit warnings
+    not_warning = errors.loc[errors["signature"] != "warning", ["seed", "config"]].drop_duplicates()
+    failing     = programs.merge(not_warning, on=["seed", "config"], how="left", indicator=True)["_merge"] == "both"
+
+    size_bin    = np.clip(np.searchsorted(SIZE_BINS, programs["size"].to_numpy(), side="right") - 1, 0,
+                          len(SIZE_BINS) - 1)
+    by_size     = programs.assign(size_bin=size_bin).groupby("size_bin").agg(
+                      count=("seed", "size"), safe=("safe", "sum"), checked=("safety_checked", "sum"),
+                      generation_time=("generation_time", "sum"),
+                      safety_check_time=("safety_check_time", "sum")).reindex(range(len(SIZE_BINS)), fill_value=0)
+
+    # An error row is one bucket of a program, a program that hit a class in several buckets counts once
+    classes     = errors.drop_duplicates(["seed", "config", "stage", "signature"])
+    signatures  = classes.groupby(["stage", "signature"]).size()
+
+    return {
+        "programs"          : int(len(programs)),
+        "safe"              : int(programs["safe"].sum()),
+        "safety_checked"    : int(programs["safety_checked"].sum()),
+        "clean"             : int((programs["safe"] & (programs["compile_errors"] == 0)
+                                   & (programs["safety_errors"] == 0)).sum()),
+        "truly_safe"        : int((programs["safe"].to_numpy() & ~failing.to_numpy()).sum()),
+        "no_compile_errors" : int((programs["compile_errors"] == 0).sum()),
+        "no_safety_errors"  : int((programs["safety_errors"] == 0).sum()),
+        "size"              : distribution(programs["size"], SIZE_BINS),
+        "generation_time"   : distribution(programs["generation_time"], TIME_BINS),
+        "safety_check_time" : distribution(programs["safety_check_time"], TIME_BINS),
+        "compile_time"      : distribution(programs["compile_time"], TIME_BINS),
+        "by_size"           : {x: [float(v) for v in by_size[x]] for x in by_size.columns},
+        "signatures"        : {x[0] + "|" + x[1]: int(v) for x, v in signatures.items()},
+        "buckets"           : {x: int(v) for x, v in errors.groupby("bucket").size().items()}
+    }
+
+
+def aggregate_timing(csv_path):
+
+    """
+
+        The partial aggregate of one timing CSV, its last row lists the seeds that timed out
+
+    """
+
+    import pandas as pd
+
+    runs     = pd.read_csv(csv_path, dtype=str)
+    timeouts = runs["Seed"].str.startswith("[")
+    runs_ok  = runs.loc[~timeouts]
+    fastest  = pd.to_numeric(runs_ok["Fastest"], errors="coerce")
+    slowest  = pd.to_numeric(runs_ok["Slowest"], errors="coerce")
+
+    timed_out = sum(len(json.loads(x)) for x in runs.loc[timeouts, "Seed"])
+
+    return {"timing": {
+        "runs"              : int(len(runs_ok)),
+        "timed_out"         : int(timed_out),
+        "fastest"           : distribution(fastest, TIME_BINS),
+        "slowest"           : distribution(slowest, TIME_BINS),
+        "spread"            : distribution(slowest - fastest, TIME_BINS),
+        "total_running_time": distribution(pd.to_numeric(runs_ok["Total_running_time"], errors="coerce"), TIME_BINS)
+    }}
+
+
+def mean(distribution):
+
+    return None if distribution["count"] == 0 else distribution["sum"] / distribution["count"]
+
+
+class Analysis:
+
+    def __init__(self, columnar_dir):
+
+        self.columnar_dir = columnar_dir
+        self.cache_path   = os.path.join(columnar_dir, CACHE_FILE)
+        self.cache        = {}
+        self.updated      = []
+
+        if os.path.exists(self.cache_path):
+
+            with open(self.cache_path, "r") as file:
+                cache = json.load(file)
+
+            if cache.get("version") == VERSION:
+
+                self.cache = cache["shards"]
+
+    def shard_mtime(self, name):
+
+        paths = list(JC.shard_paths(self.columnar_dir, name, True).values())
+
+        if not os.path.exists(paths[0]):
+
+            paths = list(JC.shard_paths(self.columnar_dir, name, False).values())
+
+        return max(os.path.getmtime(x) for x in paths)
+
+    def aggregate_shard(self, name, newer):
+
+        import pandas as pd
+
+        covered = [pd.DataFrame({x: JC.load_shard(self.columnar_dir, shard, "programs")[x] for x in ["seed", "config"]})
+                   for shard in newer]
+
+        return aggregate_programs(JC.load_shard(self.columnar_dir, name, "programs"),
+                                  JC.load_shard(self.columnar_dir, name, "errors"),
+                                  pd.concat(covered, ignore_index=True).drop_duplicates() if covered else None)
+
+    def update(self, timing_csvs=()):
+
+        """
+
+            Aggregate the shards and timing CSVs that are new or changed since they were cached
+
+        """
+
+        self.updated = []
+        current      = {}
+
+        names        = JC.shards(self.columnar_dir)
+        mtimes       = {x: self.shard_mtime(x) for x in names}
+
+        for name in names:
+
+            newer = [x for x in names if (mtimes[x], x) > (mtimes[name], name) and overlap(x, name)]
+
+            current["results/" + name] = ([mtimes[name]] + [[x, mtimes[x]] for x in newer],
+                                          lambda name=name, newer=newer: self.aggregate_shard(name, newer))
+
+        for path in timing_csvs:
+
+            current["timing/" + os.path.basename(path)] = ([os.path.getmtime(path)],
+                                                           lambda path=path: aggregate_timing(path))
+
+        for key, (stamp, compute) in current.items():
+
+            if key not in self.cache or self.cache[key]["stamp"] != stamp:
+
+                self.cache[key] = {"stamp": stamp, "aggregate": compute()}
+                self.updated.append(key)
+
+        # Shards that disappeared are dropped, timing files are only kept while they are passed
+        for key in list(self.cache):
+
+            if key.startswith("results/") and key not in current:
+
+                del self.cache[key]
+
+        if len(self.updated) > 0:
+
+            with open(self.cache_path + ".tmp", "w") as file:
+                json.dump({"version": VERSION, "shards": self.cache}, file)
+
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    def total(self):
+
+        result = None
+
+        for key in sorted(self.cache):
+
+            result = merge(result, self.cache[key]["aggregate"])
+
+        return result or {}
+
+    def summary(self):
+
+        total   = self.total()
+        summary = {"shards": sorted(self.cache)}
+
+        if "programs" in total:
+
+            programs = total["programs"]
+
+            summary.update({
+                "programs"          : programs,
+                "safe"              : total["safe"],
+                "safety_checked"    : total["safety_checked"],
+                "safe_ratio"        : total["safe"] / total["safety_checked"] if total["safety_checked"] else None,
+                "clean"             : total["clean"],
+                "truly_safe"        : total["truly_safe"],
+                "no_compile_errors" : total["no_compile_errors"],
+                "no_safety_errors"  : total["no_safety_errors"],
+                "error_classes"     : {x: {"programs": v, "frequency": v / programs}
+                                       for x, v in sorted(total["signatures"].items(), key=lambda x: -x[1])},
+                "buckets"           : len(total["buckets"])
+            })
+
+            for column in ["size", "generation_time", "safety_check_time", "compile_time"]:
+
+                summary[column] = {"min": total[column]["min"], "max": total[column]["max"],
+                                   "mean": mean(total[column]), "count": total[column]["count"],
+                                   "hist": total[column]["hist"]}
+
+            by_size = total["by_size"]
+
+            summary["by_size"] = [{"size_from": SIZE_BINS[i], "programs": int(by_size["count"][i]),
+                                   "safe_ratio": by_size["safe"][i] / by_size["checked"][i]
+                                   if by_size["checked"][i] > 0 else None,
+                                   "mean_generation_time": by_size["generation_time"][i] / by_size["count"][i],
+                                   "mean_safety_check_time": by_size["safety_check_time"][i] / by_size["checked"][i]
+                                   if by_size["checked"][i] > 0 else None}
+                                  for i in range(len(SIZE_BINS)) if by_size["count"][i] > 0]
+
+        if "timing" in total:
+
+            timing = total["timing"]
+
+            summary["timing"] = {"runs": timing["runs"], "timed_out": timing["timed_out"]}
+
+            for column in ["fastest", "slowest", "spread", "total_running_time"]:
+
+                summary["timing"][column] = {"min": timing[column]["min"], "max": timing[column]["max"],
+                                             "mean": mean(timing[column])}
+
+        return summary
+
+    def markdown(self, summary=None):
+
+        summary = self.summary() if summary is None else summary
+        lines   = ["# Campaign summary", "", "Shards: " + str(len(summary["shards"])), ""]
+
+        def number(value):
+
+            return "-" if value is None else ("%.6g" % value if isinstance(value, float) else str(value))
+
+        if "programs" in summary:
+
+            lines += ["| Programs | Safety checked | Safe | Safe ratio | Clean | Truly safe | No compile errors "
+                      "| No safety errors | Buckets |",
+                      "|---|---|---|---|---|---|---|---|---|",
+                      "| " + " | ".join(number(summary[x]) for x in ["programs", "safety_checked", "safe", "safe_ratio",
+                                                                      "clean",
+                                                                      "truly_safe", "no_compile_errors",
+                                                                      "no_safety_errors", "buckets"]) + " |", ""]
+
+            lines += ["| Column | Min | Mean | Max |", "|---|---|---|---|"]
+
+            for column in ["size", "generation_time", "safety_check_time", "compile_time"]:
+
+                lines.append("| " + column + " | " + " | ".join(number(summary[column][x])
+                                                                 for x in ["min", "mean", "max"]) + " |")
+
+            lines += ["", "| Error class | Programs | Frequency |", "|---|---|---|"]
+
+            for name, value in summary["error_classes"].items():
+
+                lines.append("| " + name.replace("|", ": ") + " | " + str(value["programs"]) + " | "
+                             + number(value["frequency"]) + " |")
+
+            lines += ["", "| Size from | Programs | Safe ratio | Mean generation time | Mean safety check time |",
+                      "|---|---|---|---|---|"]
+
+            for row in summary["by_size"]:
+
+                lines.append("| " + " | ".join(number(row[x]) for x in ["size_from", "programs", "safe_ratio",
+                                                                         "mean_generation_time",
+                                                                         "mean_safety_check_time"]) + " |")
+
+        if "timing" in summary:
+
+            timing = summary["timing"]
+
+            lines += ["", "Timing runs: " + str(timing["runs"]) + ", timed out: " + str(timing["timed_out"]), "",
+                      "| Column | Min | Mean | Max |", "|---|---|---|---|"]
+
+            for column in ["fastest", "slowest", "spread", "total_running_time"]:
+
+                lines.append("| " + column + " | " + " | ".join(number(timing[column][x])
+                                                                 for x in ["min", "mean", "max"]) + " |")
+
+        return "\n".join(lines) + "\n"
+
+
+def main():
+
+    args          = sys.argv[1:]
+    json_path     = None
+    markdown_path = None
+
+    if "--json" in args:
+
+        json_path = args[args.index("--json") + 1]
+        del args[args.index("--json"):args.index("--json") + 2]
+
+    if "--markdown" in args:
+
+        markdown_path = args[args.index("--markdown") + 1]
+        del args[args.index("--markdown"):args.index("--markdown") + 2]
+
+    columnar_dir = args[0]
+    timing_csvs  = [x for x in args[1:] if os.path.basename(x).startswith("time_measure_results")]
+    result_csvs  = [x for x in args[1:] if x not in timing_csvs]
+
+    JC.export(result_csvs, columnar_dir)
+
+    analysis = Analysis(columnar_dir)
+    analysis.update(timing_csvs)
+    summary  = analysis.summary()
+    markdown = analysis.markdown(summary)
+
+    if json_path is not None:
+
+        with open(json_path, "w") as file:
+            json.dump(summary, file, indent=1)
+
+    if markdown_path is not None:
+
+        with open(markdown_path, "w") as file:
+            file.write(markdown)
+
+    print(markdown)
+    print("UPDATED:", ", ".join(analysis.updated) or "nothing", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+"""
+
+    Compiler backends: the jasminc and gcc runs behind one interface.
+
+    The fuzzer, the reducer and the differential mode compile through a Backend, so they can run against something
+    other than a local jasminc:
+
+        start_compile       - jasminc <source> -o <assembly>, returns a process (communicate, kill, returncode)
+        start_checksafety   - jasminc <source> -checksafety, returns a process
+        assemble            - link the assembly with a harness (see jasminHarness.build)
+        run                 - run a linked binary on a NumPy array of inputs, returns a jasminHarness.BatchResult
+
+    JasminBackend runs the real tools. SimulatedBackend needs no toolchain, it replays the result CSVs of earlier
+    campaigns: a program whose seed (from the "// Program seed" header) was recorded gets the recorded stderr lines and
+    safety verdict of that seed, any other program those of a recorded seed picked by a hash of the program, so a
+    campaign over new seeds draws its outcomes from the recorded ones. The processes sleep for the recorded latency:
+    the SafetyCheckTime of the row for the safety check and the CompileTime (or compile_share times the
+    SafetyCheckTime in CSVs without it) for the compiler, multiplied by latency_scale and cut at max_latency. The
+    sleeps release the GIL like a subprocess, so the parallel schedulers and the pipeline can be load tested offline.
+    The simulated assembly is the Jasmin source itself, which run executes with jasminInterpreter.
+
+    The timing runs (time_measuring/jasminTimemeasure) do not use a Backend: they time real binaries with their own
+    timing harness, so they always run the jasminc at compiler_path and gcc.
+
+    The backend is the "backend" key of the configuration (see jasminConfig), null for jasminc at compiler_path or
+
+        {
+            "type"          : "simulated",
+            "recordings"    : ["evaluation/data/results_0_5000.csv", ...],
+            "latency_scale" : 0.1,
+            "max_latency"   : 30,
+            "compile_share" : 0.5
+        }
+
+
+    Methods:
+
+        get_backend:
+
+            - a Backend from a jasminc path or a Backend
+
+        from_config:
+
+            - the Backend of a configuration
+
+        Recording.summary:
+
+            - the outcomes and latency distribution of a set of result CSVs
+
+
+    Usage:
+
+        python jasminBackend.py <results_*.csv> ...
+
+"""
+
+import abc
+import ast
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import jasminBuckets as JB
+import jasminConfig as JCF
+import jasminHarness as JH
+
+
+SEED_RE     = re.compile(r"^// Program seed: (-?\d+)", re.MULTILINE)
+
+SIMULATED   = "// Simulated assembly\n"
+
+
+class Backend(abc.ABC):
+
+    @abc.abstractmethod
+    def start_compile(self, source_file, assembly_file, pass_fds=(), flags=()):
+
+        pass
+
+    @abc.abstractmethod
+    def start_checksafety(self, source_file, pass_fds=(), flags=()):
+
+        pass
+
+    @abc.abstractmethod
+    def assemble(self, assembly_file, binary_file, function_name="f0", harness=JH.BATCH_MAIN):
+
+        pass
+
+    @abc.abstractmethod
+    def run(self, binary_file, inputs, timeout=None):
+
+        pass
+
+    def compile(self, source_file, assembly_file, pass_fds=(), flags=()):
+
+        """
+
+            Compile and wait, returns the return code and stderr
+
+        """
+
+        process   = self.start_compile(source_file, assembly_file, pass_fds, flags)
+        _, stderr = process.communicate()
+
+        return process.returncode, stderr.decode("utf-8")
+
+    def checksafety(self, source_file, pass_fds=(), flags=()):
+
+        _, stderr = self.start_checksafety(source_file, pass_fds, flags).communicate()
+
+        return stderr.decode("utf-8")
+
+
+class JasminBackend(Backend):
+
+    def __init__(self, compiler_path="jasminc"):
+
+        self.compiler_path = compiler_path
+
+    def start_compile(self, source_file, assembly_file, pass_fds=(), flags=()):
+
+        return subprocess.Popen([self.compiler_path, source_file, "-o", assembly_file] + list(flags),
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                pass_fds=pass_fds)
+
+    def start_checksafety(self, source_file, pass_fds=(), flags=()):
+
+        return subprocess.Popen([self.compiler_path, source_file, "-checksafety"] + list(flags),
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                pass_fds=pass_fds)
+
+    def assemble(self, assembly_file, binary_file, function_name="f0", harness=JH.BATCH_MAIN):
+
+        JH.build(assembly_file, binary_file, function_name, harness)
+
+    def run(self, binary_file, inputs, timeout=None):
+
+        return JH.run(binary_file, inputs, timeout)
+
+
+class SimulatedProcess:
+
+    """
+
+        A finished process that takes delay seconds to finish, communicate sleeps until then unless it is killed
+
+    """
+
+    def __init__(self, stderr, delay, returncode):
+
+        self.stderr     = stderr.encode("utf-8")
+        self.deadline   = time.time() + delay
+        self.exit_code  = returncode
+        self.returncode = None
+        self.killed     = threading.Event()
+
+    def communicate(self, timeout=None):
+
+        self.killed.wait(max(self.deadline - time.time(), 0))
+
+        if self.killed.is_set():
+
+            self.returncode = -9
+
+            return b"", b""
+
+        self.returncode = self.exit_code
+
+        return b"", self.stderr
+
+    def wait(self, timeout=None):
+
+        self.communicate()
+
+        return self.returncode
+
+    def poll(self):
+
+        if self.killed.is_set() or time.time() >= self.deadline:
+
+            return self.wait()
+
+        return None
+
+    def kill(self):
+
+        self.killed.set()
+
+
+class Recording:
+
+    """
+
+        The rows of result CSVs: seed -> (compile lines, safety lines, safe, compile time, safety check time)
+
+    """
+
+    def __init__(self, paths, compile_share=0.5):
+
+        import pandas as pd
+
+        self.rows  = {}
+        self.seeds = []
+
+        for path in paths:
+
+            results = pd.read_csv(path)
+
+            if "Errors" not in results:
+
+                continue
+
+            compile_times = results["CompileTime"] if "CompileTime" in results else [None] * len(results)
+
+            for seed, errors, safe, safety_check_time, compile_time in zip(results["Seed"], results["Errors"],
+                                                                             results["Safe"],
+                                                                             results["SafetyCheckTime"],
+                                                                             compile_times):
+
+                try:
+
+                    error_codes = ast.literal_eval(errors)
+
+                except (ValueError, SyntaxError):
+
+                    continue
+
+                # Skipped safety checks are recorded as an empty time and replay as safe
+                safety_check_time = float(safety_check_time) if safety_check_time == safety_check_time else 0.0
+
+                if compile_time is None or compile_time != compile_time:
+
+                    compile_time = compile_share * safety_check_time
+
+                self.rows[int(seed)] = (error_codes[0], error_codes[1], str(safe) != "False", float(compile_time),
+                                        safety_check_time)
+
+        self.seeds = sorted(self.rows)
+
+        if len(self.seeds) == 0:
+
+            raise ValueError("no results recorded in " + ", ".join(paths))
+
+    def row(self, source):
+
+        """
+
+            The recorded row of the seed of a program, or of a seed picked by a hash of the program
+
+        """
+
+        match = SEED_RE.search(source)
+
+        if match is not None and int(match.group(1)) in self.rows:
+
+            return self.rows[int(match.group(1))]
+
+        code   = "\n".join(x for x in source.splitlines() if not x.startswith("//"))
+        digest = hashlib.blake2b(code.encode("utf-8"), digest_size=8).digest()
+
+        return self.rows[self.seeds[int.from_bytes(digest, "little") % len(self.seeds)]]
+
+    def summary(self, file=sys.stdout):
+
+        import numpy as np
+
+        rows        = list(self.rows.values())
+        compile     = np.array([x[3] for x in rows])
+        safety      = np.array([x[4] for x in rows])
+        failed      = sum(1 for x in rows if failed_compile(x[0]))
+
+        print("PROGRAMS:", len(rows), "COMPILE FAILED:", failed, "UNSAFE:", sum(1 for x in rows if not x[2]),
+              file=file)
+        print("%-14s %10s %10s %10s %10s %10s" % ("Latency s", "Mean", "P50", "P90", "P99", "Max"), file=file)
+
+        for name, values in [("compile", compile), ("checksafety", safety)]:
+
+            print("%-14s %10.4f %10.4f %10.4f %10.4f %10.4f" % (name, values.mean(), *np.percentile(values,
+                                                                                                    [50, 90, 99]),
+                                                                 values.max()), file=file)
+
+
+def failed_compile(lines):
+
+    return any(x is not None and x[0] != "warning" for x in map(JB.classify, lines))
+
+
+class SimulatedBackend(Backend):
+
+    def __init__(self, recordings, latency_scale=1.0, max_latency=30.0, compile_share=0.5, step_budget=10000):
+
+        self.recording     = Recording(recordings, compile_share)
+        self.latency_scale = latency_scale
+        self.max_latency   = max_latency
+        self.step_budget   = step_budget
+
+    def delay(self, seconds):
+
+        return min(seconds, self.max_latency) * self.latency_scale
+
+    def read(self, path):
+
+        with open(path, "r") as file:
+
+            return file.read()
+
+    def start_compile(self, source_file, assembly_file, pass_fds=(), flags=()):
+
+        source = self.read(source_file)
+        row    = self.recording.row(source)
+        failed = failed_compile(row[0])
+
+        if not failed:
+
+            with open(assembly_file, "w") as file:
+                file.write(SIMULATED + source)
+
+        return SimulatedProcess("".join(x + "\n" for x in row[0]), self.delay(row[3]), 1 if failed else 0)
+
+    def start_checksafety(self, source_file, pass_fds=(), flags=()):
+
+        row   = self.recording.row(self.read(source_file))
+        lines = list(row[1]) + ([] if row[2] else ["Program is not safe!"])
+
+        return SimulatedProcess("".join(x + "\n" for x in lines), self.delay(row[4]), 0)
+
+    def assemble(self, assembly_file, binary_file, function_name="f0", harness=JH.BATCH_MAIN):
+
+        if not self.read(assembly_file).startswith(SIMULATED):
+
+            raise JH.HarnessError("not a simulated assembly file: " + assembly_file)
+
+        shutil.copy(assembly_file, binary_file)
+
+    def run(self, binary_file, inputs, timeout=None):
+
+        """
+
+            Interpret the program, the inputs from the first one that ran out of steps on count as timed out
+
+        """
+
+        import numpy as np
+
+        import jasminInterpreter as JI
+
+        source    = self.read(binary_file)[len(SIMULATED):]
+        execution = JI.run_source(source, np.ascontiguousarray(inputs, dtype=np.int64), self.step_budget)
+        values    = execution.signed_values()
+        diverged  = np.flatnonzero(execution.diverged)
+
+        if len(diverged) > 0:
+
+            return JH.BatchResult(values[:diverged[0]], True, None)
+
+        return JH.BatchResult(values, False, 0)
+
+
+def get_backend(compiler):
+
+    """
+
+        compiler is a Backend or the path of a jasminc
+
+    """
+
+    return compiler if isinstance(compiler, Backend) else JasminBackend(compiler)
+
+
+def from_config(config):
+
+    settings = config.get("backend")
+
+    if settings is None or settings.get("type", "jasminc") == "jasminc":
+
+        return JasminBackend(config["compiler_path"])
+
+    if settings["type"] != "simulated":
+
+        raise ValueError("unknown backend " + settings["type"])
+
+    # Relative paths are relative to the repository
+    recordings = [os.path.join(JCF.ROOT, x) for x in settings["recordings"]]
+
+    return SimulatedBackend(recordings, settings.get("latency_scale", 1.0), settings.get("max_latency", 30.0),
+                            settings.get("compile_share", 0.5))
+
+
+def main():
+
+    if len(sys.argv) < 2:
+
+        print(__doc__)
+        sys.exit(1)
+
+    Recording(sys.argv[1:]).summary()
+
+
+if __name__ == '__main__':
+    main()
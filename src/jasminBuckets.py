@@ -0,0 +1,274 @@
+"""
+
+    Crash signature bucketing for jasminc output.
+
+    Every stderr line of a run is matched against a table of precompiled signature patterns. The part of the line
+    that identifies the failure is normalised (paths, source positions, variable and function names, numbers) so that
+    the same compiler failure in two different programs lands in the same bucket. A bucket id is a short hash of the
+    stage, the signature and the normalised text, it is stable across runs and machines.
+
+    Lines that do not start a message (the continuation lines jasminc prints below a register allocation or safety
+    failure) belong to the message before them and do not open a bucket of their own.
+
+    The BucketIndex keeps for every bucket how many programs hit it and the smallest program (seed and size) that did,
+    and is saved as JSON. Adding a result is a dictionary update, so a whole campaign summarises into a bucket table
+    while it runs.
+
+
+    Usage:
+
+        python jasminBuckets.py <index.json> [results_*.csv ...]
+
+            - import existing result CSVs into the index (if given) and print the bucket table
+
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+
+
+STAGES = ["compile", "safety"]
+
+# The version of the saved index, a new version changes the bucket ids (the normalisation) so an old index is not
+# mixed into a new one
+INDEX_VERSION = 2
+
+"""
+
+    Signature patterns, the first matching pattern wins. The group is the part of the line that is bucketed.
+
+"""
+
+SIGNATURES = [
+
+    ("please report",       re.compile(r"^(PLEASE REPORT)")),
+    ("typing error",        re.compile(r"typing error: (.*)")),
+    ("already allocated",   re.compile(r"can not allocate .* (the variable is already allocated).*")),
+    ("register allocation", re.compile(r"^Register allocation(?: at line .*?)?: (.*)")),
+    ("compilation error",   re.compile(r"^compilation error in functions [^:]*(?:: (.*))?$")),
+    ("fatal error",         re.compile(r"^Fatal error: (.*)")),
+    ("warning",             re.compile(r"^WARNING: (?:at .*?: (?:line .*?\)|line [-\d]+(?: from line \d+)?), )?(.*)")),
+    ("not safe",            re.compile(r"^(Program is not safe!)"))
+
+]
+
+CONTINUATION_RE = re.compile(r"^(\s|\(|\d|line |at line |[A-Za-z_]\w*(#\d+)?\.\d+)")
+
+"""
+
+    Normalisation, applied in order. Numbers are positions, line numbers, variable ids and literals, except the
+    widths of types and instructions (u8, U64, CMP_64), which tell the failures apart: a number right after a u or
+    U starting a word, or after an underscore in a name, is kept.
+
+"""
+
+NORMALISATION = [
+
+    (re.compile(r"\"?[\w./-]+\.(jazz|ml)\"?"),              "FILE"),
+    (re.compile(r"line -?\d+ \(\d+-\d+\)"),                 "POS"),
+    (re.compile(r"line -?\d+( from line -?\d+)*"),          "POS"),
+    (re.compile(r"characters \d+-\d+"),                     "POS"),
+    (re.compile(r"\bv\d+\b"),                               "vN"),
+    (re.compile(r"\bf\d+\b"),                               "fN"),
+    (re.compile(r"\bb\d+\b"),                               "bN"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"),                     "N"),
+    (re.compile(r"(?<!\d)(?<!\b[uU])(?<![A-Za-z0-9]_)\d+"), "N"),
+    (re.compile(r"\s+"),                                    " ")
+
+]
+
+
+def normalise(text):
+
+    for pattern, replacement in NORMALISATION:
+
+        text = pattern.sub(replacement, text)
+
+    return text.strip()
+
+
+def classify(line):
+
+    """
+
+        Return (signature, normalised text) of a line, None if the line continues the previous message
+
+    """
+
+    for name, pattern in SIGNATURES:
+
+        match = pattern.search(line)
+
+        if match is not None:
+
+            return name, normalise(match.group(1) or "")
+
+    if line.strip() == "" or CONTINUATION_RE.match(line):
+
+        return None
+
+    return "other", normalise(line)
+
+
+def bucket_id(stage, signature, text):
+
+    return hashlib.sha1((stage + "|" + signature + "|" + text).encode("utf-8")).hexdigest()[:12]
+
+
+def buckets_of(error_codes):
+
+    """
+
+        The buckets hit by one program, error_codes is the [[compile lines], [safety lines]] list of the fuzzer.
+        Returns a dictionary bucket id -> (stage, signature, text, first raw line)
+
+    """
+
+    result = {}
+
+    for stage, lines in zip(STAGES, error_codes):
+
+        for position, line in enumerate(lines):
+
+            classified = classify(line)
+
+            if classified is None:
+
+                continue
+
+            signature, text = classified
+
+            # jasminc wraps long compilation errors, the message is then on the following line
+            if text == "" and position + 1 < len(lines):
+
+                signature, text = classify(line + " " + lines[position + 1].strip())
+
+            key             = bucket_id(stage, signature, text)
+
+            if key not in result:
+
+                result[key] = (stage, signature, text, line)
+
+    return result
+
+
+class BucketIndex:
+
+    def __init__(self, path=None):
+
+        self.path    = path
+        self.buckets = {}
+
+        if path is not None and os.path.exists(path):
+
+            with open(path, "r") as file:
+                index = json.load(file)
+
+            if index.get("version") != INDEX_VERSION:
+
+                raise ValueError("bucket index " + path + " is version " + str(index.get("version")) +
+                                 ", rebuild it from the result CSVs")
+
+            self.buckets = index["buckets"]
+
+    def add(self, seed, size, error_codes):
+
+        """
+
+            Record one program, returns (all bucket ids of the program, the ids that were new to the index)
+
+        """
+
+        hits = buckets_of(error_codes)
+        new  = []
+
+        for key, (stage, signature, text, line) in hits.items():
+
+            bucket = self.buckets.get(key)
+
+            if bucket is None:
+
+                bucket = {"stage": stage, "signature": signature, "text": text, "example": line,
+                          "count": 0, "seed": seed, "size": size}
+                self.buckets[key] = bucket
+                new.append(key)
+
+            bucket["count"] += 1
+
+            if size < bucket["size"]:
+
+                bucket["seed"] = seed
+                bucket["size"] = size
+
+        return sorted(hits), new
+
+    def save(self, path=None):
+
+        path = self.path if path is None else path
+        tmp  = path + ".tmp"
+
+        with open(tmp, "w") as file:
+            json.dump({"version": INDEX_VERSION, "buckets": self.buckets}, file, indent=1, sort_keys=True)
+
+        os.replace(tmp, path)
+
+    def table(self):
+
+        return sorted(([key] + [self.buckets[key][x] for x in ["count", "stage", "signature", "seed", "size", "text"]]
+                       for key in self.buckets), key=lambda x: (-x[1], x[0]))
+
+    def print_table(self, file=sys.stdout):
+
+        print("%-12s %8s %-7s %-20s %8s %6s  %s" % ("Bucket", "Count", "Stage", "Signature", "Seed", "Size", "Text"),
+              file=file)
+
+        for row in self.table():
+
+            print("%-12s %8d %-7s %-20s %8s %6d  %s" % tuple(row[:6] + [row[6][:100]]), file=file)
+
+    def import_csv(self, csv_path):
+
+        """
+
+            Add the results of an existing fuzzer CSV (Seed, Errors, Size, ...) to the index
+
+        """
+
+        import pandas as pd
+
+        results = pd.read_csv(csv_path)
+
+        for seed, errors, size in zip(results["Seed"], results["Errors"], results["Size"]):
+
+            try:
+
+                error_codes = ast.literal_eval(errors)
+
+            except (ValueError, SyntaxError):
+
+                continue
+
+            self.add(int(seed), int(size), error_codes)
+
+
+def main():
+
+    index = BucketIndex(sys.argv[1])
+
+    for csv_path in sys.argv[2:]:
+
+        index.import_csv(csv_path)
+
+    if len(sys.argv) > 2:
+
+        index.save()
+
+    index.print_table()
+
+
+if __name__ == '__main__':
+    main()
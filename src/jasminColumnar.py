@@ -0,0 +1,306 @@
+"""
+
+    Typed columnar export of campaign results.
+
+    In the fuzzer CSVs the Errors column is a stringified nested list, every analysis has to literal_eval it row by
+    row. The exporter parses every result CSV (a shard) once and writes two typed tables per shard:
+
+        programs    - seed (int64), config (str), size (int64), safe, safety_checked (bool, safe is False when the
+                      stage policy skipped the safety check), generation_time, safety_check_time, compile_time
+                      (float64, NaN when not measured), compile_errors, safety_errors (int32 line counts)
+        errors      - one row per (program, bucket): seed (int64), config, bucket, stage, signature (str)
+
+    and buckets.json with the stage, signature and normalised text of every bucket id (see jasminBuckets).
+
+    With pyarrow the tables are Parquet files (<shard>.programs.parquet, <shard>.errors.parquet). Without it every
+    column is a .npy file (<shard>/programs/<column>.npy), strings as fixed width unicode, which np.load can memory
+    map. A shard is only exported again when its CSV is newer than its export.
+
+
+    Methods:
+
+        export_shard / export:
+
+            - export one / many result CSVs into a directory
+
+        load_shard / load:
+
+            - the columns of one exported shard (memory mapped) / all shards as (programs, errors) DataFrames
+
+
+    Usage:
+
+        python jasminColumnar.py <out_dir> <results_*.csv> ... [--npy]
+
+"""
+
+import ast
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import jasminBuckets as JB
+
+
+PROGRAM_COLUMNS = ["seed", "config", "size", "safe", "safety_checked", "generation_time", "safety_check_time",
+                   "compile_time", "compile_errors", "safety_errors"]
+ERROR_COLUMNS   = ["seed", "config", "bucket", "stage", "signature"]
+
+DTYPES          = {"seed": np.int64, "size": np.int64, "safe": np.bool_, "safety_checked": np.bool_,
+                   "generation_time": np.float64,
+                   "safety_check_time": np.float64, "compile_time": np.float64, "compile_errors": np.int32,
+                   "safety_errors": np.int32, "config": str, "bucket": str, "stage": str, "signature": str}
+
+TABLES          = {"programs": PROGRAM_COLUMNS, "errors": ERROR_COLUMNS}
+
+
+def parquet_available():
+
+    try:
+
+        import pyarrow.parquet
+
+        return True
+
+    except ImportError:
+
+        return False
+
+
+def shard_name(csv_path):
+
+    return os.path.splitext(os.path.basename(csv_path))[0]
+
+
+def read_shard(csv_path):
+
+    """
+
+        Parse one result CSV into column lists and the buckets it hits
+
+    """
+
+    import pandas as pd
+
+    results  = pd.read_csv(csv_path)
+    programs = {x: [] for x in PROGRAM_COLUMNS}
+    errors   = {x: [] for x in ERROR_COLUMNS}
+    buckets  = {}
+
+    compile_times = results["CompileTime"] if "CompileTime" in results else [np.nan] * len(results)
+    configs       = results["Config"].fillna("") if "Config" in results else [""] * len(results)
+    skipped       = results["Skipped"].fillna("") if "Skipped" in results else [""] * len(results)
+
+    for seed, raw, size, safe, gen_time, safety_time, compile_time, config, skip in zip(
+            results["Seed"], results["Errors"], results["Size"], results["Safe"], results["GenerationTime"],
+            results["SafetyCheckTime"], compile_times, configs, skipped):
+
+        try:
+
+            error_codes = ast.literal_eval(raw)
+
+        except (ValueError, SyntaxError):
+
+            continue
+
+        for column, value in zip(PROGRAM_COLUMNS, [seed, config, size, safe in [True, "True"], "safety" not in skip,
+                                                   gen_time, safety_time, compile_time, len(error_codes[0]),
+                                                   len(error_codes[1])]):
+
+            programs[column].append(value)
+
+        for key, (stage, signature, text, line) in JB.buckets_of(error_codes).items():
+
+            for column, value in zip(ERROR_COLUMNS, [seed, config, key, stage, signature]):
+
+                errors[column].append(value)
+
+            buckets[key] = {"stage": stage, "signature": signature, "text": text}
+
+    tables = {}
+
+    for name, columns in [("programs", programs), ("errors", errors)]:
+
+        tables[name] = {x: np.asarray(columns[x], dtype=DTYPES[x]) for x in TABLES[name]}
+
+    return tables, buckets
+
+
+def shard_paths(out_dir, name, use_parquet):
+
+    if use_parquet:
+
+        return {table: os.path.join(out_dir, name + "." + table + ".parquet") for table in TABLES}
+
+    return {table: os.path.join(out_dir, name, table) for table in TABLES}
+
+
+def export_shard(csv_path, out_dir, use_parquet=None, force=False):
+
+    """
+
+        Returns False if the export of the shard is already up to date
+
+    """
+
+    use_parquet = parquet_available() if use_parquet is None else use_parquet
+    paths       = shard_paths(out_dir, shard_name(csv_path), use_parquet)
+
+    if not force and all(os.path.exists(x) and os.path.getmtime(x) >= os.path.getmtime(csv_path)
+                         for x in paths.values()):
+
+        return False
+
+    tables, buckets = read_shard(csv_path)
+
+    for table, columns in tables.items():
+
+        if use_parquet:
+
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            pq.write_table(pa.table(columns), paths[table])
+
+        else:
+
+            os.makedirs(paths[table], exist_ok=True)
+
+            for column, values in columns.items():
+
+                np.save(os.path.join(paths[table], column + ".npy"), values)
+
+    merge_buckets(out_dir, buckets)
+
+    return True
+
+
+def merge_buckets(out_dir, buckets):
+
+    path     = os.path.join(out_dir, "buckets.json")
+    existing = {}
+
+    if os.path.exists(path):
+
+        with open(path, "r") as file:
+            existing = json.load(file)
+
+    existing.update(buckets)
+
+    with open(path + ".tmp", "w") as file:
+        json.dump(existing, file, indent=1, sort_keys=True)
+
+    os.replace(path + ".tmp", path)
+
+
+def export(csv_paths, out_dir, use_parquet=None, force=False):
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    return [x for x in csv_paths if export_shard(x, out_dir, use_parquet, force)]
+
+
+def shards(out_dir):
+
+    """
+
+        The exported shard names of a directory
+
+    """
+
+    names = set(os.path.basename(x)[:-len(".programs.parquet")]
+                for x in glob.glob(os.path.join(out_dir, "*.programs.parquet")))
+    names.update(os.path.basename(os.path.dirname(x)) for x in glob.glob(os.path.join(out_dir, "*", "programs")))
+
+    return sorted(names)
+
+
+def load_shard(out_dir, name, table="programs"):
+
+    """
+
+        The columns of one table of one shard. .npy columns are memory mapped, Parquet files are read through a
+        memory map. Shards exported before safety_checked existed read as all checked.
+
+    """
+
+    parquet_path = shard_paths(out_dir, name, True)[table]
+
+    if os.path.exists(parquet_path):
+
+        import pyarrow.parquet as pq
+
+        data    = pq.read_table(parquet_path, memory_map=True)
+        columns = {x: data.column(x).to_numpy() for x in TABLES[table] if x in data.column_names}
+
+    else:
+
+        directory = shard_paths(out_dir, name, False)[table]
+        columns   = {x: np.load(os.path.join(directory, x + ".npy"), mmap_mode="r") for x in TABLES[table]
+                     if os.path.exists(os.path.join(directory, x + ".npy"))}
+
+    if table == "programs" and "safety_checked" not in columns:
+
+        columns["safety_checked"] = np.ones(len(columns["seed"]), dtype=np.bool_)
+
+    return columns
+
+
+def load(out_dir, names=None):
+
+    """
+
+        All (or the named) shards as a programs and an errors DataFrame, with a shard column
+
+    """
+
+    import pandas as pd
+
+    names  = shards(out_dir) if names is None else names
+    result = []
+
+    for table in TABLES:
+
+        parts = []
+
+        for name in names:
+
+            columns          = load_shard(out_dir, name, table)
+            columns["shard"] = np.full(len(columns["seed"]), name)
+            parts.append(pd.DataFrame(columns))
+
+        result.append(pd.concat(parts, ignore_index=True) if len(parts) > 0
+                      else pd.DataFrame(columns=TABLES[table] + ["shard"]))
+
+    return tuple(result)
+
+
+def main():
+
+    args        = sys.argv[1:]
+    use_parquet = None
+
+    if "--npy" in args:
+
+        args.remove("--npy")
+        use_parquet = False
+
+    out_dir = args[0]
+    start   = time.time()
+    written = export(args[1:], out_dir, use_parquet)
+
+    print("EXPORTED", len(written), "SHARDS IN", round(time.time() - start, 2), "s")
+
+    start            = time.time()
+    programs, errors = load(out_dir)
+
+    print("LOADED", len(programs), "PROGRAMS AND", len(errors), "ERRORS FROM", len(shards(out_dir)), "SHARDS IN",
+          round(time.time() - start, 3), "s")
+
+
+if __name__ == '__main__':
+    main()
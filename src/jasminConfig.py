@@ -0,0 +1,78 @@
+"""
+
+    Paths of the tools, read from a JSON file instead of being hard-coded in every entry point.
+
+    The configuration is the first of:
+
+        - the path passed to load
+        - the file named by the JAZZY_CONFIG environment variable
+        - jazzy.json in the repository root
+
+    Keys that are missing take the DEFAULTS, which keep everything inside the repository and expect jasminc on the
+    PATH:
+
+        {
+            "compiler_path" : "jasminc",
+            "source_path"   : "<repo>/evaluation/test",
+            "data_path"     : "<repo>/evaluation/data/",
+            "evaluation_path": "<repo>/evaluation/",
+            "scratch_path"  : null,
+            "scratch_memfd" : false,
+            "backend"       : null
+        }
+
+    source_path is the file name prefix of the program of a fuzzer dry run. The programs of a campaign and the files
+    of the timing runs go to a jasminScratch.ScratchSpace under scratch_path (null picks /dev/shm when it exists),
+    with scratch_memfd the sources are passed to jasminc as memory files. backend replaces the jasminc at
+    compiler_path in the fuzzer, e.g. with a simulated jasminc replaying recorded results (see jasminBackend).
+
+
+    Methods:
+
+        load:
+
+            - the configuration as a dict
+
+"""
+
+import json
+import os
+
+
+ROOT     = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+DEFAULTS = {
+    "compiler_path"     : "jasminc",
+    "source_path"       : os.path.join(ROOT, "evaluation", "test"),
+    "data_path"         : os.path.join(ROOT, "evaluation", "data", ""),
+    "evaluation_path"   : os.path.join(ROOT, "evaluation", ""),
+    "scratch_path"      : None,
+    "scratch_memfd"     : False,
+    "backend"           : None
+}
+
+
+def config_path(path=None):
+
+    if path is not None:
+
+        return path
+
+    return os.environ.get("JAZZY_CONFIG", os.path.join(ROOT, "jazzy.json"))
+
+
+def load(path=None):
+
+    config = dict(DEFAULTS)
+    path   = config_path(path)
+
+    if os.path.exists(path):
+
+        with open(path, "r") as file:
+            config.update(json.load(file))
+
+    for key in ["data_path", "evaluation_path"]:
+
+        config[key] = os.path.join(config[key], "")
+
+    return config
@@ -0,0 +1,419 @@
+"""
+
+    Compressed corpus archive for generated programs.
+
+    Interesting programs are kept as loose .jazz files or regenerated from their seeds. An archive keeps many
+    programs in one directory, every program compressed on its own against a shared dictionary trained on generated
+    Jasmin (zstd when the zstandard package is installed, zlib with a preset dictionary otherwise). Generated programs
+    are short and very alike, so the dictionary is what makes the single program compression work.
+
+        <archive>/meta.json         - format version and codec
+        <archive>/dictionary        - the trained dictionary
+        <archive>/<writer>.data     - compressed programs, append only
+        <archive>/<writer>.index    - one fixed size record per program: seed (-1 if none), sha1 of the program
+                                      config, program hash, offset and length in <writer>.data
+
+    Every writer (e.g. every worker process) appends to its own data and index file, so parallel workers never share
+    a file. A record is only written to the index after its program is in the data file, readers therefore never see
+    a half written program. Reading a program is one dictionary lookup, one seek and one decompress.
+
+    A seed is only a program together with its config (see jasminFuzzer.program_config, "" for the default
+    generator), the archive keys seeds on both like jasminStore. The program hash is jasminStore.program_hash, which
+    leaves out the comment header with its generation time, so the same program added twice has one hash.
+
+
+    Methods:
+
+        create:
+
+            - create an archive, the dictionary is trained on the given sample programs
+
+        CorpusWriter.add / CorpusReader.get:
+
+            - append a program / read a program by seed (and config) or program hash
+
+
+    Usage:
+
+        python jasminCorpus.py <archive> create <start> <end>
+
+            - create an archive with a dictionary trained on the programs of the seeds start to end
+
+        python jasminCorpus.py <archive> generate <start> <end> [--workers N] [--terminating]
+
+            - generate the programs of the seeds start to end into the archive, one writer per worker
+
+        python jasminCorpus.py <archive> add <program.jazz> ... [--config <config>]
+
+            - add loose programs, the seed is taken from the file name if it is a number
+
+        python jasminCorpus.py <archive> get <seed | hash> [--config <config>]
+
+"""
+
+import collections
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+import jasminStore as JRS
+
+
+VERSION         = 2
+RECORD          = struct.Struct("<q20s20sQI")
+DICTIONARY_SIZE = 32768
+
+
+def zstd_available():
+
+    try:
+
+        import zstandard
+
+        return True
+
+    except ImportError:
+
+        return False
+
+
+def train_zlib_dictionary(samples, size=DICTIONARY_SIZE):
+
+    """
+
+        zlib has no trainer, the dictionary is the lines that save the most bytes (count times length) over the
+        samples. zlib finds closer matches cheaper, so the most valuable lines go last.
+
+    """
+
+    counts = collections.Counter(line for sample in samples for line in sample.splitlines(keepends=True))
+    lines  = []
+    total  = 0
+
+    for line, count in sorted(counts.items(), key=lambda x: -x[1] * len(x[0])):
+
+        if count < 2 or total + len(line.encode("utf-8")) > size:
+
+            continue
+
+        lines.append(line)
+        total += len(line.encode("utf-8"))
+
+    return "".join(reversed(lines)).encode("utf-8")
+
+
+def create(path, samples, codec=None, size=DICTIONARY_SIZE):
+
+    """
+
+        Create the archive at path with a dictionary trained on samples (a list of program texts)
+
+    """
+
+    codec = ("zstd" if zstd_available() else "zlib") if codec is None else codec
+
+    if codec == "zstd":
+
+        import zstandard
+
+        dictionary = zstandard.train_dictionary(size, [x.encode("utf-8") for x in samples]).as_bytes()
+
+    else:
+
+        dictionary = train_zlib_dictionary(samples, size)
+
+    os.makedirs(path, exist_ok=True)
+
+    with open(os.path.join(path, "dictionary"), "wb") as file:
+        file.write(dictionary)
+
+    with open(os.path.join(path, "meta.json"), "w") as file:
+        json.dump({"version": VERSION, "codec": codec}, file)
+
+
+def config_digest(config):
+
+    return hashlib.sha1(config.encode("utf-8")).digest()
+
+
+class Codec:
+
+    def __init__(self, path):
+
+        with open(os.path.join(path, "meta.json"), "r") as file:
+            meta = json.load(file)
+
+        with open(os.path.join(path, "dictionary"), "rb") as file:
+            self.dictionary = file.read()
+
+        if meta["version"] != VERSION:
+
+            raise ValueError("unsupported corpus version " + str(meta["version"]))
+
+        self.codec = meta["codec"]
+
+        if self.codec == "zstd":
+
+            import zstandard
+
+            dictionary          = zstandard.ZstdCompressionDict(self.dictionary)
+            self.compressor     = zstandard.ZstdCompressor(level=19, dict_data=dictionary)
+            self.decompressor   = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+    def compress(self, data):
+
+        if self.codec == "zstd":
+
+            return self.compressor.compress(data)
+
+        compressor = zlib.compressobj(9, zdict=self.dictionary)
+
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+
+        if self.codec == "zstd":
+
+            return self.decompressor.decompress(data)
+
+        decompressor = zlib.decompressobj(zdict=self.dictionary)
+
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+class CorpusWriter:
+
+    def __init__(self, path, writer=None):
+
+        self.codec  = Codec(path)
+        writer      = str(os.getpid()) if writer is None else str(writer)
+        self.data   = open(os.path.join(path, writer + ".data"), "ab")
+        self.index  = open(os.path.join(path, writer + ".index"), "ab")
+        self.offset = self.data.tell()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def add(self, program, seed=None, config=""):
+
+        """
+
+            Append a program, returns its program hash
+
+        """
+
+        digest     = JRS.program_hash(program)
+        compressed = self.codec.compress(program.encode("utf-8"))
+
+        self.data.write(compressed)
+        self.data.flush()
+
+        self.index.write(RECORD.pack(-1 if seed is None else seed, config_digest(config), bytes.fromhex(digest),
+                                     self.offset, len(compressed)))
+        self.index.flush()
+
+        self.offset += len(compressed)
+
+        return digest
+
+    def close(self):
+
+        self.data.close()
+        self.index.close()
+
+
+class CorpusReader:
+
+    def __init__(self, path):
+
+        self.path       = path
+        self.codec      = Codec(path)
+        self.by_seed    = {}
+        self.by_hash    = {}
+        self.files      = {}
+        self.sizes      = {}
+
+        self.refresh()
+
+    def refresh(self):
+
+        """
+
+            Read the index records appended since the last refresh
+
+        """
+
+        for name in sorted(os.listdir(self.path)):
+
+            if not name.endswith(".index"):
+
+                continue
+
+            writer = name[:-len(".index")]
+
+            with open(os.path.join(self.path, name), "rb") as file:
+                file.seek(self.sizes.get(writer, 0))
+                records = file.read()
+
+            # A record that is still being written is left for the next refresh
+            complete             = len(records) - len(records) % RECORD.size
+            self.sizes[writer]   = self.sizes.get(writer, 0) + complete
+
+            for seed, config, digest, offset, length in RECORD.iter_unpack(records[:complete]):
+
+                location = (writer, offset, length)
+
+                if seed >= 0:
+
+                    self.by_seed[(seed, config)] = location
+
+                self.by_hash[digest.hex()] = location
+
+    def __len__(self):
+
+        return len(self.by_hash)
+
+    def __contains__(self, key):
+
+        return (key, config_digest("")) in self.by_seed or key in self.by_hash
+
+    def seeds(self, config=""):
+
+        digest = config_digest(config)
+
+        return sorted(seed for seed, x in self.by_seed if x == digest)
+
+    def get(self, key, config=""):
+
+        """
+
+            The program of a seed (int) generated with config or of a program hash (hex str)
+
+        """
+
+        writer, offset, length = (self.by_seed[(key, config_digest(config))] if isinstance(key, int)
+                                  else self.by_hash[key])
+
+        if writer not in self.files:
+
+            self.files[writer] = open(os.path.join(self.path, writer + ".data"), "rb")
+
+        file = self.files[writer]
+        file.seek(offset)
+
+        return self.codec.decompress(file.read(length)).decode("utf-8")
+
+    def close(self):
+
+        for file in self.files.values():
+
+            file.close()
+
+        self.files = {}
+
+
+def generate_range(path, start, end, writer, options):
+
+    import jasminFuzzer as JF
+    import jasminGenerator as JPG
+    import jasminPrettyPrint as JPP
+
+    config = JF.program_config(options, JPG.JD.config_hash(), JPG.JD.config_hash())
+
+    with CorpusWriter(path, writer) as corpus:
+
+        for seed in range(start, end):
+
+            corpus.add(JPP.jasmin_pretty_print("".join(str(x) for x in JPG.JasminGenerator(seed, **options)
+                                                       .get_program())), seed, config)
+
+    return end - start
+
+
+def main():
+
+    args    = sys.argv[1:]
+    workers = 1
+    options = {}
+    config  = ""
+
+    if "--workers" in args:
+
+        workers = int(args[args.index("--workers") + 1])
+        del args[args.index("--workers"):args.index("--workers") + 2]
+
+    if "--config" in args:
+
+        config = args[args.index("--config") + 1]
+        del args[args.index("--config"):args.index("--config") + 2]
+
+    if "--terminating" in args:
+
+        args.remove("--terminating")
+        options["terminating"] = True
+
+    path, command = args[0], args[1]
+    start_time    = time.time()
+
+    if command == "create":
+
+        import jasminGenerator as JPG
+        import jasminPrettyPrint as JPP
+
+        samples = [JPP.jasmin_pretty_print("".join(str(x) for x in JPG.JasminGenerator(seed).get_program()))
+                   for seed in range(int(args[2]), int(args[3]))]
+
+        create(path, samples)
+
+        print("CREATED", path, "WITH", Codec(path).codec, "DICTIONARY OF", len(Codec(path).dictionary), "BYTES")
+
+    elif command == "generate":
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        start, end = int(args[2]), int(args[3])
+        step       = max(1, (end - start + workers - 1) // workers)
+        run        = str(int(time.time()))
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+
+            jobs  = [executor.submit(generate_range, path, x, min(x + step, end), run + "_" + str(i), options)
+                     for i, x in enumerate(range(start, end, step))]
+            count = sum(x.result() for x in jobs)
+
+        print("GENERATED", count, "PROGRAMS IN", round(time.time() - start_time, 2), "s")
+
+    elif command == "add":
+
+        with CorpusWriter(path) as corpus:
+
+            for file_path in args[2:]:
+
+                with open(file_path, "r") as file:
+                    program = file.read()
+
+                name = os.path.splitext(os.path.basename(file_path))[0]
+
+                print(corpus.add(program, int(name) if name.isdigit() else None, config), file_path)
+
+    elif command == "get":
+
+        corpus = CorpusReader(path)
+        key    = args[2] if len(args[2]) == 40 else int(args[2])
+
+        print(corpus.get(key, config))
+        print("READ FROM", len(corpus), "PROGRAMS IN", round((time.time() - start_time) * 1000, 2), "ms",
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
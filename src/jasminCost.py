@@ -0,0 +1,1028 @@
+"""
+
+    Static cost estimate of the x86-64 assembly jasminc produces.
+
+    The timing runs of time_measuring link every program with main.c and run it, which is slow and noisy. This module
+    reads the AT&T assembly (jazz.s) instead: it splits it into basic blocks, estimates every block with the x86-64
+    cost model of COSTS and every path through the exported function, and runs a taint analysis that flags the
+    instructions whose timing can depend on a secret.
+
+    A row of COSTS is (class, latency, worst latency, reciprocal throughput) in cycles, roughly the numbers of
+    Agner Fog's tables for a recent Intel core. Only div and idiv have a worst latency above the latency, their
+    latency depends on the operands. A memory source adds LOAD_LATENCY. The estimate of a block is the larger of
+    its critical path (the chain of register, flag and memory dependencies) and its throughput bound (the sum of the
+    reciprocal throughputs), computed once with the latencies and once with the worst latencies.
+
+    The paths are those from the entry of the exported function to a ret, with the back edges of loops cut so every
+    loop body counts once, and a call costs the paths of the function it calls when that is in the same file. The
+    spread between the cheapest path (with the latencies) and the most expensive one (with the worst latencies) is
+    the static counterpart of the Slowest - Fastest spread of the timing runs. A block that does not end in ret and
+    has no successor left once the back edges are cut (a loop without an exit, such as "L: jmp L") is no path end:
+    the paths through it never return, they are left out and the block is counted as a non-exiting loop.
+
+    The arguments of the exported function are secret. The taint flows through registers, flags and stack slots to
+    a fixed point over the blocks, and an instruction is flagged as
+
+        secret branch       - a conditional jump on flags computed from a secret
+        secret address      - a memory access whose address is computed from a secret
+        variable latency    - a div or idiv, secret variable latency when its operands are secret
+
+    A program without secret branches, secret addresses and secret variable latency instructions is constant time
+    as far as this model can tell.
+
+
+    Methods:
+
+        parse:
+
+            - the instructions and labels of an assembly text
+
+        analyse / analyse_file:
+
+            - the Analysis (blocks, mix, paths, findings) of an assembly text / file
+
+        analyse_seeds:
+
+            - compile the programs of a seed range and analyse their assembly, one row per program
+
+
+    Usage:
+
+        python jasminCost.py <jazz.s> ... [--entry <function>]
+
+            - print the instruction mix, the blocks, the paths and the findings of assembly files, the entry is the
+              first global function unless given
+
+        python jasminCost.py <start> <end> [--terminating]
+
+            - compile the programs of a seed range with the configured compiler and write
+              <data_path>cost_<start>_<end>.csv
+
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+
+# class, latency, worst latency, reciprocal throughput
+COSTS = {
+    "mov"       : ("move",      1,  1,  0.25),
+    "movabs"    : ("move",      1,  1,  0.25),
+    "movzx"     : ("move",      1,  1,  0.25),
+    "movsx"     : ("move",      1,  1,  0.25),
+    "xchg"      : ("move",      2,  2,  1),
+    "lea"       : ("arith",     1,  1,  0.5),
+    "add"       : ("arith",     1,  1,  0.25),
+    "sub"       : ("arith",     1,  1,  0.25),
+    "adc"       : ("arith",     1,  1,  0.5),
+    "sbb"       : ("arith",     1,  1,  0.5),
+    "adcx"      : ("arith",     1,  1,  1),
+    "adox"      : ("arith",     1,  1,  1),
+    "neg"       : ("arith",     1,  1,  0.25),
+    "inc"       : ("arith",     1,  1,  0.25),
+    "dec"       : ("arith",     1,  1,  0.25),
+    "and"       : ("logic",     1,  1,  0.25),
+    "or"        : ("logic",     1,  1,  0.25),
+    "xor"       : ("logic",     1,  1,  0.25),
+    "not"       : ("logic",     1,  1,  0.25),
+    "andn"      : ("logic",     1,  1,  0.5),
+    "bswap"     : ("logic",     2,  2,  0.5),
+    "bt"        : ("logic",     1,  1,  0.5),
+    "popcnt"    : ("logic",     3,  3,  1),
+    "lzcnt"     : ("logic",     3,  3,  1),
+    "tzcnt"     : ("logic",     3,  3,  1),
+    "shl"       : ("shift",     1,  1,  0.5),
+    "sal"       : ("shift",     1,  1,  0.5),
+    "shr"       : ("shift",     1,  1,  0.5),
+    "sar"       : ("shift",     1,  1,  0.5),
+    "rol"       : ("shift",     1,  1,  0.5),
+    "ror"       : ("shift",     1,  1,  0.5),
+    "rcl"       : ("shift",     3,  3,  1.5),
+    "rcr"       : ("shift",     3,  3,  1.5),
+    "shld"      : ("shift",     3,  3,  1),
+    "shrd"      : ("shift",     3,  3,  1),
+    "shlx"      : ("shift",     1,  1,  0.5),
+    "shrx"      : ("shift",     1,  1,  0.5),
+    "sarx"      : ("shift",     1,  1,  0.5),
+    "rorx"      : ("shift",     1,  1,  0.5),
+    "imul"      : ("multiply",  3,  3,  1),
+    "mul"       : ("multiply",  3,  3,  1),
+    "mulx"      : ("multiply",  4,  4,  1),
+    "div"       : ("divide",    35, 88, 21),
+    "idiv"      : ("divide",    42, 95, 24),
+    "cmp"       : ("compare",   1,  1,  0.25),
+    "test"      : ("compare",   1,  1,  0.25),
+    "setcc"     : ("condition", 1,  1,  0.5),
+    "cmov"      : ("condition", 1,  1,  0.5),
+    "cqo"       : ("convert",   1,  1,  1),
+    "cdq"       : ("convert",   1,  1,  1),
+    "cdqe"      : ("convert",   1,  1,  1),
+    "push"      : ("stack",     3,  3,  1),
+    "pop"       : ("stack",     2,  2,  0.5),
+    "jmp"       : ("branch",    1,  1,  1),
+    "jcc"       : ("branch",    1,  1,  0.5),
+    "call"      : ("call",      3,  3,  2),
+    "ret"       : ("return",    2,  2,  1),
+    "nop"       : ("other",     0,  0,  0.25)
+}
+
+UNKNOWN         = ("unknown",   1,  1,  1)
+
+LOAD_LATENCY    = 5
+
+# Shifts and rotates by %cl are slower than by an immediate
+SHIFT_BY_CL     = (2, 1)
+
+CONDITIONS      = ["o", "no", "b", "c", "nae", "ae", "nb", "nc", "e", "z", "ne", "nz", "be", "na", "a", "nbe", "s",
+                   "ns", "p", "pe", "np", "po", "l", "nge", "ge", "nl", "le", "ng", "g", "nle"]
+
+SUFFIXES        = "bwlq"
+
+ALIASES         = {"cqto": "cqo", "cltd": "cdq", "cltq": "cdqe", "movabsq": "movabs", "sall": "sal"}
+
+# Two operand instructions that read and write their last operand
+READ_WRITE      = {"add", "sub", "adc", "sbb", "adcx", "adox", "and", "or", "xor", "shl", "sal", "shr", "sar", "rol",
+                   "ror", "rcl", "rcr", "shld", "shrd", "neg", "inc", "dec", "not", "bswap", "cmov", "xchg"}
+
+# Instructions that write their last operand without reading it
+WRITE_ONLY      = {"mov", "movabs", "movzx", "movsx", "lea", "setcc", "andn", "shlx", "shrx", "sarx", "rorx", "popcnt",
+                   "lzcnt", "tzcnt"}
+
+READ_ONLY       = {"cmp", "test", "bt", "push", "jmp", "call"}
+
+FLAGS_READ      = {"adc", "sbb", "adcx", "adox", "rcl", "rcr", "setcc", "cmov", "jcc"}
+
+FLAGS_KEPT      = {"mov", "movabs", "movzx", "movsx", "lea", "setcc", "cmov", "not", "bswap", "push", "pop", "xchg",
+                   "shlx", "shrx", "sarx", "rorx", "mulx", "cqo", "cdq", "cdqe", "jmp", "jcc", "call", "ret", "nop"}
+
+ZERO_IDIOMS     = {"xor", "sub"}
+
+VARIABLE        = {"div", "idiv"}
+
+ARGUMENTS       = ["rdi", "rsi", "rdx", "rcx", "r8", "r9"]
+
+CALLER_SAVED    = ["rax", "rcx", "rdx", "rsi", "rdi", "r8", "r9", "r10", "r11"]
+
+FLAGS           = "flags"
+
+# Any memory: a store through a secret address may have written any slot
+ANY_MEMORY      = "*"
+
+MAX_CALL_DEPTH  = 16
+
+LABEL_RE        = re.compile(r"^([A-Za-z_.$][\w.$@]*):(.*)$")
+GLOBL_RE        = re.compile(r"^\.globl\s+([\w.$@]+)")
+MEMORY_RE       = re.compile(r"^(.*)\(([^)]*)\)$")
+
+
+def register_names():
+
+    names = {}
+
+    for name in ["ax", "bx", "cx", "dx"]:
+
+        for alias in ["r" + name, "e" + name, name, name[0] + "l", name[0] + "h"]:
+
+            names[alias] = "r" + name
+
+    for name in ["si", "di", "bp", "sp"]:
+
+        for alias in ["r" + name, "e" + name, name, name + "l"]:
+
+            names[alias] = "r" + name
+
+    for number in range(8, 16):
+
+        for suffix in ["", "d", "w", "b"]:
+
+            names["r" + str(number) + suffix] = "r" + str(number)
+
+    return names
+
+
+REGISTERS = register_names()
+
+
+class Instruction:
+
+    """
+
+        An instruction of the assembly with its normalised mnemonic (base) and operands
+
+    """
+
+    def __init__(self, line_number, text, mnemonic, operands):
+
+        self.line_number = line_number
+        self.text        = text
+        self.mnemonic    = mnemonic
+        self.operands    = operands
+        self.base        = base_mnemonic(mnemonic)
+
+    def cost(self):
+
+        """
+
+            class, latency, worst latency and reciprocal throughput of the instruction
+
+        """
+
+        kind, latency, worst, throughput = COSTS.get(self.base, UNKNOWN)
+
+        if kind == "shift" and "%cl" in self.operands[:1]:
+
+            latency, throughput = SHIFT_BY_CL
+            worst               = latency
+
+        return kind, latency, worst, throughput
+
+    def target(self):
+
+        """
+
+            The label a jmp, jcc or call goes to, None for an indirect one
+
+        """
+
+        if len(self.operands) == 0 or self.operands[0].startswith("*") or self.operands[0].startswith("%"):
+
+            return None
+
+        return self.operands[0]
+
+    def effects(self):
+
+        """
+
+            The registers it reads, the registers it writes, the memory operands it loads and stores, whether it
+            reads and writes the flags
+
+        """
+
+        operands = self.operands
+        base     = self.base
+        reads    = []
+        writes   = []
+
+        if base in VARIABLE or (base in ["mul", "imul"] and len(operands) == 1):
+
+            reads  = operands + ["%rax"] + (["%rdx"] if base in VARIABLE else [])
+            writes = ["%rax", "%rdx"]
+
+        elif base == "imul":
+
+            reads  = operands if len(operands) == 2 else operands[:-1]
+            writes = operands[-1:]
+
+        elif base == "mulx":
+
+            reads  = operands[:1] + ["%rdx"]
+            writes = operands[1:]
+
+        elif base in ["cqo", "cdq"]:
+
+            reads  = ["%rax"]
+            writes = ["%rdx"]
+
+        elif base == "cdqe":
+
+            reads  = ["%rax"]
+            writes = ["%rax"]
+
+        elif base == "pop":
+
+            reads  = ["%rsp"]
+            writes = operands + ["%rsp"]
+
+        elif base == "push":
+
+            reads  = operands + ["%rsp"]
+            writes = ["%rsp"]
+
+        elif base == "xchg":
+
+            reads  = operands
+            writes = operands
+
+        elif base in READ_WRITE:
+
+            reads  = operands
+            writes = operands[-1:]
+
+        elif base in WRITE_ONLY:
+
+            reads  = operands[:-1]
+            writes = operands[-1:]
+
+        elif base in READ_ONLY:
+
+            reads  = operands
+
+        else:
+
+            reads  = operands
+            writes = operands[-1:] if len(operands) > 1 else []
+
+        # xor %rax, %rax and sub %rax, %rax do not depend on %rax
+        if base in ZERO_IDIOMS and len(operands) == 2 and operands[0] == operands[1] and operands[0].startswith("%"):
+
+            reads = []
+
+        loads  = [x for x in reads if is_memory(x)] if base != "lea" else []
+        stores = [x for x in writes if is_memory(x)]
+
+        return (registers_of(reads), registers_of(writes), loads, stores, base in FLAGS_READ,
+                base not in FLAGS_KEPT)
+
+
+def base_mnemonic(mnemonic):
+
+    """
+
+        The COSTS row of an AT&T mnemonic: without the operand size suffix, with the condition codes of jcc, setcc
+        and cmov folded
+
+    """
+
+    mnemonic = ALIASES.get(mnemonic, mnemonic)
+
+    if mnemonic in COSTS:
+
+        return mnemonic
+
+    if mnemonic.startswith("j") and mnemonic[1:] in CONDITIONS:
+
+        return "jcc"
+
+    if mnemonic.startswith("set") and mnemonic[3:] in CONDITIONS:
+
+        return "setcc"
+
+    if mnemonic.startswith("cmov") and (mnemonic[4:] in CONDITIONS or mnemonic[4:-1] in CONDITIONS):
+
+        return "cmov"
+
+    # movzbq, movslq, ...
+    if len(mnemonic) == 6 and mnemonic[:4] in ["movz", "movs"] and mnemonic[4] in SUFFIXES:
+
+        return "movzx" if mnemonic[3] == "z" else "movsx"
+
+    if mnemonic[-1] in SUFFIXES and mnemonic[:-1] in COSTS:
+
+        return mnemonic[:-1]
+
+    return mnemonic
+
+
+def split_operands(text):
+
+    """
+
+        The operands of an instruction, the commas inside the parentheses of a memory operand do not split
+
+    """
+
+    operands = []
+    depth    = 0
+    current  = ""
+
+    for character in text:
+
+        if character == "," and depth == 0:
+
+            operands.append(current.strip())
+            current = ""
+            continue
+
+        depth   += (character == "(") - (character == ")")
+        current += character
+
+    if current.strip() != "":
+
+        operands.append(current.strip())
+
+    return operands
+
+
+def is_memory(operand):
+
+    return not operand.startswith("%") and not operand.startswith("$") and "(" in operand
+
+
+def registers_of(operands):
+
+    """
+
+        The full registers an operand list reads or writes, the address registers of memory operands not included
+
+    """
+
+    return {REGISTERS.get(x[1:], x[1:]) for x in operands if x.startswith("%")}
+
+
+def address_registers(operand):
+
+    match = MEMORY_RE.match(operand.lstrip("*"))
+
+    if match is None:
+
+        return set()
+
+    return {REGISTERS.get(x.strip()[1:], x.strip()[1:]) for x in match.group(2).split(",")
+            if x.strip().startswith("%")} - {"rip"}
+
+
+def parse(text):
+
+    """
+
+        Returns the items of an assembly text in order, label names (str) and Instructions, and its global symbols
+
+    """
+
+    items   = []
+    symbols = []
+
+    for line_number, line in enumerate(text.splitlines(), 1):
+
+        line = line.split("#")[0].strip()
+
+        while True:
+
+            match = LABEL_RE.match(line)
+
+            if match is None:
+
+                break
+
+            items.append(match.group(1))
+            line = match.group(2).strip()
+
+        if line == "":
+
+            continue
+
+        if line.startswith("."):
+
+            match = GLOBL_RE.match(line)
+
+            if match is not None:
+
+                symbols.append(match.group(1))
+
+            continue
+
+        parts = line.split(None, 1)
+
+        items.append(Instruction(line_number, line, parts[0], split_operands(parts[1]) if len(parts) > 1 else []))
+
+    return items, symbols
+
+
+class Block:
+
+    def __init__(self, index, labels):
+
+        self.index        = index
+        self.labels       = labels
+        self.instructions = []
+        self.successors   = []
+        self.calls        = []
+
+    def name(self):
+
+        # A symbol rather than a local label of the assembler (.L...)
+        named = [x for x in self.labels if not x.startswith(".")] + self.labels
+
+        return named[0] if len(named) > 0 else "@" + str(self.index)
+
+    def estimate(self, worst=False):
+
+        """
+
+            The critical path and the throughput bound of the block in cycles, calls not included
+
+        """
+
+        ready      = {}
+        critical   = 0.0
+        throughput = 0.0
+
+        for instruction in self.instructions:
+
+            _, latency, worst_latency, reciprocal              = instruction.cost()
+            reads, writes, loads, stores, flags_read, flags_set = instruction.effects()
+
+            sources = set(reads) | set().union(*[address_registers(x) for x in loads + stores])
+            sources = sources | ({FLAGS} if flags_read else set()) | set(loads)
+            start   = max([ready.get(x, 0.0) for x in sources] + [0.0])
+            end     = start + (worst_latency if worst else latency) + (LOAD_LATENCY if len(loads) > 0 else 0)
+
+            for location in set(writes) | set(stores) | ({FLAGS} if flags_set else set()):
+
+                ready[location] = end
+
+            critical    = max(critical, end)
+            throughput += reciprocal
+
+        return critical, throughput, max(critical, throughput)
+
+
+def blocks_of(items):
+
+    """
+
+        The basic blocks of the items of parse, with the successors of each block
+
+    """
+
+    blocks  = []
+    current = Block(0, [])
+
+    for item in items:
+
+        if isinstance(item, str):
+
+            if len(current.instructions) > 0:
+
+                blocks.append(current)
+                current = Block(len(blocks), [])
+
+            current.labels.append(item)
+            continue
+
+        current.instructions.append(item)
+
+        if item.base in ["jmp", "jcc", "ret"]:
+
+            blocks.append(current)
+            current = Block(len(blocks), [])
+
+    if len(current.instructions) > 0 or len(current.labels) > 0:
+
+        blocks.append(current)
+
+    labels = {label: block.index for block in blocks for label in block.labels}
+
+    for block in blocks:
+
+        last      = block.instructions[-1] if len(block.instructions) > 0 else None
+        following = [block.index + 1] if block.index + 1 < len(blocks) else []
+
+        if last is not None and last.base in ["jmp", "jcc"]:
+
+            target = last.target()
+
+            block.successors = [labels[target]] if target in labels else []
+
+            if last.base == "jcc":
+
+                block.successors += following
+
+        elif last is None or last.base != "ret":
+
+            block.successors = following
+
+        block.calls = [labels[x.target()] for x in block.instructions if x.base == "call" and x.target() in labels]
+
+    return blocks, labels
+
+
+class Analysis:
+
+    """
+
+        blocks      - the Blocks of the assembly
+        entry       - the index of the block of the exported function
+        mix         - instructions of every class of COSTS
+        paths       - count, cheapest and most expensive path in cycles, loops (back edges cut) and non-exiting
+                      loops of the entry
+        findings    - (line number, instruction, kind) of the secret branches, secret addresses and variable latency
+                      instructions
+
+    """
+
+    def __init__(self, text, entry=None):
+
+        items, symbols      = parse(text)
+        self.blocks, labels = blocks_of(items)
+        self.instructions   = [x for x in items if isinstance(x, Instruction)]
+        self.mix            = {}
+        self.findings       = []
+        self.estimates      = {}
+        self.loads          = 0
+        self.stores         = 0
+
+        for instruction in self.instructions:
+
+            kind           = instruction.cost()[0]
+            self.mix[kind] = self.mix.get(kind, 0) + 1
+            effects        = instruction.effects()
+            self.loads    += len(effects[2])
+            self.stores   += len(effects[3])
+
+        if entry is None:
+
+            # jasminc writes both f0 and _f0, the first global that labels a block is the export
+            entry = next((x for x in symbols if x in labels), None)
+
+        self.entry = labels.get(entry, 0) if len(self.blocks) > 0 else None
+        self.paths = self.path_costs(self.entry, 0) if self.entry is not None else (0, 0.0, 0.0, 0, 0)
+
+        if self.entry is not None:
+
+            self.taint()
+
+    def block_estimate(self, index, worst):
+
+        if (index, worst) not in self.estimates:
+
+            self.estimates[(index, worst)] = self.blocks[index].estimate(worst)[2]
+
+        return self.estimates[(index, worst)]
+
+    def reachable(self, entry):
+
+        """
+
+            The blocks reachable from entry in depth first order and the back edges
+
+        """
+
+        order   = []
+        back    = set()
+        state   = {entry: 1}
+        stack   = [(entry, iter(self.blocks[entry].successors))]
+
+        while stack:
+
+            index, successors = stack[-1]
+            successor         = next(successors, None)
+
+            if successor is None:
+
+                state[index] = 2
+                order.append(index)
+                stack.pop()
+
+            elif state.get(successor) == 1:
+
+                back.add((index, successor))
+
+            elif successor not in state:
+
+                state[successor] = 1
+                stack.append((successor, iter(self.blocks[successor].successors)))
+
+        return order[::-1], back
+
+    def path_costs(self, entry, depth):
+
+        """
+
+            count, cheapest and most expensive path from entry to a ret, the loops on the way and the blocks that
+            never reach a ret (non-exiting loops), by dynamic programming over the blocks in reverse topological
+            order with the back edges cut. A block from which no ret can be reached has no paths (None)
+
+        """
+
+        order, back = self.reachable(entry)
+        paths       = {}
+        non_exiting = 0
+
+        for index in reversed(order):
+
+            block      = self.blocks[index]
+            low        = self.block_estimate(index, False)
+            high       = self.block_estimate(index, True)
+
+            for callee in block.calls:
+
+                if depth < MAX_CALL_DEPTH:
+
+                    _, callee_low, callee_high, _, _ = self.path_costs(callee, depth + 1)
+
+                    low  += callee_low
+                    high += callee_high
+
+            forward    = [x for x in block.successors if (index, x) not in back]
+            successors = [paths[x] for x in forward if paths[x] is not None]
+
+            if len(block.instructions) > 0 and block.instructions[-1].base == "ret":
+
+                paths[index] = (1, low, high)
+
+            elif len(successors) > 0:
+
+                paths[index] = (sum(x[0] for x in successors), low + min(x[1] for x in successors),
+                                high + max(x[2] for x in successors))
+
+            else:
+
+                paths[index] = None
+
+                if len(forward) == 0:
+
+                    non_exiting += 1
+
+        count, low, high = paths[entry] if paths[entry] is not None else (0, 0.0, 0.0)
+
+        return count, low, high, len(back), non_exiting
+
+    def transfer(self, instruction, tainted, report):
+
+        """
+
+            The tainted locations after an instruction, reports its findings when report is set
+
+        """
+
+        reads, writes, loads, stores, flags_read, flags_set = instruction.effects()
+
+        addresses = set().union(*[address_registers(x) for x in loads + stores])
+        secret    = (any(x in tainted for x in reads) or any(x in tainted or ANY_MEMORY in tainted for x in loads)
+                     or (flags_read and FLAGS in tainted) or len(addresses & tainted) > 0)
+
+        if report:
+
+            if instruction.base == "jcc" and FLAGS in tainted:
+
+                self.findings.append((instruction.line_number, instruction.text, "secret branch"))
+
+            if len(addresses & tainted) > 0:
+
+                self.findings.append((instruction.line_number, instruction.text, "secret address"))
+
+            if instruction.base in VARIABLE:
+
+                self.findings.append((instruction.line_number, instruction.text,
+                                      "secret variable latency" if secret else "variable latency"))
+
+        tainted = set(tainted)
+
+        if instruction.base == "call":
+
+            # The callee sees the same secrets, what it returns is secret when any argument is
+            secret    = any(x in tainted for x in ARGUMENTS)
+            writes    = set(CALLER_SAVED)
+            flags_set = True
+
+        if len(stores) > 0 and len(addresses & tainted) > 0 and secret:
+
+            tainted.add(ANY_MEMORY)
+
+        for location in set(writes) | set(stores) | ({FLAGS} if flags_set else set()):
+
+            if secret:
+
+                tainted.add(location)
+
+            else:
+
+                tainted.discard(location)
+
+        return tainted
+
+    def taint(self):
+
+        """
+
+            The fixed point of the tainted locations at the start of every block, then one pass that reports
+            the findings
+
+        """
+
+        entries = {self.entry: set(ARGUMENTS)}
+        work    = [self.entry]
+
+        # The functions the export calls start with their arguments secret
+        for block in self.blocks:
+
+            for callee in block.calls:
+
+                entries[callee] = set(ARGUMENTS)
+                work.append(callee)
+
+        while work:
+
+            index   = work.pop()
+            tainted = entries[index]
+
+            for instruction in self.blocks[index].instructions:
+
+                tainted = self.transfer(instruction, tainted, False)
+
+            for successor in self.blocks[index].successors:
+
+                merged = entries.get(successor, set()) | tainted
+
+                if successor not in entries or merged != entries[successor]:
+
+                    entries[successor] = merged
+                    work.append(successor)
+
+        for index in sorted(entries):
+
+            tainted = entries[index]
+
+            for instruction in self.blocks[index].instructions:
+
+                tainted = self.transfer(instruction, tainted, True)
+
+        self.findings.sort()
+
+    def counts(self):
+
+        kinds = [x[2] for x in self.findings]
+
+        return {kind: kinds.count(kind) for kind in ["secret branch", "secret address", "variable latency",
+                                                     "secret variable latency"]}
+
+    def constant_time(self):
+
+        counts = self.counts()
+
+        return counts["secret branch"] + counts["secret address"] + counts["secret variable latency"] == 0
+
+    def row(self):
+
+        count, low, high, loops, non_exiting = self.paths
+        counts                               = self.counts()
+
+        return {"Instructions": len(self.instructions), "Loads": self.loads, "Stores": self.stores,
+                "Blocks": len(self.blocks), "Paths": count, "Loops": loops, "NonExiting": non_exiting,
+                "MinCycles": low, "MaxCycles": high, "Spread": high - low,
+                "SecretBranches": counts["secret branch"], "SecretAddresses": counts["secret address"],
+                "VariableLatency": counts["variable latency"] + counts["secret variable latency"],
+                "SecretVariableLatency": counts["secret variable latency"], "ConstantTime": self.constant_time(),
+                "Mix": json.dumps(self.mix, sort_keys=True)}
+
+    def print_report(self, file=sys.stdout):
+
+        print("INSTRUCTIONS:", len(self.instructions), "LOADS:", self.loads, "STORES:", self.stores, file=file)
+        print("%-12s %8s" % ("Class", "Count"), file=file)
+
+        for kind, count in sorted(self.mix.items(), key=lambda x: -x[1]):
+
+            print("%-12s %8d" % (kind, count), file=file)
+
+        print("%-20s %6s %10s %10s %10s %10s" % ("Block", "Insns", "Latency", "Throughput", "Cycles", "Worst"),
+              file=file)
+
+        for block in self.blocks:
+
+            critical, throughput, cycles = block.estimate()
+
+            print("%-20s %6d %10.2f %10.2f %10.2f %10.2f" % (block.name()[:20], len(block.instructions), critical,
+                                                             throughput, cycles, block.estimate(True)[2]), file=file)
+
+        count, low, high, loops, non_exiting = self.paths
+
+        print("PATHS:", count, "CYCLES:", "%.2f - %.2f" % (low, high), "LOOPS:", loops, "NON-EXITING LOOPS:",
+              non_exiting, file=file)
+
+        for line_number, text, kind in self.findings:
+
+            print("%5d  %-24s %s" % (line_number, kind, text), file=file)
+
+        print("CONSTANT TIME" if self.constant_time() else "NOT CONSTANT TIME", file=file)
+
+
+def analyse(text, entry=None):
+
+    return Analysis(text, entry)
+
+
+def analyse_file(path, entry=None):
+
+    with open(path, "r") as file:
+
+        return Analysis(file.read(), entry)
+
+
+def analyse_seeds(seeds, config, generator_options=None):
+
+    """
+
+        Yields seed and the row of the Analysis of its assembly, or None when it did not compile
+
+    """
+
+    import jasminBackend as JBE
+    import jasminFuzzer as JF
+    import jasminGenerator as JPG
+    import jasminHarness as JH
+    import jasminPolicy as JPO
+    import jasminScratch as JSC
+
+    options  = {} if generator_options is None else generator_options
+    compiler = JBE.from_config(config)
+    scratch  = JSC.ScratchSpace(config["scratch_path"], prefix="jazzycost", memfd=config["scratch_memfd"])
+
+    try:
+
+        for seed in seeds:
+
+            source        = JF.render(JPG.JasminGenerator(seed, **options))
+            source_file   = scratch.write("test.jazz", source)
+            assembly_file = scratch.path("jazz.s")
+
+            if os.path.exists(assembly_file):
+
+                os.remove(assembly_file)
+
+            process = JPO.start_compiler(compiler, source_file, assembly_file, scratch.pass_fds())
+
+            JPO.finish(process)
+
+            if process.returncode != 0 or not os.path.exists(assembly_file):
+
+                yield seed, None
+                continue
+
+            with open(assembly_file, "r") as file:
+                assembly = file.read()
+
+            if assembly.startswith(JBE.SIMULATED):
+
+                raise ValueError("the simulated backend writes no assembly to analyse")
+
+            yield seed, Analysis(assembly, JH.export_name(source)).row()
+
+    finally:
+
+        scratch.close()
+
+
+def main(config=None):
+
+    if len(sys.argv) < 2:
+
+        print(__doc__)
+        sys.exit(1)
+
+    if not sys.argv[1].isdigit():
+
+        entry = None
+
+        if "--entry" in sys.argv:
+
+            entry = sys.argv[sys.argv.index("--entry") + 1]
+            del sys.argv[sys.argv.index("--entry"):sys.argv.index("--entry") + 2]
+
+        for path in sys.argv[1:]:
+
+            print(path)
+            analyse_file(path, entry).print_report()
+
+        return
+
+    import pandas as pd
+
+    import jasminConfig as JCF
+
+    config      = JCF.load() if config is None else config
+    terminating = "--terminating" in sys.argv
+
+    if terminating:
+        sys.argv.remove("--terminating")
+
+    start   = int(sys.argv[1])
+    end     = int(sys.argv[2])
+    rows    = []
+    failed  = 0
+    begin   = time.time()
+
+    for seed, row in analyse_seeds(range(start, end), config, {"terminating": terminating}):
+
+        if row is None:
+
+            failed += 1
+            continue
+
+        rows.append(dict(Seed=seed, **row))
+
+    results = pd.DataFrame(rows)
+    path    = config["data_path"] + "cost_" + str(start) + "_" + str(end) + ".csv"
+
+    results.to_csv(path)
+
+    print("ANALYSED:", len(rows), "FAILED TO COMPILE:", failed, "TIME: %.2f s" % (time.time() - begin))
+
+    if len(rows) > 0:
+
+        print("CONSTANT TIME:", int(results["ConstantTime"].sum()), "SECRET BRANCHES:",
+              int((results["SecretBranches"] > 0).sum()), "SECRET VARIABLE LATENCY:",
+              int((results["SecretVariableLatency"] > 0).sum()))
+        print(results.sort_values("Spread", ascending=False).head(10)[["Seed", "Instructions", "MinCycles",
+                                                                        "MaxCycles", "Spread", "SecretBranches",
+                                                                        "ConstantTime"]].to_string(index=False))
+
+    print("RESULTS:", path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,474 @@
+"""
+
+    Differential compilation over a matrix of jasminc builds and flags.
+
+    A campaign tests one compiler binary with one set of flags. The differential mode compiles every program with
+    every cell of a matrix, a JSON file
+
+        {
+            "cells"   : [
+                {"name": "release", "compiler_path": "/opt/jasmin-2023.06/jasminc", "flags": []},
+                {"name": "main",    "compiler_path": "jasminc",                     "flags": []},
+                {"name": "lazy",    "compiler_path": "jasminc",                     "flags": ["-lazy-regalloc"]}
+            ],
+            "ignore"  : ["warning"],
+            "timeout" : 5
+        }
+
+    (a bare list of cells is the same matrix with the defaults). A cell compiles the program (jasminc -o) and safety
+    checks it (jasminc -checksafety) with its flags, and when the compiler succeeded links the assembly with the
+    batch harness (see jasminHarness) and runs it on INPUTS. The cells of a program run in parallel, every
+    (program, cell) pair in its own worker thread, and the programs are generated with bounded while loops so the
+    harness runs terminate.
+
+    The cells of a program disagree on
+
+        errors      - the error classes (see jasminFuzzer.error_classes) without the ignored signatures
+        safety      - the safety verdict
+        harness     - whether linking or running the compiled program with the harness failed
+        outputs     - the results of the inputs that every cell that ran the program completed
+        timeout     - whether the harness run timed out
+
+    A harness failure is kept apart from the compiler's errors with its whole message, which names the temporary
+    files of gcc and ld and so differs between any two runs; only whether the harness failed is compared.
+
+    Every result is cached in an SQLite database under (program hash, cell hash). The program hash is the sha1 of the
+    code without the comment header, the cell hash covers the sha1 of the compiler binary, the flags and the inputs,
+    so the name of a cell can change freely, a rebuilt compiler is a new cell, and adding a cell to the matrix only
+    runs that column. A result is stored with the harness timeout it ran with and only reused under the same timeout,
+    a program that timed out at 1 second may well finish at 5.
+
+
+    Methods:
+
+        load_matrix:
+
+            - the cells, ignored signatures and timeout of a matrix file
+
+        Cell.evaluate:
+
+            - compile, safety check and run one program
+
+        Differential.run:
+
+            - the results of every cell for a seed range, with the disagreements
+
+
+    Usage:
+
+        python jasminDifferential.py <matrix.json> <start> <end> [--workers N] [--cache <differential.sqlite>]
+
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import jasminBackend as JBE
+import jasminConfig as JCF
+import jasminFuzzer as JF
+import jasminGenerator as JPG
+import jasminHarness as JH
+import jasminPolicy as JPO
+import jasminScratch as JSC
+import jasminStore as JRS
+
+
+SCHEMA = """
+
+    CREATE TABLE IF NOT EXISTS results (
+        program             TEXT NOT NULL,
+        cell                TEXT NOT NULL,
+        compile_errors      TEXT,
+        safety_errors       TEXT,
+        safe                INTEGER,
+        compiled            INTEGER,
+        outputs             BLOB,
+        timed_out           INTEGER NOT NULL DEFAULT 0,
+        time                REAL,
+        harness             TEXT,
+        timeout             REAL,
+        PRIMARY KEY (program, cell)
+    );
+
+"""
+
+# Harness failures used to be cached as a "HARNESS: <first line>" compile error
+HARNESS = "HARNESS: "
+
+# Boundary values first, then a fixed random sample, the same for every cell and every program
+INPUTS  = np.concatenate([np.array([0, 1, -1, 2, 7, 63, 64, 255, 256, 2**31 - 1, -2**31, 2**32 - 1, 2**63 - 1,
+                                    -2**63], dtype=np.int64),
+                          np.random.RandomState(0).randint(-2**63, 2**63 - 1, size=50, dtype=np.int64)])
+
+BATCH   = 64
+
+
+def file_hash(path):
+
+    sha1 = hashlib.sha1()
+
+    with open(path, "rb") as file:
+
+        for block in iter(lambda: file.read(1 << 20), b""):
+
+            sha1.update(block)
+
+    return sha1.hexdigest()
+
+
+def program_hash(source):
+
+    """
+
+        The sha1 of a program without its comment lines, see jasminStore.program_hash, which the result store keys
+        programs on too
+
+    """
+
+    return JRS.program_hash(source)
+
+
+class Cell:
+
+    def __init__(self, name, compiler_path, flags=(), inputs=INPUTS):
+
+        resolved = shutil.which(compiler_path)
+
+        if resolved is None:
+
+            raise ValueError("cell " + name + ": no compiler " + compiler_path)
+
+        self.name          = name
+        self.compiler_path = resolved
+        self.flags         = list(flags)
+        self.inputs        = inputs
+        self.backend       = JBE.JasminBackend(resolved)
+        self.hash          = hashlib.sha1(json.dumps([file_hash(resolved), self.flags,
+                                                      hashlib.sha1(inputs.tobytes()).hexdigest()])
+                                          .encode("utf-8")).hexdigest()
+
+    def evaluate(self, source, scratch, timeout):
+
+        """
+
+            Returns compile errors, safety errors, safe, compiled, outputs (int64 array or None), timed out and the
+            harness error (None if the harness linked and ran, or the program did not compile)
+
+        """
+
+        source_file   = scratch.write(self.hash + ".jazz", source)
+        assembly_file = scratch.path(self.hash + ".s")
+        binary_file   = scratch.path(self.hash)
+
+        if os.path.exists(assembly_file):
+
+            os.remove(assembly_file)
+
+        compile = JPO.start_compiler(self.backend, source_file, assembly_file, scratch.pass_fds(), self.flags)
+        safety  = JPO.start_safety_check(self.backend, source_file, scratch.pass_fds(), self.flags)
+
+        compile_errors = JPO.finish(compile).splitlines()
+        result         = JPO.finish(safety)
+        compiled       = compile.returncode == 0 and os.path.exists(assembly_file)
+        outputs        = None
+        timed_out      = False
+        harness        = None
+
+        if compiled:
+
+            try:
+
+                self.backend.assemble(assembly_file, binary_file, JH.export_name(source))
+
+                run       = self.backend.run(binary_file, self.inputs, timeout)
+                outputs   = run.values
+                timed_out = run.timed_out
+
+            except JH.HarnessError as error:
+
+                harness = str(error)
+
+        return (compile_errors, JPO.safety_lines(result), "Program is not safe!" not in result, compiled, outputs,
+                timed_out, harness)
+
+
+def load_matrix(path):
+
+    with open(path, "r") as file:
+        matrix = json.load(file)
+
+    if isinstance(matrix, list):
+
+        matrix = {"cells": matrix}
+
+    cells = [Cell(x["name"], x["compiler_path"], x.get("flags", [])) for x in matrix["cells"]]
+
+    if len(set(x.name for x in cells)) != len(cells):
+
+        raise ValueError("the names of the cells are not unique")
+
+    return cells, matrix.get("ignore", ["warning"]), matrix.get("timeout", 5)
+
+
+class Differential:
+
+    def __init__(self, cells, cache_path, ignore=("warning",), timeout=5, workers=None, scratch=None):
+
+        self.cells      = cells
+        self.ignore     = list(ignore)
+        self.timeout    = timeout
+        self.workers    = workers or os.cpu_count() or 1
+        self.scratch    = JSC.ScratchSpace(prefix="jazzydiff") if scratch is None else scratch
+        self.connection = sqlite3.connect(cache_path)
+        self.cached     = 0
+        self.ran        = 0
+
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+        if "harness" not in [x[1] for x in self.connection.execute("PRAGMA table_info(results)")]:
+
+            self.migrate()
+
+        if "timeout" not in [x[1] for x in self.connection.execute("PRAGMA table_info(results)")]:
+
+            # The results of an older cache have no timeout and are run again
+            with self.connection:
+                self.connection.execute("ALTER TABLE results ADD COLUMN timeout REAL")
+
+    def migrate(self):
+
+        """
+
+            Add the harness column to a cache written before it, moving the harness lines out of the compile errors
+
+        """
+
+        with self.connection:
+
+            self.connection.execute("ALTER TABLE results ADD COLUMN harness TEXT")
+
+            for program, cell, compile_errors in self.connection.execute("SELECT program, cell, compile_errors "
+                                                                         "FROM results").fetchall():
+
+                lines   = json.loads(compile_errors)
+                harness = [x[len(HARNESS):] for x in lines if x.startswith(HARNESS)]
+
+                if len(harness) > 0:
+
+                    self.connection.execute("UPDATE results SET compile_errors = ?, harness = ? "
+                                            "WHERE program = ? AND cell = ?",
+                                            (json.dumps([x for x in lines if not x.startswith(HARNESS)]),
+                                             harness[0], program, cell))
+
+    def close(self):
+
+        self.connection.close()
+        self.scratch.close()
+
+    def lookup(self, program, cell):
+
+        row = self.connection.execute("SELECT compile_errors, safety_errors, safe, compiled, outputs, timed_out, "
+                                      "harness FROM results WHERE program = ? AND cell = ? AND timeout = ?",
+                                      (program, cell.hash, self.timeout)).fetchone()
+
+        if row is None:
+
+            return None
+
+        return (json.loads(row[0]), json.loads(row[1]), bool(row[2]), bool(row[3]),
+                None if row[4] is None else np.frombuffer(row[4], dtype=np.int64), bool(row[5]), row[6])
+
+    def store(self, program, cell, result, seconds):
+
+        compile_errors, safety_errors, safe, compiled, outputs, timed_out, harness = result
+
+        self.connection.execute("INSERT OR REPLACE INTO results (program, cell, compile_errors, safety_errors, safe, "
+                                "compiled, outputs, timed_out, time, harness, timeout) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (program, cell.hash, json.dumps(compile_errors), json.dumps(safety_errors), int(safe),
+                                 int(compiled), None if outputs is None else outputs.tobytes(), int(timed_out),
+                                 seconds, harness, self.timeout))
+
+    def evaluate(self, cell, source):
+
+        start = time.time()
+
+        return cell.evaluate(source, self.scratch, self.timeout), time.time() - start
+
+    def classes(self, result):
+
+        return [x for x in JF.error_classes([result[0], result[1]])
+                if not any(x.startswith(signature + ": ") for signature in self.ignore)]
+
+    def disagreements(self, results):
+
+        """
+
+            The kinds of disagreement between the results of the cells of one program
+
+        """
+
+        kinds = []
+
+        if len(set(tuple(self.classes(x)) for x in results)) > 1:
+
+            kinds.append("errors")
+
+        if len(set(x[2] for x in results)) > 1:
+
+            kinds.append("safety")
+
+        # The message of a harness failure names temporary files, only whether it failed is compared
+        if len(set(x[6] is None for x in results if x[3])) > 1:
+
+            kinds.append("harness")
+
+        ran = [x for x in results if x[4] is not None]
+
+        if len(ran) > 1:
+
+            completed = min(len(x[4]) for x in ran)
+
+            if len(set(x[4][:completed].tobytes() for x in ran)) > 1:
+
+                kinds.append("outputs")
+
+            if len(set(x[5] for x in ran)) > 1:
+
+                kinds.append("timeout")
+
+        return kinds
+
+    def run(self, seeds, generator_options=None):
+
+        """
+
+            Yields seed, program hash, the result of every cell and the disagreements, the cells of a batch of
+            programs run in parallel and only the pairs missing from the cache are evaluated
+
+        """
+
+        options = {"terminating": True} if generator_options is None else generator_options
+        seeds   = list(seeds)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+
+            for batch_start in range(0, len(seeds), BATCH):
+
+                batch    = [(seed, JF.render(JPG.JasminGenerator(seed, **options)))
+                            for seed in seeds[batch_start:batch_start + BATCH]]
+                results  = {}
+                pending  = {}
+
+                for seed, source in batch:
+
+                    program = program_hash(source)
+
+                    for cell in self.cells:
+
+                        result = self.lookup(program, cell)
+
+                        if result is None:
+
+                            pending[(program, cell.name)] = (cell, executor.submit(self.evaluate, cell, source))
+
+                        else:
+
+                            results[(program, cell.name)] = result
+                            self.cached += 1
+
+                with self.connection:
+
+                    for (program, name), (cell, future) in pending.items():
+
+                        result, seconds = future.result()
+
+                        self.store(program, cell, result, seconds)
+
+                        results[(program, name)] = result
+                        self.ran += 1
+
+                for seed, source in batch:
+
+                    program = program_hash(source)
+                    cells   = [results[(program, x.name)] for x in self.cells]
+
+                    yield seed, program, cells, self.disagreements(cells)
+
+
+def main(config=None):
+
+    config = JCF.load() if config is None else config
+
+    if len(sys.argv) < 4:
+
+        print(__doc__)
+        sys.exit(1)
+
+    workers    = None
+    cache_path = config["data_path"] + "differential.sqlite"
+
+    if "--workers" in sys.argv:
+
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        del sys.argv[sys.argv.index("--workers"):sys.argv.index("--workers") + 2]
+
+    if "--cache" in sys.argv:
+
+        cache_path = sys.argv[sys.argv.index("--cache") + 1]
+        del sys.argv[sys.argv.index("--cache"):sys.argv.index("--cache") + 2]
+
+    cells, ignore, timeout = load_matrix(sys.argv[1])
+    start                  = int(sys.argv[2])
+    end                    = int(sys.argv[3])
+    differential           = Differential(cells, cache_path, ignore, timeout, workers,
+                                          JSC.ScratchSpace(config["scratch_path"], prefix="jazzydiff",
+                                                           memfd=config["scratch_memfd"]))
+    report_path            = config["data_path"] + "differential_" + str(start) + "_" + str(end) + ".jsonl"
+    counts                 = {}
+
+    with open(report_path, "w") as report:
+
+        for seed, program, results, kinds in differential.run(range(start, end)):
+
+            if len(kinds) == 0:
+
+                continue
+
+            for kind in kinds:
+
+                counts[kind] = counts.get(kind, 0) + 1
+
+            print("DISAGREEMENT SEED", seed, ":", ", ".join(kinds))
+
+            report.write(json.dumps({"seed": seed, "program": program, "kinds": kinds,
+                                     "cells": {cell.name: {"errors": differential.classes(result), "safe": result[2],
+                                                           "compiled": result[3],
+                                                           "outputs": None if result[4] is None
+                                                           else result[4].tolist(),
+                                                           "timed_out": result[5], "harness": result[6]}
+                                               for cell, result in zip(cells, results)}}) + "\n")
+
+    differential.close()
+
+    print("%-10s %8s" % ("Kind", "Programs"))
+
+    for kind in ["errors", "safety", "harness", "outputs", "timeout"]:
+
+        print("%-10s %8d" % (kind, counts.get(kind, 0)))
+
+    print("CELLS RUN:", differential.ran, "CACHED:", differential.cached, "REPORT:", report_path)
+
+
+if __name__ == '__main__':
+    main()
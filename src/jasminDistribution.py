@@ -1,3 +1,9 @@
+import contextlib
+import hashlib
+import json
+import os
+import sys
+
 import numpy as np
 from jasminNonterminalAndTokens import Nonterminals as JN
 from jasminTypes import JasminTypes as JT
@@ -15,10 +21,402 @@ def draw_from_dist(dist, seed):
     return values[val]
 
 
-class Functions:
+class Sampler:
+
+    """
+
+        A table compiled for drawing: the values, the values that can be drawn (p > 0) and the cumulative
+        distribution. draw(seed) returns exactly what draw_from_dist(table, seed) returns, np.random.choice draws
+        one random_sample and searches it in the same normalised cumsum, but the table is not converted and checked
+        again for every draw.
+
+    """
+
+    def __init__(self, table):
+
+        self.values     = list(table.keys())
+        self.options    = [x for x in table if table[x] > 0]
+        self.cdf        = np.asarray(list(table.values()), dtype=np.float64).cumsum()
+        self.cdf       /= self.cdf[-1]
+
+    def draw(self, seed):
+
+        np.random.seed(seed)
+
+        return self.values[int(self.cdf.searchsorted(np.random.random_sample(), side="right"))]
+
+
+def encode_key(key):
+
+    """
+
+        Stable string for a table or production key, e.g. JN.Pinstr, JT.U8, while or True
+
+    """
+
+    if isinstance(key, JN):
+
+        return "JN." + key.name
+
+    if isinstance(key, JT):
+
+        return "JT." + key.name
+
+    if isinstance(key, JS):
+
+        return "JS." + key.name
+
+    if key is None:
+
+        return "actions"
+
+    return str(key)
+
+
+def decode_key(name):
+
+    """
+
+        Inverse of encode_key, "JT.U128" -> JT.U128, "True" -> True, anything else stays a string
+
+    """
+
+    for prefix, enum in [("JN.", JN), ("JT.", JT), ("JS.", JS)]:
+
+        if name.startswith(prefix) and name[len(prefix):] in enum.__members__:
+
+            return enum[name[len(prefix):]]
+
+    if name in ["True", "False"]:
+
+        return name == "True"
+
+    return None if name == "actions" else name
+
+
+def derive_seed(seed, kind, index):
+
+    """
+
+        A 32 bit child seed of seed, e.g. derive_seed(seed, "child", 2) for the third child node
+
+    """
+
+    key = (str(seed) + "/" + kind + "/" + str(index)).encode("utf-8")
+
+    return int.from_bytes(hashlib.blake2b(key, digest_size=4).digest(), "little")
+
+
+class ChoiceSequence:
+
+    """
+
+        Every random decision of a generation goes through choose or integer. A decision is stored as a small
+        integer: the position of the chosen value in the options (only the values that can be drawn, simplest
+        first), or the offset of an integer from its lower bound. 0 is always the simplest decision.
+
+        Recording (replay=None) draws with the original draw function and stores the decision. Replaying takes the
+        decisions from a recorded or edited sequence instead and does not draw. Values out of range are clamped, so
+        every integer sequence describes a program. A replayed decision the generator cannot use (true where an
+        integer is needed) is redrawn by the generator and simply consumes the next value; once the sequence is
+        exhausted the remaining decisions are drawn from the seed again. An edited sequence can still ask for a
+        recursive production or a redraw again and again, so when replaying, a recursion deeper than depth_limit
+        (or as many redraws of one decision) forces the terminal production (see past_limit and force). Generating
+        does not apply the limit, the program of a seed stays the same; the deepest of 12000 generated programs
+        reached 85, so a recorded sequence still replays to its program. check_replay tests both.
+
+        With split seeding (split_seed set) the draws do not come from one running seed. Every node of the
+        derivation (see node) gets a seed derived from its parent's seed and its index among the parent's children,
+        and the k-th draw of a node is seeded with derive_seed(node seed, "draw", k). A different decision in one
+        subtree therefore leaves the draws of every other subtree untouched, and reseed (node path -> seed) can
+        regenerate a single subtree while the rest of the program stays the same.
+
+    """
+
+    depth_limit = 128
+
+    def __init__(self, replay=None, split_seed=None, reseed=None):
+
+        self.replay     = None if replay is None else [int(x) for x in replay]
+        self.position   = 0
+        self.recorded   = []
+
+        # Split seeding, a stack of [seed, children, draws, path] of the open nodes
+        self.nodes      = None if split_seed is None else [[split_seed, 0, 0, ()]]
+        self.reseed     = {} if reseed is None else reseed
+        self.node_log   = []
+        self.current    = None
+
+    @contextlib.contextmanager
+    def node(self, label=""):
+
+        parent      = self.nodes[-1]
+        path        = parent[3] + (parent[1],)
+        seed        = self.reseed.get(path, derive_seed(parent[0], "child", parent[1]))
+        parent[1]  += 1
+
+        self.nodes.append([seed, 0, 0, path])
+        self.node_log.append((path, label))
+
+        try:
+
+            yield
+
+        finally:
+
+            self.nodes.pop()
+
+    def split_draw(self):
+
+        """
+
+            Seed np.random for the next draw of the current node
+
+        """
+
+        if self.nodes is not None:
+
+            node          = self.nodes[-1]
+            self.current  = derive_seed(node[0], "draw", node[2])
+            node[2]      += 1
+
+            np.random.seed(self.current)
+
+    def draw_seed(self, seed):
+
+        """
+
+            The seed draw_from_dist uses, the distribution's own running seed unless seeding is split
+
+        """
+
+        return seed if self.nodes is None else self.current
+
+    def next_replayed(self, size):
+
+        """
+
+            The next replayed decision clamped to [0, size), None when recording or when the sequence is exhausted
+
+        """
+
+        if self.replay is None or self.position >= len(self.replay):
+
+            return None
+
+        value = self.replay[self.position]
+        self.position += 1
+
+        return min(max(value, 0), size - 1)
+
+    def choose(self, draw, options):
+
+        rank = self.next_replayed(len(options))
+
+        if rank is not None:
+
+            value = options[rank]
+
+        else:
+
+            self.split_draw()
+            value = draw()
+            rank  = options.index(value)
+
+        self.recorded.append(rank)
+
+        return value
+
+    def past_limit(self, depth):
+
+        """
+
+            True when replaying past depth_limit, the generator then forces the terminal production
+
+        """
+
+        return self.replay is not None and depth >= self.depth_limit
+
+    def force(self, value, options):
+
+        """
+
+            Take value without a decision. The replayed decision at this position is consumed all the same, so the
+            rest of the sequence keeps its positions, and the rank of value is recorded in its place
+
+        """
+
+        self.next_replayed(len(options))
+        self.recorded.append(options.index(value) if value in options else 0)
+
+        return value
+
+    def integer(self, draw, low, high):
+
+        """
+
+            An integer in [low, high)
+
+        """
+
+        offset = self.next_replayed(high - low)
+
+        if offset is not None:
+
+            value = low + offset
+
+        else:
+
+            self.split_draw()
+            value = draw()
+
+        self.recorded.append(int(value) - low)
+
+        return value
+
+    def array(self):
+
+        """
+
+            The decisions as a compact integer array
+
+        """
+
+        return np.asarray(self.recorded, dtype=np.min_scalar_type(max(self.recorded, default=0)))
+
+
+class Distribution:
+
+    """
+
+        Shared part of the distribution classes. draw takes a decision from actions (sub=None) or one of the
+        sub_actions tables and remembers it as (sub, value) in productions. set_weights overrides the probabilities
+        of a table, the tables are addressed by their encode_key name. All decisions go through choices, which the
+        generator shares between its distributions.
+
+    """
 
     def __init__(self, seed):
-        self.seed = seed
+
+        self.seed        = seed
+        self.productions = []
+        self.choices     = ChoiceSequence()
+        self.samplers    = {}
+
+    def table(self, sub=None):
+
+        return self.actions if sub is None else self.sub_actions[sub]
+
+    def tables(self):
+
+        result = {"actions": (None, self.actions)}
+
+        for sub in self.sub_actions:
+
+            result[encode_key(sub)] = (sub, self.sub_actions[sub])
+
+        return result
+
+    def sampler(self, sub=None):
+
+        key = encode_key(sub)
+
+        if key not in self.samplers:
+
+            self.samplers[key] = Sampler(self.table(sub))
+
+        return self.samplers[key]
+
+    def draw(self, sub=None):
+
+        sampler = self.sampler(sub)
+        value   = self.choices.choose(lambda: sampler.draw(self.choices.draw_seed(self.seed)), sampler.options)
+        self.productions.append((sub, value))
+
+        return value
+
+    def force(self, sub, value):
+
+        value = self.choices.force(value, self.sampler(sub).options)
+        self.productions.append((sub, value))
+
+        return value
+
+    def draw_limited(self, sub, terminal, depth):
+
+        """
+
+            draw, or the terminal production when replaying past the depth limit
+
+        """
+
+        return self.force(sub, terminal) if self.choices.past_limit(depth) else self.draw(sub)
+
+    def reject(self, rejection_prob):
+
+        options = [x for x, p in [(False, 1 - rejection_prob), (True, rejection_prob)] if p > 0]
+
+        return self.choices.choose(lambda: np.random.choice([True, False], p=[rejection_prob, 1 - rejection_prob]),
+                                   options)
+
+    def integer(self, low, high):
+
+        return self.choices.integer(lambda: np.random.randint(low=low, high=high, size=1)[0], low, high)
+
+    def set_weights(self, table_name, weights):
+
+        """
+
+            weights maps encoded productions to new weights, productions that are missing keep their probability.
+            The table is renormalised afterwards.
+
+        """
+
+        sub, table = self.tables()[table_name]
+        new_table  = {}
+
+        for key in table:
+
+            new_table[key] = weights.get(encode_key(key), table[key])
+
+        total = sum(new_table.values())
+
+        for key in new_table:
+
+            new_table[key] = new_table[key] / total
+
+        self.replace_table(sub, new_table)
+
+    def set_tables(self, tables):
+
+        """
+
+            Replace whole tables, tables maps encoded table names to encoded productions and their probabilities
+            (the tables of a distribution config)
+
+        """
+
+        for table_name, weights in tables.items():
+
+            self.replace_table(self.tables()[table_name][0], {decode_key(x): p for x, p in weights.items()})
+
+    def replace_table(self, sub, table):
+
+        if sub is None:
+
+            self.actions = table
+
+        else:
+
+            self.sub_actions[sub] = table
+
+        self.samplers.pop(encode_key(sub), None)
+
+
+class Functions(Distribution):
+
+    def __init__(self, seed):
+        super().__init__(seed)
         self.actions = {
             JN.Pfundef : 0.5,
             JN.Storage : 0.1,
@@ -45,11 +443,11 @@ class Functions:
 
     def get_amount_of_decls(self):
 
-        return np.random.randint(low=0, high=10, size=1)[0]
+        return self.integer(0, 10)
 
     def get_amount_of_instructions(self):
 
-        return np.random.randint(low=0, high=2, size=1)[0]
+        return self.integer(0, 2)
 
     def get_action(self, sub=None, r_depth=0):
 
@@ -57,21 +455,21 @@ class Functions:
 
         if sub is not None:
 
-            return draw_from_dist(self.sub_actions[sub], self.seed)
+            return self.draw(sub)
 
         else:
 
-            return draw_from_dist(self.actions, self.seed)
+            return self.draw()
 
 
-class Instructions:
+class Instructions(Distribution):
 
     def __init__(self, seed):
 
         self.h      = 4
         self.n      = 3.5
 
-        self.seed = seed
+        super().__init__(seed)
         self.actions = {
             JN.Pinstr : 1,
             JN.Pblock : 0,
@@ -130,7 +528,7 @@ class Instructions:
 
     def get_amount_of_instructions(self):
 
-        return np.random.randint(low=1, high=2, size=1)[0]
+        return self.integer(1, 2)
 
     def recursive_prob(self, r_depth):
 
@@ -151,38 +549,36 @@ class Instructions:
     
                 """
 
-                action = draw_from_dist(self.sub_actions[JN.Pinstr], self.seed)
-                rejection_prob = self.recursive_prob(r_depth)
-
-                if action in ["if", "ifelse", "forto", "fordown", "while"]:
-
-                    reject = np.random.choice([True, False], p=[rejection_prob, 1 - rejection_prob])
-
-                    if reject:
+                action          = self.draw_limited(JN.Pinstr, "assign", r_depth)
+                rejection_prob  = self.recursive_prob(r_depth)
+                redraws         = 0
 
-                        return self.get_action(sub=sub, r_depth=r_depth)
+                while action in ["if", "ifelse", "forto", "fordown", "while"] and self.reject(rejection_prob):
 
-                    else:
+                    self.productions.pop()
+                    self.seed  += 1
+                    redraws    += 1
+                    action      = self.draw_limited(JN.Pinstr, "assign", max(r_depth, redraws))
 
-                        return action
+                return action
 
-                else:
+            elif sub == JN.Plvalue:
 
-                    return action
+                return self.draw_limited(JN.Plvalue, JN.Var, r_depth)
 
             else:
 
-                return draw_from_dist(self.sub_actions[sub], self.seed)
+                return self.draw(sub)
 
         else:
 
-            return draw_from_dist(self.actions, self.seed)
+            return self.draw()
 
 
-class Types:
+class Types(Distribution):
 
     def __init__(self, seed):
-        self.seed = seed
+        super().__init__(seed)
         self.actions = {
             JN.Ptype : 0.5,
             JN.Utype : 0.5
@@ -242,21 +638,24 @@ class Types:
 
         if sub is not None:
 
-            return draw_from_dist(self.sub_actions[sub], self.seed)
+            return self.draw(sub)
 
         else:
 
-            return draw_from_dist(self.actions, self.seed)
+            return self.draw()
 
 
-class Expressions:
+class Expressions(Distribution):
 
     def __init__(self, seed):
 
         self.h      = 4
         self.n      = 3.5
 
-        self.seed   = seed
+        # Terminal expressions of the wrong type drawn again in a row, set by the generator (see get_action)
+        self.retries = 0
+
+        super().__init__(seed)
         self.actions= {
             JN.Pexpr: 1.0,
             JN.Ident: 0.0,
@@ -337,7 +736,7 @@ class Expressions:
 
             if scope == JS.Number:
 
-                return draw_from_dist(self.sub_actions[JS.Number], self.seed)
+                return self.draw_limited(JS.Number, "int", r_depth + self.retries)
 
             elif sub == JN.Pexpr:
 
@@ -348,38 +747,34 @@ class Expressions:
                  
                 """
 
-                action          = draw_from_dist(self.sub_actions[JN.Pexpr], self.seed)
+                terminal        = "true" if scope == JT.BOOL else "int"
+                depth           = r_depth + self.retries
+                action          = self.draw_limited(JN.Pexpr, terminal, depth)
                 rejection_prob  = self.recursive_prob(r_depth)
+                redraws         = 0
 
-                if action in ["array", "negvar", "exp"]:
+                while action in ["array", "negvar", "exp"] and self.reject(rejection_prob):
 
-                    reject = np.random.choice([True, False], p=[rejection_prob, 1-rejection_prob])
+                    self.productions.pop()
+                    self.seed  += 1
+                    redraws    += 1
+                    action      = self.draw_limited(JN.Pexpr, terminal, max(depth, redraws))
 
-                    if reject:
-
-                        return self.get_action(sub=sub, scope=scope, r_depth=r_depth)
-
-                    else:
-
-                        return action
-
-                else:
-
-                    return action
+                return action
 
             else:
 
-                return draw_from_dist(self.sub_actions[sub], self.seed)
+                return self.draw(sub)
 
         else:
 
-            return draw_from_dist(self.actions, self.seed)
+            return self.draw()
 
 
-class GlobalDeclarations:
+class GlobalDeclarations(Distribution):
 
     def __init__(self, seed):
-        self.seed = seed
+        super().__init__(seed)
         self.actions = {
             #JN.Module   : 0.01,
             #JN.Top      : 0.25,
@@ -415,8 +810,358 @@ class GlobalDeclarations:
 
         if sub is not None:
 
-            return draw_from_dist(self.sub_actions[sub], self.seed)
+            return self.draw(sub)
 
         else:
 
-            return draw_from_dist(self.actions, self.seed)
+            return self.draw()
+
+
+"""
+
+    Swarm testing: every feature is a group of productions (distribution name, encoded table, encoded production)
+    that is switched off together. The productions every table falls back to (assign, int, variables, u64, =) are in
+    no feature, so every table keeps a production that can always be drawn.
+
+"""
+
+SWARM_FEATURES = {
+
+    "if"            : [("Instructions", "JN.Pinstr", "if"), ("Instructions", "JN.Pinstr", "ifelse")],
+    "for"           : [("Instructions", "JN.Pinstr", "forto"), ("Instructions", "JN.Pinstr", "fordown")],
+    "while"         : [("Instructions", "JN.Pinstr", "while")],
+    "arrays"        : [("Types", "JN.Ptype", "array"), ("Expressions", "JN.Pexpr", "array"),
+                       ("Expressions", "JS.Number", "array"), ("Instructions", "JN.Plvalue", "array")],
+    "u8"            : [("Types", "JN.Utype", "JT.U8"), ("Types", "eval_type", "JT.U8"),
+                       ("Types", "assign_type", "JT.U8")],
+    "u16"           : [("Types", "JN.Utype", "JT.U16"), ("Types", "eval_type", "JT.U16"),
+                       ("Types", "assign_type", "JT.U16")],
+    "u32"           : [("Types", "JN.Utype", "JT.U32"), ("Types", "eval_type", "JT.U32"),
+                       ("Types", "assign_type", "JT.U32")],
+    "int"           : [("Types", "JN.Ptype", "JT.INT"), ("Types", "eval_type", "JT.INT"),
+                       ("Types", "assign_type", "JT.INT")],
+    "negation"      : [("Expressions", "JN.Pexpr", "negvar"), ("Expressions", "JS.Number", "negvar")],
+    "shifts"        : [("Instructions", "JN.Peqop", ">>="), ("Instructions", "JN.Peqop", "<<=")],
+    "multiplication": [("Expressions", "artemtic", "*"), ("Instructions", "JN.Peqop", "*=")],
+    "xor"           : [("Expressions", "artemtic", "^"), ("Instructions", "JN.Peqop", "^=")]
+
+}
+
+SWARM_SALT = 0x5757
+
+
+def swarm_configuration(seed, disable_prob=0.5):
+
+    """
+
+        The features switched off for a seed. The configuration only depends on the seed, it is drawn from its own
+        RandomState so the draws of the program itself are not touched.
+
+    """
+
+    state = np.random.RandomState([seed % 2**32, SWARM_SALT])
+
+    return [name for name in SWARM_FEATURES if state.random_sample() < disable_prob]
+
+
+def swarm_weights(disabled):
+
+    """
+
+        The disabled features as weight overrides (distribution name -> encoded table -> encoded production -> 0)
+
+    """
+
+    weights = {}
+
+    for name in disabled:
+
+        for dist, table, production in SWARM_FEATURES[name]:
+
+            weights.setdefault(dist, {}).setdefault(table, {})[production] = 0
+
+    return weights
+
+
+
+"""
+
+    Distribution configs: the tables of the distributions as a versioned JSON file, so switching features does not
+    mean editing the tables above.
+
+        {
+            "version"       : 1,
+            "distributions" : {"Types": {"JN.Utype": {"JT.U8": 0.05, "JT.U16": 0.15, ...}, ...}, ...}
+        }
+
+    Every table given replaces the hard coded one completely, tables that are left out keep their hard coded
+    probabilities. Productions use the encode_key names, so entries that are commented out above (JT.U128, stack)
+    can be switched on from a config. The compiled samplers of a config are built once per process and config hash
+    and shared by every JasminGenerator that uses the config.
+
+"""
+
+CONFIG_VERSION  = 1
+
+# Productions a config can switch on beyond the keys of the hard coded tables, the generator emits them as they are
+WORD_TYPES      = [JT.U8, JT.U16, JT.U32, JT.U64, JT.U128, JT.U256]
+STORAGE         = ["reg", "stack", "inline"]
+SWITCHABLE      = {JN.Pinstr: ["arrayinit"], JN.Plvalue: ["_"]}
+
+DISTRIBUTIONS   = {
+    "GlobalDeclarations": GlobalDeclarations,
+    "Types"             : Types,
+    "Functions"         : Functions,
+    "Expressions"       : Expressions,
+    "Instructions"      : Instructions
+}
+
+SAMPLERS        = {}
+
+
+def default_config():
+
+    """
+
+        The hard coded tables as a config
+
+    """
+
+    return {"version": CONFIG_VERSION,
+            "distributions": {name: {table_name: {encode_key(x): p for x, p in table.items()}
+                                     for table_name, (sub, table) in distribution(0).tables().items()}
+                              for name, distribution in DISTRIBUTIONS.items()}}
+
+
+def config_hash(config=None):
+
+    config = default_config() if config is None else config
+
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def productions(sub, table):
+
+    """
+
+        The productions a config may give the table sub with the hard coded productions table: a table of word types
+        takes every word type, a table of types every JT type, the storage table every storage class and the other
+        tables their own productions and those of SWITCHABLE
+
+    """
+
+    keys = set(table)
+
+    if sub == JN.Storage:
+
+        return keys | set(STORAGE)
+
+    if keys <= set(WORD_TYPES):
+
+        return keys | set(WORD_TYPES)
+
+    if all(isinstance(x, JT) for x in keys):
+
+        return keys | set(JT)
+
+    return keys | set(SWITCHABLE.get(sub, []))
+
+
+def validate_config(config):
+
+    """
+
+        Raises ValueError if the config has an unknown version, distribution, table or production (one that does not
+        decode to a production the generator can emit for the table, see productions), a negative probability or a
+        table whose probabilities do not sum to 1
+
+    """
+
+    if config.get("version") != CONFIG_VERSION:
+
+        raise ValueError("unsupported distribution config version " + repr(config.get("version")))
+
+    for name, tables in config.get("distributions", {}).items():
+
+        if name not in DISTRIBUTIONS:
+
+            raise ValueError("unknown distribution " + name)
+
+        known = DISTRIBUTIONS[name](0).tables()
+
+        for table_name, table in tables.items():
+
+            where = name + "." + table_name
+
+            if table_name not in known:
+
+                raise ValueError("unknown table " + where)
+
+            allowed = productions(*known[table_name])
+            unknown = [x for x in table if decode_key(x) not in allowed]
+
+            if len(unknown) > 0:
+
+                raise ValueError("unknown production " + ", ".join(unknown) + " in " + where)
+
+            if len(table) == 0 or any(p < 0 for p in table.values()):
+
+                raise ValueError("empty table or negative probability in " + where)
+
+            if abs(sum(table.values()) - 1) > 1e-8:
+
+                raise ValueError("probabilities of " + where + " sum to " + str(sum(table.values())))
+
+    return config
+
+
+def load_config(path):
+
+    with open(path, "r") as file:
+
+        return validate_config(json.load(file))
+
+
+def compiled(config=None):
+
+    """
+
+        The samplers of every table under a config (None for the hard coded tables), distribution name -> encoded
+        table name -> Sampler, built once per process and config
+
+    """
+
+    key = "default" if config is None else config_hash(config)
+
+    if key not in SAMPLERS:
+
+        result = {}
+
+        for name, distribution in DISTRIBUTIONS.items():
+
+            distribution = distribution(0)
+
+            if config is not None:
+
+                distribution.set_tables(config["distributions"].get(name, {}))
+
+            result[name] = {table_name: Sampler(table) for table_name, (sub, table) in distribution.tables().items()}
+
+        SAMPLERS[key] = result
+
+    return SAMPLERS[key]
+
+
+class ConfigFile:
+
+    """
+
+        A config file that is read again when it changes, so a running campaign picks up a new config between
+        seeds. An invalid new version is reported and the previous config stays in use.
+
+    """
+
+    def __init__(self, path):
+
+        self.path   = path
+        self.mtime  = None
+        self.config = None
+        self.hash   = None
+
+    def current(self):
+
+        mtime = os.path.getmtime(self.path)
+
+        if mtime != self.mtime:
+
+            self.mtime = mtime
+
+            try:
+
+                self.config = load_config(self.path)
+                self.hash   = config_hash(self.config)
+
+                print("LOADED DISTRIBUTION CONFIG", self.hash, "FROM", self.path)
+
+            except ValueError as error:
+
+                if self.config is None:
+
+                    raise
+
+                print("KEEPING DISTRIBUTION CONFIG", self.hash, "-", error)
+
+        return self.config
+
+
+def check_replay(seeds):
+
+    """
+
+        Replay the recorded choice sequence of every seed, which has to give the same program, and the edited
+        sequences that set every choice to the same value 0 ... 7 (twice as long as the recorded one), which have
+        to give a program at all. Returns the failures as (seed, sequence, error).
+
+    """
+
+    import jasminGenerator as JPG
+
+    failures = []
+
+    for seed in seeds:
+
+        generator   = JPG.JasminGenerator(seed)
+        program     = generator.get_program()[6:]                                                                # Without the date
+        recorded    = [int(x) for x in generator.choice_sequence()]
+
+        if JPG.JasminGenerator(seed, choices=recorded).get_program()[6:] != program:
+
+            failures.append((seed, "recorded", "replay differs from the program"))
+
+        for value in range(8):
+
+            try:
+
+                JPG.JasminGenerator(seed, choices=[value] * (2 * len(recorded))).get_program()
+
+            except RecursionError as error:
+
+                failures.append((seed, "all " + str(value), repr(error)))
+
+    return failures
+
+
+def main():
+
+    """
+
+        python jasminDistribution.py <config.json>                - write the hard coded tables as a config
+        python jasminDistribution.py --check <config.json>        - validate a config and print its hash
+        python jasminDistribution.py --check-replay <start> <end> - check_replay over the seeds
+
+    """
+
+    if sys.argv[1] == "--check":
+
+        print(config_hash(load_config(sys.argv[2])))
+
+    elif sys.argv[1] == "--check-replay":
+
+        failures = check_replay(range(int(sys.argv[2]), int(sys.argv[3])))
+
+        for seed, sequence, error in failures:
+
+            print(seed, sequence, error)
+
+        print(len(failures), "failures")
+
+    else:
+
+        with open(sys.argv[1], "w") as file:
+            json.dump(default_config(), file, indent=4)
+
+        print(config_hash())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,67 +1,133 @@
+import jasminAdaptive as JA
+import jasminBackend as JBE
+import jasminBuckets as JB
+import jasminConfig as JCF
 import jasminGenerator as JPG
+import jasminPipeline as JPL
+import jasminPolicy as JPO
 import jasminPrettyPrint as JPP
-import subprocess
+import jasminScheduler as JSH
+import jasminScratch as JSC
+import jasminStore as JRS
 import sys
-import pandas as pd
 import time
 
 
 def error_analyzer(error_line):
 
-    if "compilation error" in error_line:
+    """
 
-        result = "compilation error "
-        x = error_line.split(":")
+        The error class of a single stderr line as "<signature>: <normalised text>", the signatures and the
+        normalisation live in jasminBuckets. Continuation lines of a longer message are classified as CON.
 
-        for i in range(1, len(x)):
+    """
 
-            result += x[i]
+    classified = JB.classify(error_line)
 
-    elif "WARNING" in error_line:
+    if classified is None:
 
-        prefix = "WARNING"
+        return "CON"
 
-        if "," in error_line:
+    return classified[0] + ": " + classified[1]
 
-            result = prefix + error_line.split(",")[1]
 
-        else:
+def run_compiler(compiler, source_file, assembly_file="asm.s", pass_fds=()):
 
-            result = error_line
+    return JPO.finish(JPO.start_compiler(compiler, source_file, assembly_file, pass_fds))
 
-    elif "typing error" in error_line:
 
-        return "typing error"
+def run_safety_check(compiler, source_file, pass_fds=()):
 
-    elif "the variable is already allocated" in error_line:
+    return JPO.finish(JPO.start_safety_check(compiler, source_file, pass_fds))
 
-        return "the variable is already allocated"
 
-    elif "Register allocation" in error_line:
+def safety_lines(result):
 
-        result = "Register allocation error"
+    return JPO.safety_lines(result)
 
-    elif error_line.startswith("("):
 
-        return "CON"
+def render(program_generator):
 
-    elif error_line == "PLEASE REPORT":
+    out = program_generator.get_program()
 
-        return "PR"
+    out = [str(x) for x in out]
+    out = "".join(out)
+
+    return JPP.jasmin_pretty_print(out)
+
+
+def generate(job):
+
+    """
+
+        The rendered program and generation time of a planned (seed, generator config, options, distributions hash)
+        job, a module level function so it can run in a pipeline worker process
+
+    """
+
+    gen_time = time.time()
+    out      = render(JPG.JasminGenerator(job[0], **job[2]))
+
+    return out, time.time() - gen_time
+
+
+def evaluate(compiler, scratch, out, seed, policy):
+
+    """
+
+        Run the stages of the policy (see jasminPolicy) on a program, returns error_codes, safe, compile time, safety
+        check time and the skipped stages
+
+    """
+
+    out         = policy.prepare(out)
+    source_file = scratch.write("test.jazz", out)
+
+    return policy.evaluate(compiler, source_file, scratch.path("asm.s"), seed, scratch.pass_fds(), out)
 
-    else:
 
-        result = error_line
+def error_classes(error_codes):
 
-    return result
+    """
+
+        The error_analyzer classes of both stages of an error_codes list, sorted and without duplicates
+
+    """
+
+    return sorted(set(x[1] + ": " + x[2] for x in JB.buckets_of(error_codes).values()))
+
+
+def program_config(options, distributions_hash, default_hash, weights_hash=""):
+
+    """
+
+        The config of a program in the result store (see jasminStore), "" for the default generator, otherwise the
+        generator options, distribution config and adaptive weights it was generated with, so rerunning a seed with
+        other options adds rows instead of replacing those of another program
+
+    """
+
+    parts = [x for x in ["terminating", "swarm", "split"] if options.get(x)]
 
+    if distributions_hash != default_hash:
 
-def main():
+        parts.append("distributions=" + distributions_hash)
 
-    result_outputs = pd.DataFrame(columns=["Seed", "Errors", "Size", "Safe", "GenerationTime", "SafetyCheckTime"])
+    if weights_hash:
+
+        parts.append("weights=" + weights_hash)
+
+    return ",".join(parts)
+
+
+def main(config=None):
+
+    config        = JCF.load() if config is None else config
     pandas_index  = 0
-    source_path   = "/Users/thorjakobsen/GIT/jasmin/compiler/tests/jasminFuzzer/test"
-    compiler_path = "/Users/thorjakobsen/GIT/jasmin/compiler/./jasminc"
+    source_path   = config["source_path"]
+    # The jasminc at compiler_path, or the backend of the configuration, see jasminBackend
+    compiler      = JBE.from_config(config)
+    data_path     = config["data_path"]
 
     """
         if os.path.exists("/Users/thorjakobsen/GIT/JasminFuzzer/evaluation/error_code.p"):
@@ -75,12 +141,72 @@ def main():
             resulting_errors = []
     """
 
+    # --terminating bounds every generated while loop, see JasminGenerator.bounded_while
+    terminating = "--terminating" in sys.argv
+
+    if terminating:
+        sys.argv.remove("--terminating")
+
+    # --adaptive learns the grammar weights from the bucket feedback, see jasminAdaptive
+    adaptive = "--adaptive" in sys.argv
+
+    if adaptive:
+        sys.argv.remove("--adaptive")
+
+    # --swarm lets every seed switch off its own subset of grammar features, see JD.SWARM_FEATURES
+    swarm = "--swarm" in sys.argv
+
+    if swarm:
+        sys.argv.remove("--swarm")
+
+    # --split derives a seed for every node of the derivation instead of one running seed, see JD.ChoiceSequence
+    split = "--split" in sys.argv
+
+    if split:
+        sys.argv.remove("--split")
+
+    # --schedule <budget> runs budget power scheduled executions over the seed range, see jasminScheduler
+    budget = None
+
+    if "--schedule" in sys.argv:
+
+        budget = int(sys.argv[sys.argv.index("--schedule") + 1])
+        del sys.argv[sys.argv.index("--schedule"):sys.argv.index("--schedule") + 2]
+
+    # --distributions <config.json> draws from the tables of a distribution config, which is read again whenever it
+    # changes, see JD.ConfigFile
+    distributions = None
+
+    if "--distributions" in sys.argv:
+
+        distributions = JPG.JD.ConfigFile(sys.argv[sys.argv.index("--distributions") + 1])
+        del sys.argv[sys.argv.index("--distributions"):sys.argv.index("--distributions") + 2]
+
+    # --pipeline <generators> <compilers> overlaps generation and compilation, see jasminPipeline
+    pipeline = None
+
+    if "--pipeline" in sys.argv:
+
+        index    = sys.argv.index("--pipeline")
+        pipeline = (int(sys.argv[index + 1]), int(sys.argv[index + 2]))
+        del sys.argv[index:index + 3]
+
+    # --policy <policy> selects the stages every program gets, e.g. skip-frontend,concurrent,sample=0.25
+    policy = JPO.StagePolicy()
+
+    if "--policy" in sys.argv:
+
+        policy = JPO.StagePolicy.parse(sys.argv[sys.argv.index("--policy") + 1])
+        del sys.argv[sys.argv.index("--policy"):sys.argv.index("--policy") + 2]
+
     if len(sys.argv) == 2:
 
         print("ONLY GOT 1 Running dry run saving the target")
 
 
-        program_generator = JPG.JasminGenerator(int(sys.argv[1]))
+        program_generator = JPG.JasminGenerator(int(sys.argv[1]), terminating=terminating, swarm=swarm, split=split,
+                                                distribution_config=None if distributions is None
+                                                else distributions.current())
         out = program_generator.get_program()
 
         out = [str(x) for x in out]
@@ -93,74 +219,153 @@ def main():
 
         print(out)
 
-        process = subprocess.Popen([compiler_path, source_path + sys.argv[1] + ".jazz", "-o", "test"],
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        _, stderr = process.communicate()
-        result = stderr.decode("utf-8")
+        result = run_compiler(compiler, source_path + sys.argv[1] + ".jazz", "test")
 
         print("RESULT:\n", result)
 
     else:
 
+        # pandas is only needed for the result CSV, a dry run starts without it
+        import pandas as pd
+
+        result_outputs = pd.DataFrame(columns=["Seed", "Errors", "Buckets", "Size", "Safe", "GenerationTime",
+                                               "SafetyCheckTime", "CompileTime", "Config", "Weights", "Distributions",
+                                               "Policy", "Skipped"])
+
         start = int(sys.argv[1])
         end   = int(sys.argv[2])
 
-        for i in range(start, end):
+        bucket_index = JB.BucketIndex(data_path + "buckets.json")
+        store        = JRS.ResultStore(data_path + "results.sqlite")
+        campaign     = "results_" + str(start) + "_" + str(end)
+        weights      = JA.AdaptiveWeights(data_path + "weights.json", data_path + "weights_log.jsonl") if adaptive else None
+        default_hash = JPG.JD.config_hash()
+        scratch      = JSC.ScratchSpace(config["scratch_path"], memfd=config["scratch_memfd"])
+
+        if budget is None:
 
-            gen_time = time.time()
+            scheduler = None
+            plan      = ((i, None) for i in range(start, end))
 
-            program_generator = JPG.JasminGenerator(i)
-            out = program_generator.get_program()
+        else:
 
-            out = [str(x) for x in out]
-            out = "".join(out)
-            out = JPP.jasmin_pretty_print(out)
+            scheduler = JSH.PowerScheduler(start, end,
+                                           log_path=data_path + "schedule_" + str(start) + "_" + str(end) + ".jsonl")
+            plan      = scheduler.plan(budget)
 
-            gen_time = time.time() - gen_time
+        def jobs():
 
-            size_of_program = len(out.encode('utf-8'))
+            for i, generator_config in plan:
+
+                options  = {"terminating": terminating, "swarm": swarm, "split": split}
+
+                if distributions is None:
+
+                    distributions_hash = default_hash
+
+                else:
+
+                    options["distribution_config"] = distributions.current()
+                    distributions_hash             = distributions.hash
+
+                if generator_config is not None:
+
+                    options.update(JSH.CONFIGS[generator_config])
 
-            with open(source_path + ".jazz", "w") as file:
-                file.write(out)
-                file.close()
+                yield i, generator_config, options, distributions_hash
 
-            process = subprocess.Popen([compiler_path, source_path + ".jazz","-o", "asm.s"],
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE)
-            _, stderr = process.communicate()
-            result = stderr.decode("utf-8")
+        def record(job, out, gen_time, evaluation, weights_hash="", program_generator=None):
 
-            error_codes = [[],[]]
+            nonlocal pandas_index
 
-            if result != "":
+            i, generator_config, options, distributions_hash            = job
+            error_codes, safe, compile_time, safety_check_time, skipped = evaluation
+            key                                                         = program_config(options, distributions_hash,
+                                                                                         default_hash, weights_hash)
 
-                lines = result.splitlines()
+            size_of_program = len(out.encode('utf-8'))
+
+            buckets, new_buckets = bucket_index.add(i, size_of_program, error_codes)
 
-                for line in lines:
-                    error_codes[0].append(line)
+            for bucket in new_buckets:
 
-            safety_check_time = time.time()
+                print("NEW BUCKET", bucket, "SEED", i, ":", bucket_index.buckets[bucket]["text"])
 
-            process = subprocess.Popen([compiler_path, source_path + ".jazz", "-checksafety"],
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE)
-            _, stderr = process.communicate()
-            result = stderr.decode("utf-8")
+            # A program whose safety check was skipped (safe is None) counts as safe
+            if adaptive:
 
-            safety_check_time = time.time() - safety_check_time
+                weights.update(i, program_generator, int(len(new_buckets) > 0 or safe is False))
 
-            for line in result.splitlines():
-                if "Fatal" in line or "WARNING" in line or "error" in line.lower():
-                    error_codes[1].append(line)
+            if scheduler is not None:
 
-            safe = "Program is not safe!" not in result
+                scheduler.report(new_buckets, safe is not False, compile_time + (safety_check_time or 0),
+                                 options=options, distributions=distributions_hash, weights=weights_hash)
 
-            result_outputs.loc[pandas_index] = [i, error_codes, size_of_program, safe, gen_time, safety_check_time]
+            store.add_result(i, error_codes, size_of_program, safe, generation_time=gen_time,
+                             safety_check_time=safety_check_time, compile_time=compile_time,
+                             config=key, campaign=campaign, distributions=distributions_hash,
+                             policy=policy.name(), skipped=skipped, program=JRS.program_hash(out))
+
+            result_outputs.loc[pandas_index] = [i, error_codes, buckets, size_of_program, safe, gen_time,
+                                                safety_check_time, compile_time, key, weights_hash,
+                                                distributions_hash, policy.name(), ",".join(skipped)]
             pandas_index += 1
 
+        # Adaptive weights and the scheduler need the outcome of a seed before the next one is generated
+        if pipeline is not None and (adaptive or scheduler is not None):
+
+            print("--pipeline IS IGNORED WITH --adaptive AND --schedule, RUNNING ONE SEED AT A TIME")
+            pipeline = None
+
+        if pipeline is None:
+
+            for job in jobs():
+
+                gen_time = time.time()
+
+                if adaptive:
+
+                    weights_hash      = weights.hash()
+                    program_generator = weights.generator(job[0], **job[2])
+
+                else:
+
+                    weights_hash      = ""
+                    program_generator = JPG.JasminGenerator(job[0], **job[2])
+
+                out = render(program_generator)
+
+                gen_time = time.time() - gen_time
+
+                record(job, out, gen_time, evaluate(compiler, scratch, out, job[0], policy), weights_hash,
+                       program_generator)
+
+        else:
+
+            stages = JPL.Pipeline(generate,
+                                  lambda job, program: evaluate(compiler, scratch, program[0], job[0], policy),
+                                  producers=pipeline[0], consumers=pipeline[1])
+
+            for job, (out, gen_time), evaluation in stages.run(jobs()):
+
+                record(job, out, gen_time, evaluation)
+
+            stages.print_table()
+
         #pickle.dump(resulting_errors, open("/Users/thorjakobsen/GIT/JasminFuzzer/evaluation/error_code.p", "wb"))
-        result_outputs.to_csv("/Users/thorjakobsen/GIT/JasminFuzzer/evaluation/data/results_" + str(start) + "_" + str(end) + ".csv")
+        result_outputs.to_csv(data_path + campaign + ".csv")
+        store.close()
+        scratch.close()
+        bucket_index.save()
+        bucket_index.print_table()
+
+        if adaptive:
+
+            weights.save()
+
+        if scheduler is not None:
+
+            scheduler.print_table()
 
 
 if __name__ == '__main__':
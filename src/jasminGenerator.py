@@ -8,7 +8,24 @@
 
         __init__:
 
-            - set the current seed value
+            - set the current seed value, with terminating=True every generated while loop is bounded
+            - weights optionally overrides the hand tuned probabilities of the distribution tables
+            - with swarm=True the seed also switches off a random subset of features (JD.SWARM_FEATURES)
+            - choices replays a recorded (or edited) decision sequence instead of drawing from the seed
+            - with split=True every node of the derivation draws from its own seed, derived from its parent's seed
+              and its index; reseed (node path -> seed) regenerates single subtrees, see subtrees
+
+        choice_sequence:
+
+            - the decisions of the last generation as a compact integer array, see JD.ChoiceSequence
+
+        subtrees:
+
+            - the (node path, nonterminal) pairs of a split seeded generation, the paths reseed takes
+
+        generate_parallel:
+
+            - the programs of many seeds generated by a pool of worker processes, in seed order
 
         getProgram:
 
@@ -76,6 +93,7 @@
 
 """
 
+import functools
 import numpy as np
 from datetime import datetime
 
@@ -85,9 +103,55 @@ from jasminScopes import Scopes as JS
 from jasminTypes import JasminTypes as JT
 
 
+def subtree(method):
+
+    """
+
+        With split seeding every call of a decorated method is a node of the derivation with its own seed
+
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+
+        if self.choices.nodes is None:
+
+            return method(self, *args, **kwargs)
+
+        action = kwargs.get("action", args[0] if len(args) > 0 else None)
+
+        with self.choices.node(method.__name__ + ":" + JD.encode_key(action)):
+
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def generate_program(seed, **options):
+
+    return "".join(str(x) for x in JasminGenerator(seed, **options).get_program())
+
+
+def generate_parallel(seeds, workers=None, **options):
+
+    """
+
+        A program only depends on its seed and options, so the result does not depend on the amount of workers
+
+    """
+
+    # Imported here, concurrent.futures.process is a noticeable part of the start up of a single generation
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        return list(executor.map(functools.partial(generate_program, **options), seeds, chunksize=16))
+
+
 class JasminGenerator:
 
-    def __init__(self, program_seed):
+    def __init__(self, program_seed, terminating=False, weights=None, swarm=False, choices=None, split=False,
+                 reseed=None, distribution_config=None):
 
         self.seed               = program_seed
         self.action_global      = JD.GlobalDeclarations(self.seed)
@@ -96,9 +160,57 @@ class JasminGenerator:
         self.action_expressions = JD.Expressions(self.seed)
         self.action_instructions= JD.Instructions(self.seed)
 
+        self.distributions      = {
+            "GlobalDeclarations": self.action_global,
+            "Types"             : self.action_types,
+            "Functions"         : self.action_functions,
+            "Expressions"       : self.action_expressions,
+            "Instructions"      : self.action_instructions
+        }
+
+        #Every random decision goes through one choice sequence, recording or replaying
+        self.choices            = JD.ChoiceSequence(choices, split_seed=self.seed if split else None, reseed=reseed)
+
+        #The tables of a distribution config (see JD.validate_config) and the samplers compiled for them
+        samplers                = JD.compiled(distribution_config)
+
+        for name, distribution in self.distributions.items():
+
+            distribution.choices = self.choices
+
+            if distribution_config is not None:
+
+                distribution.set_tables(distribution_config["distributions"].get(name, {}))
+
+            distribution.samplers = dict(samplers[name])
+
+        #Overrides of the hand tuned weights: distribution name -> encoded table name -> encoded production -> weight
+        if weights is not None:
+
+            for name, tables in weights.items():
+
+                for table_name, table_weights in tables.items():
+
+                    self.distributions[name].set_weights(table_name, table_weights)
+
+        #Swarm testing, the switched off features only depend on the seed
+        self.swarm_disabled     = JD.swarm_configuration(self.seed) if swarm else []
+
+        for name, tables in JD.swarm_weights(self.swarm_disabled).items():
+
+            for table_name, table_weights in tables.items():
+
+                self.distributions[name].set_weights(table_name, table_weights)
+
         self.function_return    = False
         self.return_types       = []
 
+        #With terminating set the while loops of a function share one fuel budget, see bounded_while
+        self.terminating        = terminating
+        self.fuel_limit         = 1000
+        self.fuel               = "fuel"
+        self.fuel_variables     = []
+
         self.variable_types     = {}
         self.variables_of_type  = {}
         self.variables_storage  = {}
@@ -124,6 +236,10 @@ class JasminGenerator:
         program_info = ["// Program seed: ", str(self.seed), "\n", "// Generated by JasminFuzzer on ",
                    str(datetime.now()), " \n\n"]
 
+        if len(self.swarm_disabled) > 0:
+
+            program_info[2] = " (swarm, no " + ", no ".join(self.swarm_disabled) + ")\n"
+
         program = []
 
         amount_of_global_decls = 1 # self.action_prop(self.seed, "global")
@@ -158,6 +274,53 @@ class JasminGenerator:
 
         return program_info + program
 
+    def productions(self):
+
+        """
+
+            Every production drawn while generating, as (distribution name, encoded table, encoded production)
+
+        """
+
+        return [(name, JD.encode_key(sub), JD.encode_key(value))
+                for name, distribution in self.distributions.items() for sub, value in distribution.productions]
+
+    def choice_sequence(self):
+
+        return self.choices.array()
+
+    def retry_expression(self, scope, evaluation_type):
+
+        """
+
+            Draw a terminal expression of the wrong type again. Generating has always started over at depth 0, which
+            keeps the program of a seed, the retries in a row still count for the depth limit of a replay (see
+            JD.Expressions.get_action) so that an edited sequence asking for the same terminal cannot retry forever
+
+        """
+
+        self.action_expressions.retries += 1
+
+        try:
+
+            return self.expressions(action=JN.Pexpr, scope=scope, evaluation_type=evaluation_type)
+
+        finally:
+
+            self.action_expressions.retries -= 1
+
+    def subtrees(self):
+
+        return list(self.choices.node_log)
+
+    def random_integer(self, low, high):
+
+        return self.choices.integer(lambda: np.random.randint(low, high), low, high)
+
+    def random_element(self, options):
+
+        return self.choices.choose(lambda: np.random.choice(options, 1, replace=False)[0], list(options))
+
     def clean_types(self, program_list):
 
         for i in range(len(program_list)):
@@ -201,7 +364,7 @@ class JasminGenerator:
                 elif input_type == JT.INT:
 
                     extras += ["inline int b1;\n",
-                               "b1 = ", np.random.randint(0, 1000), ";\n",
+                               "b1 = ", self.random_integer(0, 1000), ";\n",
                                "result = f0(b1);\n"
                                ]
 
@@ -225,14 +388,14 @@ class JasminGenerator:
                     if self.variables_input[0] in self.variables[JS.Arrays]:
 
                         extras += [ "reg ", input_type, "[5] b1;\n",
-                                    "b1[1] = ", np.random.randint(0, 1000),";\n",
+                                    "b1[1] = ", self.random_integer(0, 1000),";\n",
                                     "result = f0(b1);\n"
                                 ]
 
                     else:
 
                         extras += ["reg ", input_type, " b1;\n",
-                                   "b1 = ", np.random.randint(0, 1000), ";\n",
+                                   "b1 = ", self.random_integer(0, 1000), ";\n",
                                    "result = f0(b1);\n"
                                    ]
 
@@ -247,7 +410,7 @@ class JasminGenerator:
                 if input_type == JT.INT:
 
                     extras += ["inline int b1;\n",
-                               "b1 = ", np.random.randint(0, 1000), ";\n",
+                               "b1 = ", self.random_integer(0, 1000), ";\n",
                                "f0(b1);\n"
                                ]
 
@@ -338,13 +501,11 @@ class JasminGenerator:
 
             else:
 
-                result = np.random.choice(types_array, 1, replace=False)
-                return result[0]
+                return self.random_element(types_array)
 
         if scope == JS.Variables:
 
-            index = np.random.choice(self.variables[JS.Variables], 1, replace=False)
-            return index[0]
+            return self.random_element(self.variables[JS.Variables])
 
         if scope == JS.Decl:
 
@@ -383,7 +544,7 @@ class JasminGenerator:
 
                 if len(self.variables_of_type[scope]) > 1 and isinstance(self.variables_of_type[scope], list):
 
-                    return np.random.choice(self.variables_of_type[scope], 1, replace=False)[0]
+                    return self.random_element(self.variables_of_type[scope])
 
                 else:
 
@@ -401,6 +562,7 @@ class JasminGenerator:
         
     """
 
+    @subtree
     def global_declarations(self, action=None):
 
         if action is None:
@@ -570,7 +732,8 @@ class JasminGenerator:
             result_assignments  = []
             bool_assignments    = []
 
-            self.variables_used_before_assignment = list(set(self.variables_used_before_assignment))
+            #dict.fromkeys keeps the order, a set would make the program depend on the string hash seed
+            self.variables_used_before_assignment = list(dict.fromkeys(self.variables_used_before_assignment))
 
             for var in self.variables_used_before_assignment:
 
@@ -616,7 +779,7 @@ class JasminGenerator:
 
                 if self.variable_types[var] != JT.BOOL and var != "out":                                                #TODO to ensure boolean we added input
 
-                    assignment = [var, " = ", np.random.randint(0, 1000), ";\n"]
+                    assignment = [var, " = ", self.random_integer(0, 1000), ";\n"]
 
                     if var in self.variables[JS.Arrays]:
 
@@ -624,6 +787,15 @@ class JasminGenerator:
 
                     result_assignments += assignment
 
+            if len(self.fuel_variables) > 0:
+
+                result            += ["reg", " ", JT.U64, " ", self.fuel, ";\n"]
+                result_assignments = [self.fuel, " = 0;\n"] + result_assignments
+
+            for fuel in self.fuel_variables:
+
+                result += ["reg", " ", JT.U64, " ", fuel, ";\n"]
+
             result += result_assignments + result_2
 
             return result
@@ -659,6 +831,7 @@ class JasminGenerator:
     
     """
 
+    @subtree
     def expressions(self, action=None, evaluation_type=None, scope=None, r_depth=0):
 
         r_depth = r_depth + 1
@@ -677,7 +850,7 @@ class JasminGenerator:
 
                 if scope != JT.BOOL:
 
-                    return self.expressions(action=JN.Pexpr, scope=scope, evaluation_type=evaluation_type)
+                    return self.retry_expression(scope, evaluation_type)
 
                 elif action == "true":
 
@@ -691,11 +864,11 @@ class JasminGenerator:
 
                 if evaluation_type == JT.BOOL:
 
-                    return self.expressions(action=JN.Pexpr, scope=scope, evaluation_type=evaluation_type)
+                    return self.retry_expression(scope, evaluation_type)
 
                 else:
 
-                    return [np.random.randint(0,10000)]
+                    return [self.random_integer(0, 10000)]
 
             if action == JN.Var:
 
@@ -859,6 +1032,7 @@ class JasminGenerator:
 
     """
 
+    @subtree
     def instructions(self, action=None, r_depth=0, scope=None):
 
         if action == JN.Pinstr:
@@ -981,7 +1155,7 @@ class JasminGenerator:
                         """
                         first_var = self.expressions(action=JN.Var, scope=JT.INT)
                         second_var = self.expressions(action=JN.Pexpr, scope=JT.INT, evaluation_type=JT.INT)
-                        third_var = np.random.randint(0, 1000) #self.expressions(action=JN.Pexpr, scope=JT.INT, evaluation_type=JT.INT) #To avoid assertion fail
+                        third_var = self.random_integer(0, 1000) #self.expressions(action=JN.Pexpr, scope=JT.INT, evaluation_type=JT.INT) #To avoid assertion fail
 
                         return ["for ", first_var, " = ", second_var, " to ", third_var,
                                 self.instructions(action=JN.Pblock, r_depth=r_depth)]
@@ -1009,18 +1183,23 @@ class JasminGenerator:
                 start_end = self.action_instructions.get_action(sub="while")
                 result = ["while "]
                 if start_end:
-                    result += self.instructions(action=JN.Pblock, r_depth=r_depth, scope=JS.Variables)
+                    block = self.instructions(action=JN.Pblock, r_depth=r_depth, scope=JS.Variables)
+                    result += block
 
                 result += "("
                 bool_exp = self.expressions(action=JN.Pexpr, evaluation_type=JT.BOOL, scope=JT.BOOL)
-                if isinstance(bool_exp, list):
-                    result += bool_exp
-                else:
-                    result.append(bool_exp)
+                if not isinstance(bool_exp, list):
+                    bool_exp = [bool_exp]
+                result += bool_exp
                 result += ")"
 
                 if not start_end:
-                    result += self.instructions(action=JN.Pblock, r_depth=r_depth, scope=JS.Variables)
+                    block = self.instructions(action=JN.Pblock, r_depth=r_depth, scope=JS.Variables)
+                    result += block
+
+                if self.terminating:
+
+                    return self.bounded_while(block, bool_exp, start_end)
 
                 return result
 
@@ -1076,16 +1255,59 @@ class JasminGenerator:
 
                 else:
 
-                    return self.instructions(action=JN.Plvalue, r_depth = r_depth, scope=scope)
+                    return self.instructions(action=JN.Plvalue, r_depth=r_depth + 1, scope=scope)
 
         raise Exception("INSTRUCTION NO MATCH")
 
+    def bounded_while(self, block, condition, start_end):
+
+        """
+
+            Rewrites a while loop such that it provably terminates. All loops of the function share one u64 fuel
+            counter, set to 0 at the start of the function, which every iteration of every loop increments, and a
+            loop only runs while the counter is below fuel_limit, so nested loops run at most fuel_limit iterations
+            together instead of fuel_limit to the power of their depth. The original condition is kept as an if
+            inside the body. When it fails the loop saves the counter in its own exit variable and pushes the counter
+            to the limit to leave, and the counter is restored after the loop. A loop that ran out of fuel leaves
+            its exit variable at the limit, so the loops around it stop as well:
+
+                while { c } (e)     ->  x = L; while (fuel < L) { c if (!e) { x = fuel; fuel = L; } fuel += 1; }
+                                        fuel = x;
+                while (e) { c }     ->  x = L; while (fuel < L) { if e { c } else { x = fuel; fuel = L; } fuel += 1; }
+                                        fuel = x;
+
+            For loops are not touched as they range over int bounds and are always finite.
+
+        """
+
+        fuel = self.fuel
+        exit = "fuel_exit" + str(len(self.fuel_variables))
+        self.fuel_variables.append(exit)
+
+        leave  = [exit, " = ", fuel, ";\n", fuel, " = ", self.fuel_limit, ";", "\n}"]
+        result = [exit, " = ", self.fuel_limit, ";\n", "while (", fuel, " < ", self.fuel_limit, ") {\n"]
+
+        if start_end:
+
+            result += block[1:-1]
+            result += ["\n", "if (!", "("] + condition + [")", ") {\n"] + leave
+
+        else:
+
+            result += ["if "] + condition + block
+            result += [" else ", "{\n"] + leave
+
+        result += ["\n", fuel, " += 1;", "\n}\n", fuel, " = ", exit, ";\n"]
+
+        return result
+
     """
     
         FUNCTIONS
     
     """
 
+    @subtree
     def functions(self, action=None, r_depth=0):
 
         r_depth = r_depth + 1
@@ -1176,6 +1398,7 @@ class JasminGenerator:
     
     """
 
+    @subtree
     def types(self, action=None, r_depth=0):
 
         r_depth = r_depth + 1
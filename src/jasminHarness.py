@@ -0,0 +1,156 @@
+"""
+
+    Batched execution of compiled Jasmin programs.
+
+    time_measuring/batch_main.c calls the exported function once for every 64 bit input it reads and writes the
+    results back as a packed int64 array. A whole input sweep is therefore a single process launch, and the results
+    are loaded without a copy through numpy.frombuffer.
+
+
+    Methods:
+
+        export_name:
+
+            - given Jasmin source text return the name of its exported function (main_jazz or f0)
+
+        compile_jasmin / build:
+
+            - jasminc the source into assembly and link the assembly with the batch harness
+
+        run:
+
+            - run a built binary on a NumPy array of inputs and return the results, with a timeout the results are
+              flushed one by one so the results before a hanging input survive the kill
+
+"""
+
+import os
+import re
+import subprocess
+
+import numpy as np
+
+
+DIR_PATH        = os.path.dirname(os.path.realpath(__file__))
+BATCH_MAIN      = f"{DIR_PATH}/time_measuring/batch_main.c"
+
+EXPORT_RE       = re.compile(r"export\s+fn\s+([A-Za-z_][A-Za-z0-9_]*)")
+
+
+class HarnessError(Exception):
+    pass
+
+
+class BatchResult:
+
+    """
+
+        values      - int64 results, shorter than the inputs when the run timed out or crashed
+        completed   - amount of inputs that produced a result
+        timed_out   - the run was killed after timeout seconds
+        returncode  - exit code of the harness (None when it was killed)
+
+    """
+
+    def __init__(self, values, timed_out, returncode):
+
+        self.values     = values
+        self.completed  = len(values)
+        self.timed_out  = timed_out
+        self.returncode = returncode
+
+
+def export_name(source):
+
+    match = EXPORT_RE.search(source)
+
+    if match is None:
+
+        raise HarnessError("program has no exported function")
+
+    return match.group(1)
+
+
+def compile_jasmin(compiler, jasmin_file, assembly_file):
+
+    """
+
+        compiler is the path of a jasminc or a jasminBackend.Backend
+
+    """
+
+    # jasminBackend builds on this module
+    import jasminBackend as JBE
+
+    return JBE.get_backend(compiler).compile(jasmin_file, assembly_file)
+
+
+def build(assembly_file, binary_file, function_name="f0", harness=BATCH_MAIN):
+
+    process = subprocess.Popen(["gcc", "-O2", "-DJAZZ_FN=" + function_name, "-o", binary_file, assembly_file, harness],
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    _, stderr = process.communicate()
+
+    if process.returncode != 0:
+
+        raise HarnessError("building the harness failed: " + stderr.decode("utf-8"))
+
+
+def build_from_source(compiler, jasmin_file, binary_file):
+
+    """
+
+        jasminc and link a .jazz file, returns the jasminc stderr
+
+    """
+
+    with open(jasmin_file, "r") as file:
+
+        function_name = export_name(file.read())
+
+    assembly_file  = os.path.splitext(binary_file)[0] + ".s"
+    returncode, stderr = compile_jasmin(compiler, jasmin_file, assembly_file)
+
+    if returncode != 0:
+
+        raise HarnessError("jasminc failed: " + stderr)
+
+    build(assembly_file, binary_file, function_name)
+
+    return stderr
+
+
+def run(binary_file, inputs, timeout=None):
+
+    """
+
+        The harness flushes its results per chunk of 4096 inputs. With a timeout it flushes every result, so a killed
+        run still returns all the results computed before the input it hung on
+
+    """
+
+    inputs = np.ascontiguousarray(inputs, dtype=np.int64)
+    chunk  = [] if timeout is None else ["-", "-", "1"]
+
+    try:
+
+        process  = subprocess.run([os.path.abspath(binary_file)] + chunk,
+                                  input=inputs.tobytes(),
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE,
+                                  timeout=timeout)
+        output     = process.stdout
+        timed_out  = False
+        returncode = process.returncode
+
+    except subprocess.TimeoutExpired as timeout_error:
+
+        output     = timeout_error.stdout or b""
+        timed_out  = True
+        returncode = None
+
+    # A killed harness may have flushed half a value
+    output = output[:len(output) - len(output) % 8]
+
+    return BatchResult(np.frombuffer(output, dtype=np.int64), timed_out, returncode)
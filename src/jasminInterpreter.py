@@ -0,0 +1,723 @@
+"""
+
+    Reference interpreter for the subset of Jasmin that the JasminGenerator emits.
+
+    The interpreter runs one program over a whole NumPy array of inputs at once. Every input is a lane, control flow
+    is handled with lane masks: an if runs both branches with complementary masks and a loop keeps iterating while
+    any lane is still inside it. This makes it cheap to evaluate thousands of inputs and to compare the result lane by
+    lane with the output of the compiled main_jazz/f0 wrapper.
+
+    Semantics:
+
+        - u8 to u64 arithmetic wraps modulo the word size, comparisons on words are unsigned
+        - shift counts are masked like x86 does (31 for u8-u32, 63 for u64)
+        - int is approximated by int64
+        - #CMP returns the flags (OF, CF, SF, PF, ZF) of the subtraction of its arguments
+        - for v = a to b iterates a .. b-1, for v = a downto b iterates a .. b+1
+        - variables start out as 0, a lane that reads a value that was never written is marked as undefined as the
+          compiled program would read whatever the register holds
+
+    Every lane has a step budget, one step per executed instruction. A lane that runs out of steps is stopped and
+    marked as diverged, which predicts nontermination before the program is ever compiled.
+
+
+    Methods:
+
+        JasminInterpreter(program, step_budget):
+
+            - program is a jasminParser.Program or Jasmin source text
+
+        run(inputs, entry):
+
+            - run the entry function (main_jazz or the exported function) on every input and return an Execution
+
+"""
+
+import numpy as np
+
+import jasminParser as JP
+from jasminTypes import JasminTypes as JT
+
+
+WORD_SIZES = {
+
+    JT.U8   : 8,
+    JT.U16  : 16,
+    JT.U32  : 32,
+    JT.U64  : 64
+
+}
+
+COMPARE_OPS     = ["==", "!=", "<", "<=", ">", ">="]
+LOGIC_OPS       = ["&&", "||"]
+
+
+class InterpreterError(Exception):
+    pass
+
+
+class Execution:
+
+    """
+
+        Result of running a program over a vector of inputs. All attributes are arrays with one entry per input:
+
+            values      - the returned value as u64 (0 where the function returns nothing)
+            diverged    - the lane ran out of steps
+            undefined   - the lane read a variable that was never written
+            faulted     - the lane indexed an array out of bounds
+            steps       - executed instructions
+
+    """
+
+    def __init__(self, values, diverged, undefined, faulted, steps):
+
+        self.values     = values
+        self.diverged   = diverged
+        self.undefined  = undefined
+        self.faulted    = faulted
+        self.steps      = steps
+
+    def comparable(self):
+
+        """
+
+            Lanes whose value is fully determined by the program and can be compared with a compiled run
+
+        """
+
+        return ~(self.diverged | self.undefined | self.faulted)
+
+    def signed_values(self):
+
+        """
+
+            The values as the C harness prints them (int64_t)
+
+        """
+
+        return self.values.view(np.int64)
+
+
+class Variable:
+
+    def __init__(self, var_type, size, lanes):
+
+        self.type    = var_type
+        self.size    = size
+
+        shape = (lanes,) if size is None else (size, lanes)
+
+        self.value   = np.zeros(shape, dtype=value_dtype(var_type))
+        self.defined = np.zeros(shape, dtype=bool)
+
+    def copy(self):
+
+        result         = Variable.__new__(Variable)
+        result.type    = self.type
+        result.size    = self.size
+        result.value   = self.value.copy()
+        result.defined = self.defined.copy()
+
+        return result
+
+
+def value_dtype(var_type):
+
+    if var_type == JT.BOOL:
+
+        return np.bool_
+
+    if var_type == JT.INT:
+
+        return np.int64
+
+    return np.uint64
+
+
+def word_mask(var_type):
+
+    return np.uint64((1 << WORD_SIZES[var_type]) - 1)
+
+
+def cast(value, var_type):
+
+    """
+
+        Bring a computed value into the representation of var_type
+
+    """
+
+    if var_type == JT.BOOL:
+
+        return value.astype(np.bool_)
+
+    if var_type == JT.INT:
+
+        return value.astype(np.int64)
+
+    if value.dtype != np.uint64:
+
+        value = value.astype(np.int64).astype(np.uint64)
+
+    return value & word_mask(var_type)
+
+
+class JasminInterpreter:
+
+    def __init__(self, program, step_budget=10000):
+
+        if isinstance(program, str):
+
+            program = JP.parse(program)
+
+        self.program     = program
+        self.functions   = {x.name: x for x in program.functions}
+        self.step_budget = step_budget
+
+    def entry_function(self):
+
+        for function in self.program.functions:
+
+            if function.name == "main_jazz":
+
+                return function.name
+
+        for function in self.program.functions:
+
+            if function.call_conv == "export":
+
+                return function.name
+
+        raise InterpreterError("program has no exported function")
+
+    def run(self, inputs, entry=None):
+
+        inputs  = np.asarray(inputs)
+
+        if inputs.dtype != np.uint64:
+
+            inputs = inputs.astype(np.int64).astype(np.uint64)
+
+        lanes   = len(inputs)
+
+        self.steps     = np.zeros(lanes, dtype=np.int64)
+        self.alive     = np.ones(lanes, dtype=bool)
+        self.diverged  = np.zeros(lanes, dtype=bool)
+        self.undefined = np.zeros(lanes, dtype=bool)
+        self.faulted   = np.zeros(lanes, dtype=bool)
+        self.lanes     = lanes
+
+        function = self.functions[self.entry_function() if entry is None else entry]
+        args     = []
+
+        if len(function.params) > 0:
+
+            param = function.params[0]
+            value = Variable(param.type, param.size, lanes)
+
+            if param.size is None:
+
+                value.value   = cast(inputs, param.type)
+                value.defined = np.ones(lanes, dtype=bool)
+
+            else:
+
+                value.value[1]   = cast(inputs, param.type)
+                value.defined[1] = True
+
+            args.append(value)
+
+        results = self.call(function, args, np.ones(lanes, dtype=bool))
+        values  = np.zeros(lanes, dtype=np.uint64)
+
+        if len(results) > 0:
+
+            result  = results[0]
+            value   = result.value if result.size is None else result.value[1]
+            defined = result.defined if result.size is None else result.defined[1]
+            values  = value.astype(np.int64).astype(np.uint64)
+
+            self.mark_undefined(defined, self.alive)
+
+        return Execution(values, self.diverged.copy(), self.undefined.copy(), self.faulted.copy(), self.steps.copy())
+
+    """
+
+        FUNCTIONS
+
+    """
+
+    def call(self, function, args, mask):
+
+        env = {}
+
+        for param, arg in zip(function.params, args):
+
+            env[param.name] = arg.copy()
+
+        for decl in function.decls:
+
+            env[decl.name] = Variable(decl.type, decl.size, self.lanes)
+
+        self.block(function.body, env, mask)
+
+        return [env[x] for x in function.ret]
+
+    """
+
+        INSTRUCTIONS
+
+    """
+
+    def block(self, instructions, env, mask):
+
+        for instruction in instructions:
+
+            self.instruction(instruction, env, mask)
+
+    def step(self, mask):
+
+        mask = mask & self.alive
+        self.steps[mask] += 1
+
+        exhausted = mask & (self.steps > self.step_budget)
+
+        if exhausted.any():
+
+            self.diverged |= exhausted
+            self.alive    &= ~exhausted
+            mask          = mask & ~exhausted
+
+        return mask
+
+    def instruction(self, instruction, env, mask):
+
+        mask = self.step(mask)
+
+        if not mask.any():
+
+            return
+
+        if isinstance(instruction, JP.Assign):
+
+            if isinstance(instruction.expr, JP.Prim):
+
+                values = self.primitive(instruction.expr, env, mask)
+
+                for lval, value in zip(instruction.lvals, values):
+
+                    if lval is not None:
+
+                        self.store(lval, value, env, mask)
+
+                return
+
+            lval = instruction.lvals[0]
+
+            if lval is None:
+
+                return
+
+            var_type = env[lval.name].type
+
+            if instruction.op == "=":
+
+                value = self.expression(instruction.expr, var_type, env, mask)
+
+            else:
+
+                value = self.binary(instruction.op[:-1], lval, instruction.expr, var_type, env, mask)
+
+            self.store(lval, value, env, mask)
+
+        elif isinstance(instruction, JP.Call):
+
+            function = self.functions[instruction.name]
+            args     = []
+
+            for param, arg in zip(function.params, instruction.args):
+
+                args.append(self.argument(param, arg, env, mask))
+
+            results = self.call(function, args, mask)
+
+            for lval, result in zip(instruction.lvals, results):
+
+                if lval is None:
+
+                    continue
+
+                target = env[lval.name]
+
+                if isinstance(lval, JP.Var) and target.size is not None:
+
+                    target.value[:, mask]   = result.value[:, mask]
+                    target.defined[:, mask] = result.defined[:, mask]
+
+                else:
+
+                    self.mark_undefined(result.defined, mask)
+                    self.store(lval, cast(result.value, target.type), env, mask)
+
+        elif isinstance(instruction, JP.If):
+
+            cond = self.expression(instruction.cond, JT.BOOL, env, mask)
+
+            self.block(instruction.then, env, mask & cond)
+
+            if instruction.orelse is not None:
+
+                self.block(instruction.orelse, env, mask & ~cond)
+
+        elif isinstance(instruction, JP.While):
+
+            if instruction.pre is not None:
+
+                self.block(instruction.pre, env, mask)
+
+            running = mask & self.alive & self.expression(instruction.cond, JT.BOOL, env, mask)
+
+            while running.any():
+
+                if instruction.body is not None:
+
+                    self.block(instruction.body, env, running)
+
+                if instruction.pre is not None:
+
+                    self.block(instruction.pre, env, running)
+
+                running = self.step(running)
+                running = running & self.expression(instruction.cond, JT.BOOL, env, running)
+
+        elif isinstance(instruction, JP.For):
+
+            start = self.expression(instruction.start, JT.INT, env, mask)
+            end   = self.expression(instruction.end, JT.INT, env, mask)
+
+            if instruction.direction == "to":
+
+                count = np.maximum(end - start, 0)
+
+            else:
+
+                count = np.maximum(start - end, 0)
+
+            iteration = 0
+
+            while True:
+
+                running = mask & self.alive & (count > iteration)
+
+                if not running.any():
+
+                    break
+
+                if instruction.direction == "to":
+
+                    value = start + iteration
+
+                else:
+
+                    value = start - iteration
+
+                self.store(JP.Var(instruction.var), value, env, running)
+                self.block(instruction.body, env, running)
+
+                iteration += 1
+
+        else:
+
+            raise InterpreterError("INSTRUCTION NO MATCH")
+
+    def argument(self, param, arg, env, mask):
+
+        if param.size is not None and isinstance(arg, JP.Var):
+
+            return env[arg.name].copy()
+
+        value          = Variable(param.type, param.size, self.lanes)
+        value.value    = self.expression(arg, param.type, env, mask)
+        value.defined  = np.ones(self.lanes, dtype=bool)
+
+        return value
+
+    def store(self, lval, value, env, mask):
+
+        target = env[lval.name]
+        value  = np.broadcast_to(cast(value, target.type), (self.lanes,))
+
+        if isinstance(lval, JP.Var):
+
+            target.value   = np.where(mask, value, target.value)
+            target.defined = target.defined | mask
+
+        else:
+
+            index = self.array_index(lval, target, env, mask)
+            lanes = np.nonzero(mask)[0]
+
+            target.value[index[lanes], lanes]   = value[lanes]
+            target.defined[index[lanes], lanes] = True
+
+    def array_index(self, expr, target, env, mask):
+
+        index  = self.expression(expr.index, JT.INT, env, mask)
+        inside = (index >= 0) & (index < target.size)
+
+        self.faulted |= mask & ~inside
+
+        return np.where(inside, index, 0)
+
+    def mark_undefined(self, defined, mask):
+
+        self.undefined |= mask & ~defined
+
+    """
+
+        EXPRESSIONS
+
+    """
+
+    def expression_type(self, expr, env):
+
+        """
+
+            The type an expression has on its own, None for literals whose type comes from the context
+
+        """
+
+        if isinstance(expr, (JP.Var, JP.Index)):
+
+            return env[expr.name].type
+
+        if isinstance(expr, JP.Bool):
+
+            return JT.BOOL
+
+        if isinstance(expr, JP.Unop):
+
+            return self.expression_type(expr.expr, env)
+
+        if isinstance(expr, JP.Binop):
+
+            if expr.op in COMPARE_OPS or expr.op in LOGIC_OPS:
+
+                return JT.BOOL
+
+            return self.expression_type(expr.left, env) or self.expression_type(expr.right, env)
+
+        return None
+
+    def expression(self, expr, var_type, env, mask):
+
+        if isinstance(expr, JP.Const):
+
+            return cast(np.full(self.lanes, expr.value, dtype=np.int64), var_type)
+
+        if isinstance(expr, JP.Bool):
+
+            return np.full(self.lanes, expr.value, dtype=bool)
+
+        if isinstance(expr, JP.Var):
+
+            target = env[expr.name]
+
+            if target.size is not None:
+
+                raise InterpreterError("array " + expr.name + " is used as a value")
+
+            self.mark_undefined(target.defined, mask)
+
+            return target.value
+
+        if isinstance(expr, JP.Index):
+
+            target = env[expr.name]
+            index  = self.array_index(expr, target, env, mask)
+            lanes  = np.arange(self.lanes)
+
+            self.mark_undefined(target.defined[index, lanes], mask)
+
+            return target.value[index, lanes]
+
+        if isinstance(expr, JP.Unop):
+
+            value = self.expression(expr.expr, var_type, env, mask)
+
+            if expr.op == "!":
+
+                if value.dtype == np.bool_:
+
+                    return ~value
+
+                return cast(~value, var_type)
+
+            if var_type == JT.INT or value.dtype == np.int64:
+
+                return -value.astype(np.int64)
+
+            return cast(np.uint64(0) - value, var_type)
+
+        if isinstance(expr, JP.Binop):
+
+            if expr.op in LOGIC_OPS:
+
+                left  = self.expression(expr.left, JT.BOOL, env, mask)
+                right = self.expression(expr.right, JT.BOOL, env, mask)
+
+                return (left & right) if expr.op == "&&" else (left | right)
+
+            if expr.op in COMPARE_OPS:
+
+                operand_type = self.expression_type(expr.left, env) or self.expression_type(expr.right, env) or JT.INT
+
+                return self.compare(expr.op, expr.left, expr.right, operand_type, env, mask)
+
+            return self.binary(expr.op, expr.left, expr.right, var_type, env, mask)
+
+        if isinstance(expr, JP.Prim):
+
+            raise InterpreterError("primitive #" + expr.name + " can only be used on the right of an assignment")
+
+        raise InterpreterError("EXPRESSION NO MATCH")
+
+    def compare(self, op, left, right, operand_type, env, mask):
+
+        left  = self.expression(left, operand_type, env, mask)
+        right = self.expression(right, operand_type, env, mask)
+
+        if op == "==":
+
+            return left == right
+
+        if op == "!=":
+
+            return left != right
+
+        if op == "<":
+
+            return left < right
+
+        if op == "<=":
+
+            return left <= right
+
+        if op == ">":
+
+            return left > right
+
+        return left >= right
+
+    def binary(self, op, left, right, var_type, env, mask):
+
+        if var_type == JT.BOOL:
+
+            left  = self.expression(left, JT.BOOL, env, mask)
+            right = self.expression(right, JT.BOOL, env, mask)
+
+            if op in ["&", "&&"]:
+
+                return left & right
+
+            if op in ["|", "||"]:
+
+                return left | right
+
+            if op == "^":
+
+                return left ^ right
+
+            raise InterpreterError("operator " + op + " on bool")
+
+        if op in ["<<", ">>"]:
+
+            value = self.expression(left, var_type, env, mask)
+            count = self.expression(right, self.expression_type(right, env) or JT.U8, env, mask)
+            count = count.astype(np.int64) & (63 if var_type in [JT.U64, JT.INT] else 31)
+
+            if var_type == JT.INT:
+
+                return (value << count) if op == "<<" else (value >> count)
+
+            count = count.astype(np.uint64)
+
+            return cast((value << count) if op == "<<" else (value >> count), var_type)
+
+        left  = self.expression(left, var_type, env, mask)
+        right = self.expression(right, var_type, env, mask)
+
+        if op == "+":
+
+            result = left + right
+
+        elif op == "-":
+
+            result = left - right
+
+        elif op == "*":
+
+            result = left * right
+
+        elif op == "^":
+
+            result = left ^ right
+
+        elif op == "&":
+
+            result = left & right
+
+        elif op == "|":
+
+            result = left | right
+
+        else:
+
+            raise InterpreterError("OPERATOR NO MATCH " + op)
+
+        return cast(result, var_type)
+
+    def primitive(self, prim, env, mask):
+
+        if prim.name != "CMP":
+
+            raise InterpreterError("primitive #" + prim.name + " is not supported")
+
+        operand_type = self.expression_type(prim.args[0], env) or self.expression_type(prim.args[1], env) or JT.U64
+
+        if operand_type not in WORD_SIZES:
+
+            raise InterpreterError("#CMP on " + operand_type.value)
+
+        size         = WORD_SIZES[operand_type]
+        sign         = np.uint64(1 << (size - 1))
+
+        left  = self.expression(prim.args[0], operand_type, env, mask)
+        right = self.expression(prim.args[1], operand_type, env, mask)
+        diff  = cast(left - right, operand_type)
+
+        overflow = ((left & sign) != (right & sign)) & ((diff & sign) != (left & sign))
+        carry    = left < right
+        negative = (diff & sign) != 0
+        low      = (diff & np.uint64(0xff)).astype(np.uint8)
+        parity   = (np.unpackbits(low[:, None], axis=1).sum(axis=1) % 2) == 0
+        zero     = diff == 0
+
+        return [overflow, carry, negative, parity, zero]
+
+
+def run_source(source, inputs, step_budget=10000):
+
+    return JasminInterpreter(source, step_budget=step_budget).run(inputs)
+
+
+def predicts_nontermination(source, inputs, step_budget=10000):
+
+    """
+
+        True if any of the inputs makes the program run out of its step budget
+
+    """
+
+    return bool(run_source(source, inputs, step_budget=step_budget).diverged.any())
@@ -0,0 +1,336 @@
+"""
+
+    Typed mutations of generated programs.
+
+    A fresh JasminGenerator program shares nothing with the interesting programs found before it. The mutator instead
+    takes a program (a generator token list, Jasmin source text or a parsed Program) and derives variants from it with
+    small typed edits on the parsed tree. A variant costs a couple of tuple copies instead of a generation, and every
+    mutation only produces what the generator could have produced in the same place, so variants pass typing and
+    reach the later compiler passes:
+
+        swap_operator       - replace an operator by another one of the same sub_actions table (artemtic, compare,
+                              Peqop), = is never swapped so no variable is read before it is assigned
+        widen_type          - change every declaration of an unsigned type to a wider one (u32 -> u64), consistently
+                              over all functions so calls and returns still match
+        wrap_in_if          - wrap an instruction in an if on a comparison of an already assigned variable with a
+                              constant
+        duplicate_block     - repeat a slice of a block right after itself
+        perturb_constant    - replace a constant by a value around it or a boundary value, array indices are left
+                              alone so no access goes out of bounds
+        swap_branches       - negate the condition of an if/else and swap its blocks
+
+
+    Methods:
+
+        to_program:
+
+            - given a generator token list, source text or a Program return a Program
+
+        JasminMutator.mutate / variants:
+
+            - apply one random mutation / yield variants of a program
+
+
+    Usage:
+
+        python jasminMutator.py (<seed> | <program.jazz>) <count> [--mutator-seed N]
+
+            - print count variants of the program, each with the mutations that produced it
+
+"""
+
+import sys
+
+import numpy as np
+
+import jasminDistribution as JD
+import jasminParser as JP
+import jasminPrettyPrint as JPP
+from jasminTypes import JasminTypes as JT
+
+
+def enabled(table):
+
+    return [x for x, p in table.items() if p > 0]
+
+
+"""
+
+    The operator tables, taken from the distributions so a swap stays within what the generator draws
+
+"""
+
+ARITHMETIC_OPS  = enabled(JD.Expressions(0).sub_actions["artemtic"])
+COMPARE_OPS     = enabled(JD.Expressions(0).sub_actions["compare"])
+ASSIGN_OPS      = [x for x in enabled(JD.Instructions(0).sub_actions[JD.JN.Peqop]) if x != "="]
+
+WIDTHS          = [JT.U8, JT.U16, JT.U32, JT.U64]
+NEGATED_COMPARE = {"==": "!=", "!=": "==", "<": ">=", ">=": "<", ">": "<=", "<=": ">"}
+BOUNDARY_VALUES = [0, 1, 2, 7, 8, 15, 16, 31, 32, 42, 63, 64, 127, 128, 255]
+
+
+def to_program(program):
+
+    if isinstance(program, JP.Program):
+
+        return program
+
+    if isinstance(program, list):
+
+        program = JPP.jasmin_pretty_print("".join(str(x) for x in program))
+
+    return JP.parse(program)
+
+
+def instruction_paths(program):
+
+    for path in JP.block_paths(program):
+
+        for index in range(len(JP.get_at(program, path))):
+
+            yield path + (index,)
+
+
+def assigned_before(function, index):
+
+    """
+
+        The parameters and the variables assigned at the top level of the first index instructions of the function
+        body (assignments in a branch or loop may not happen), the variables a condition there can read
+
+    """
+
+    result = set(x.name for x in function.params)
+
+    for instruction in function.body[:index]:
+
+        if isinstance(instruction, (JP.Assign, JP.Call)):
+
+            result.update(x.name for x in instruction.lvals if isinstance(x, JP.Var))
+
+    return result
+
+
+class JasminMutator:
+
+    def __init__(self, seed=0):
+
+        self.state      = np.random.RandomState(seed)
+        self.mutations  = [self.swap_operator, self.widen_type, self.wrap_in_if, self.duplicate_block,
+                           self.perturb_constant, self.swap_branches]
+
+    def pick(self, sites):
+
+        return sites[self.state.randint(len(sites))]
+
+    def mutate(self, program):
+
+        """
+
+            Apply one mutation, returns (variant, mutation name) or (program, None) if no mutation applies
+
+        """
+
+        program = to_program(program)
+
+        for index in self.state.permutation(len(self.mutations)):
+
+            variant = self.mutations[index](program)
+
+            if variant is not None:
+
+                return variant, self.mutations[index].__name__
+
+        return program, None
+
+    def variants(self, program, count, depth=1):
+
+        """
+
+            Yield count (variant, [mutation names]) pairs, each variant is depth mutations away from the program
+
+        """
+
+        program = to_program(program)
+
+        for _ in range(count):
+
+            variant = program
+            applied = []
+
+            for _ in range(depth):
+
+                variant, name = self.mutate(variant)
+
+                if name is not None:
+
+                    applied.append(name)
+
+            yield variant, applied
+
+    """
+
+        MUTATIONS, each returns None if the program has no site for it
+
+    """
+
+    def swap_operator(self, program):
+
+        sites = []
+
+        for path in JP.expression_paths(program):
+
+            expr = JP.get_at(program, path)
+
+            if isinstance(expr, JP.Binop):
+
+                for table in [ARITHMETIC_OPS, COMPARE_OPS]:
+
+                    if expr.op in table and len(table) > 1:
+
+                        sites.append((path + ("op",), table))
+
+        for path in instruction_paths(program):
+
+            instruction = JP.get_at(program, path)
+
+            if isinstance(instruction, JP.Assign) and instruction.op in ASSIGN_OPS and len(ASSIGN_OPS) > 1:
+
+                sites.append((path + ("op",), ASSIGN_OPS))
+
+        if len(sites) == 0:
+
+            return None
+
+        path, table = self.pick(sites)
+        current     = JP.get_at(program, path)
+
+        return JP.set_at(program, path, self.pick([x for x in table if x != current]))
+
+    def widen_type(self, program):
+
+        decls = [x for function in program.functions for x in function.params + function.returns + function.decls]
+        types = sorted(set(x.type for x in decls if x.type in WIDTHS[:-1]), key=WIDTHS.index)
+
+        if len(types) == 0:
+
+            return None
+
+        old = self.pick(types)
+        new = self.pick(WIDTHS[WIDTHS.index(old) + 1:])
+
+        def widen(decls):
+
+            return tuple(x._replace(type=new) if x.type == old else x for x in decls)
+
+        return program._replace(functions=tuple(x._replace(params=widen(x.params), returns=widen(x.returns),
+                                                           decls=widen(x.decls)) for x in program.functions))
+
+    def wrap_in_if(self, program):
+
+        sites = list(instruction_paths(program))
+
+        if len(sites) == 0:
+
+            return None
+
+        path        = self.pick(sites)
+        function    = JP.get_at(program, path[:2])
+        assigned    = assigned_before(function, path[3])
+        variables   = [x.name for x in function.params + function.decls
+                       if x.size is None and x.type in WIDTHS + [JT.INT] and x.name in assigned]
+
+        if len(variables) > 0:
+
+            cond = JP.Binop(self.pick(COMPARE_OPS), JP.Var(self.pick(variables)),
+                            JP.Const(int(self.pick(BOUNDARY_VALUES))))
+
+        else:
+
+            cond = JP.Bool(bool(self.state.randint(2)))
+
+        return JP.set_at(program, path, JP.If(cond, (JP.get_at(program, path),), None))
+
+    def duplicate_block(self, program):
+
+        sites = [x for x in JP.block_paths(program) if len(JP.get_at(program, x)) > 0]
+
+        if len(sites) == 0:
+
+            return None
+
+        path  = self.pick(sites)
+        block = JP.get_at(program, path)
+        start = self.state.randint(len(block))
+        end   = self.state.randint(start, len(block)) + 1
+
+        return JP.set_at(program, path, block[:end] + block[start:end] + block[end:])
+
+    def perturb_constant(self, program):
+
+        sites = [x for x in JP.expression_paths(program)
+                 if isinstance(JP.get_at(program, x), JP.Const) and x[-1] != "index"]
+
+        if len(sites) == 0:
+
+            return None
+
+        path   = self.pick(sites)
+        value  = JP.get_at(program, path).value
+        values = [x for x in BOUNDARY_VALUES + [value + 1, value - 1, value // 2] if 0 <= x <= 255 and x != value]
+
+        return JP.set_at(program, path, JP.Const(int(self.pick(values))))
+
+    def swap_branches(self, program):
+
+        sites = [x for x in instruction_paths(program)
+                 if isinstance(JP.get_at(program, x), JP.If) and JP.get_at(program, x).orelse is not None]
+
+        if len(sites) == 0:
+
+            return None
+
+        path        = self.pick(sites)
+        instruction = JP.get_at(program, path)
+
+        if isinstance(instruction.cond, JP.Binop) and instruction.cond.op in NEGATED_COMPARE:
+
+            cond = instruction.cond._replace(op=NEGATED_COMPARE[instruction.cond.op])
+
+        else:
+
+            cond = JP.Unop("!", instruction.cond)
+
+        return JP.set_at(program, path, JP.If(cond, instruction.orelse, instruction.then))
+
+
+def main():
+
+    args = sys.argv[1:]
+    seed = 0
+
+    if "--mutator-seed" in args:
+
+        seed = int(args[args.index("--mutator-seed") + 1])
+        del args[args.index("--mutator-seed"):args.index("--mutator-seed") + 2]
+
+    program, count = args
+
+    if program.endswith(".jazz"):
+
+        program = JP.parse_file(program)
+
+    else:
+
+        import jasminGenerator as JPG
+
+        program = JPG.JasminGenerator(int(program)).get_program()
+
+    for variant, applied in JasminMutator(seed).variants(program, int(count)):
+
+        print("// Mutations:", ", ".join(applied))
+        print(JP.render(variant))
+
+
+if __name__ == '__main__':
+    main()
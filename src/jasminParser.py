@@ -0,0 +1,879 @@
+"""
+
+    Parser for the subset of Jasmin that the JasminGenerator emits.
+
+    The generator works on a flat list of tokens which is fine for printing but useless for anything that needs to
+    understand the program afterwards (interpreting, reducing, mutating, validating). This module turns the source
+    text (the joined token list or a .jazz file) into a small tree of namedtuples and can render such a tree back into
+    source text.
+
+    The nodes are immutable, a modified program is created with _replace, which also makes them hashable.
+
+
+    Methods:
+
+        parse:
+
+            - given Jasmin source text return a Program
+
+        render:
+
+            - given a Program return Jasmin source text
+
+        walk_instructions / walk_expressions:
+
+            - iterate over all instructions / expressions of a list of instructions
+
+
+    Subset (following the BNF in jasminGenerator):
+
+    <module>    ::= <pfundef>*
+    <pfundef>   ::= [export | inline] fn <ident> ( [<stor_type> <var> {, <stor_type> <var>}] ) [-> <stor_type>] <pfunbody>
+    <pfunbody>  ::= { <pvardecl>* <pinstr>* [return <var> ;] }
+    <pinstr>    ::= <plvalue> {, <plvalue>} <peqop> (<pexpr> | #<ident>(<pexpr>, ...) | <ident>(<pexpr>, ...)) ;
+                | <ident>(<pexpr>, ...) ;
+                | if <pexpr> <pblock> [else <pblock>]
+                | for <var> = <pexpr> (to | downto) <pexpr> <pblock>
+                | while [<pblock>] ( <pexpr> ) [<pblock>]
+
+"""
+
+import re
+from collections import namedtuple
+
+from jasminTypes import JasminTypes as JT
+
+
+Program     = namedtuple("Program", ["functions"])
+Function    = namedtuple("Function", ["call_conv", "name", "params", "returns", "decls", "body", "ret"])
+Decl        = namedtuple("Decl", ["storage", "type", "size", "name"])
+
+Assign      = namedtuple("Assign", ["lvals", "op", "expr"])
+Call        = namedtuple("Call", ["lvals", "name", "args"])
+If          = namedtuple("If", ["cond", "then", "orelse"])
+While       = namedtuple("While", ["pre", "cond", "body"])
+For         = namedtuple("For", ["var", "start", "direction", "end", "body"])
+
+Const       = namedtuple("Const", ["value"])
+Bool        = namedtuple("Bool", ["value"])
+Var         = namedtuple("Var", ["name"])
+Index       = namedtuple("Index", ["name", "index"])
+Unop        = namedtuple("Unop", ["op", "expr"])
+Binop       = namedtuple("Binop", ["op", "left", "right"])
+Prim        = namedtuple("Prim", ["name", "args"])
+
+STORAGES    = ["reg", "stack", "inline"]
+ASSIGN_OPS  = ["=", "+=", "-=", "*=", ">>=", "<<=", "^=", "&=", "|="]
+
+"""
+
+    Binary operators from loosest to tightest binding
+
+"""
+
+PRECEDENCE  = [
+    ["||"],
+    ["&&"],
+    ["|"],
+    ["^"],
+    ["&"],
+    ["==", "!="],
+    ["<", "<=", ">", ">="],
+    ["<<", ">>"],
+    ["+", "-"],
+    ["*"]
+]
+
+TOKEN_RE    = re.compile(r"""
+    (?P<space>\s+|//[^\n]*)
+    |(?P<prim>\#[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<number>0x[0-9a-fA-F]+|[0-9]+)
+    |(?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<op><<=|>>=|\+=|-=|\*=|\^=|&=|\|=|==|!=|<=|>=|<<|>>|&&|\|\||->|[{}()\[\];,=<>+\-*&^|!])
+""", re.VERBOSE)
+
+
+IDENT_RE    = re.compile(r"[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class ParseError(Exception):
+    pass
+
+
+def tokenize(source):
+
+    tokens   = []
+    position = 0
+
+    while position < len(source):
+
+        match = TOKEN_RE.match(source, position)
+
+        if match is None:
+
+            raise ParseError("unexpected character " + repr(source[position]) + " at offset " + str(position))
+
+        position = match.end()
+
+        if match.lastgroup != "space":
+
+            tokens.append(match.group())
+
+    return tokens
+
+
+class Parser:
+
+    def __init__(self, source):
+
+        self.tokens = tokenize(source)
+        self.index  = 0
+
+    def peek(self, offset=0):
+
+        if self.index + offset < len(self.tokens):
+
+            return self.tokens[self.index + offset]
+
+        return None
+
+    def next(self):
+
+        token = self.peek()
+
+        if token is None:
+
+            raise ParseError("unexpected end of program")
+
+        self.index += 1
+
+        return token
+
+    def expect(self, token):
+
+        found = self.next()
+
+        if found != token:
+
+            raise ParseError("expected " + repr(token) + " but found " + repr(found) + " at token " + str(self.index))
+
+        return found
+
+    def accept(self, token):
+
+        if self.peek() == token:
+
+            self.index += 1
+            return True
+
+        return False
+
+    """
+
+        GLOBAL DECLARATIONS
+
+    """
+
+    def program(self):
+
+        functions = []
+
+        while self.peek() is not None:
+
+            functions.append(self.function())
+
+        return Program(tuple(functions))
+
+    def function(self):
+
+        call_conv = "inline"
+
+        if self.peek() in ["export", "inline"]:
+
+            call_conv = self.next()
+
+        self.expect("fn")
+        name = self.next()
+
+        self.expect("(")
+        params = []
+
+        while not self.accept(")"):
+
+            storage, var_type, size = self.stor_type()
+            params.append(Decl(storage, var_type, size, self.next()))
+            self.accept(",")
+
+        returns = []
+
+        if self.accept("->"):
+
+            returns.append(Decl(*self.stor_type(), None))
+
+            while self.accept(","):
+
+                returns.append(Decl(*self.stor_type(), None))
+
+        self.expect("{")
+        decls = []
+        body  = []
+        ret   = []
+
+        while not self.accept("}"):
+
+            if self.peek() in STORAGES:
+
+                decls += self.declaration()
+
+            elif self.accept("return"):
+
+                ret.append(self.next())
+
+                while self.accept(","):
+
+                    ret.append(self.next())
+
+                self.expect(";")
+
+            else:
+
+                body.append(self.instruction())
+
+        return Function(call_conv, name, tuple(params), tuple(returns), tuple(decls), tuple(body), tuple(ret))
+
+    def stor_type(self):
+
+        storage  = self.next()
+        var_type = JT(self.next())
+        size     = None
+
+        if self.accept("["):
+
+            size = int(self.next(), 0)
+            self.expect("]")
+
+        return storage, var_type, size
+
+    def declaration(self):
+
+        storage, var_type, size = self.stor_type()
+        decls = [Decl(storage, var_type, size, self.next())]
+
+        while self.accept(","):
+
+            decls.append(Decl(storage, var_type, size, self.next()))
+
+        self.expect(";")
+
+        return decls
+
+    """
+
+        INSTRUCTIONS
+
+    """
+
+    def block(self):
+
+        self.expect("{")
+        instructions = []
+
+        while not self.accept("}"):
+
+            instructions.append(self.instruction())
+
+        return tuple(instructions)
+
+    def instruction(self):
+
+        token = self.peek()
+
+        if token == "if":
+
+            self.next()
+            cond   = self.expression()
+            then   = self.block()
+            orelse = None
+
+            if self.accept("else"):
+
+                orelse = self.block()
+
+            return If(cond, then, orelse)
+
+        if token == "while":
+
+            self.next()
+            pre  = None
+            body = None
+
+            if self.peek() == "{":
+
+                pre = self.block()
+
+            self.expect("(")
+            cond = self.expression()
+            self.expect(")")
+
+            if self.peek() == "{":
+
+                body = self.block()
+
+            return While(pre, cond, body)
+
+        if token == "for":
+
+            self.next()
+            var = self.next()
+            self.expect("=")
+            start = self.expression()
+            direction = self.next()
+
+            if direction not in ["to", "downto"]:
+
+                raise ParseError("expected to or downto but found " + repr(direction))
+
+            end = self.expression()
+
+            return For(var, start, direction, end, self.block())
+
+        if self.peek(1) == "(":
+
+            name = self.next()
+            call = Call((), name, self.arguments())
+            self.expect(";")
+
+            return call
+
+        lvals = [self.lvalue()]
+
+        while self.accept(","):
+
+            lvals.append(self.lvalue())
+
+        op = self.next()
+
+        if op not in ASSIGN_OPS:
+
+            raise ParseError("expected an assignment operator but found " + repr(op))
+
+        if op == "=" and self.peek(1) == "(" and IDENT_RE.match(self.peek()) and self.peek() not in ["true", "false"]:
+
+            name = self.next()
+            call = Call(tuple(lvals), name, self.arguments())
+            self.expect(";")
+
+            return call
+
+        expr = self.expression()
+        self.expect(";")
+
+        return Assign(tuple(lvals), op, expr)
+
+    def lvalue(self):
+
+        name = self.next()
+
+        if name == "_":
+
+            return None
+
+        if self.accept("["):
+
+            index = self.expression()
+            self.expect("]")
+
+            return Index(name, index)
+
+        return Var(name)
+
+    def arguments(self):
+
+        self.expect("(")
+        args = []
+
+        while not self.accept(")"):
+
+            args.append(self.expression())
+            self.accept(",")
+
+        return tuple(args)
+
+    """
+
+        EXPRESSIONS
+
+    """
+
+    def expression(self, level=0):
+
+        if level == len(PRECEDENCE):
+
+            return self.unary()
+
+        left = self.expression(level + 1)
+
+        while self.peek() in PRECEDENCE[level]:
+
+            op    = self.next()
+            right = self.expression(level + 1)
+            left  = Binop(op, left, right)
+
+        return left
+
+    def unary(self):
+
+        if self.peek() in ["!", "-"]:
+
+            op = self.next()
+
+            return Unop(op, self.unary())
+
+        return self.atom()
+
+    def atom(self):
+
+        token = self.next()
+
+        if token == "(":
+
+            expr = self.expression()
+            self.expect(")")
+
+            return expr
+
+        if token in ["true", "false"]:
+
+            return Bool(token == "true")
+
+        if token[0].isdigit():
+
+            return Const(int(token, 0))
+
+        if token.startswith("#"):
+
+            return Prim(token[1:], self.arguments())
+
+        if self.accept("["):
+
+            index = self.expression()
+            self.expect("]")
+
+            return Index(token, index)
+
+        return Var(token)
+
+
+def parse(source):
+
+    return Parser(source).program()
+
+
+def parse_file(path):
+
+    with open(path, "r") as file:
+
+        return parse(file.read())
+
+
+"""
+
+    RENDERING
+
+"""
+
+def render_type(decl):
+
+    result = decl.type.value
+
+    if decl.size is not None:
+
+        result += "[" + str(decl.size) + "]"
+
+    return result
+
+
+def render_expression(expr):
+
+    if isinstance(expr, Const):
+
+        return str(expr.value)
+
+    if isinstance(expr, Bool):
+
+        return "true" if expr.value else "false"
+
+    if isinstance(expr, Var):
+
+        return expr.name
+
+    if isinstance(expr, Index):
+
+        return expr.name + "[" + render_expression(expr.index) + "]"
+
+    if isinstance(expr, Unop):
+
+        return "(" + expr.op + render_expression(expr.expr) + ")"
+
+    if isinstance(expr, Binop):
+
+        return "(" + render_expression(expr.left) + expr.op + render_expression(expr.right) + ")"
+
+    if isinstance(expr, Prim):
+
+        return "#" + expr.name + "(" + ", ".join(render_expression(x) for x in expr.args) + ")"
+
+    raise Exception("RENDER EXPRESSION NO MATCH")
+
+
+def render_lvalues(lvals):
+
+    return ", ".join("_" if x is None else render_expression(x) for x in lvals)
+
+
+def render_block(instructions, depth):
+
+    result = "{\n"
+
+    for instruction in instructions:
+
+        result += render_instruction(instruction, depth + 1)
+
+    return result + "\t" * depth + "}"
+
+
+def render_instruction(instruction, depth):
+
+    indent = "\t" * depth
+
+    if isinstance(instruction, Assign):
+
+        return indent + render_lvalues(instruction.lvals) + " " + instruction.op + " " + \
+               render_expression(instruction.expr) + ";\n"
+
+    if isinstance(instruction, Call):
+
+        call = instruction.name + "(" + ", ".join(render_expression(x) for x in instruction.args) + ");\n"
+
+        if len(instruction.lvals) == 0:
+
+            return indent + call
+
+        return indent + render_lvalues(instruction.lvals) + " = " + call
+
+    if isinstance(instruction, If):
+
+        result = indent + "if " + render_expression(instruction.cond) + " " + render_block(instruction.then, depth)
+
+        if instruction.orelse is not None:
+
+            result += " else " + render_block(instruction.orelse, depth)
+
+        return result + "\n"
+
+    if isinstance(instruction, While):
+
+        result = indent + "while "
+
+        if instruction.pre is not None:
+
+            result += render_block(instruction.pre, depth) + " "
+
+        result += "(" + render_expression(instruction.cond) + ")"
+
+        if instruction.body is not None:
+
+            result += " " + render_block(instruction.body, depth)
+
+        return result + "\n"
+
+    if isinstance(instruction, For):
+
+        return indent + "for " + instruction.var + " = " + render_expression(instruction.start) + " " + \
+               instruction.direction + " " + render_expression(instruction.end) + " " + \
+               render_block(instruction.body, depth) + "\n"
+
+    raise Exception("RENDER INSTRUCTION NO MATCH")
+
+
+def render_function(function):
+
+    params = ", ".join(x.storage + " " + render_type(x) + " " + x.name for x in function.params)
+    result = function.call_conv + " fn " + function.name + "(" + params + ")"
+
+    if len(function.returns) > 0:
+
+        result += " -> " + ", ".join(x.storage + " " + render_type(x) for x in function.returns)
+
+    result += " {\n"
+
+    for decl in function.decls:
+
+        result += "\t" + decl.storage + " " + render_type(decl) + " " + decl.name + ";\n"
+
+    for instruction in function.body:
+
+        result += render_instruction(instruction, 1)
+
+    if len(function.ret) > 0:
+
+        result += "\treturn " + ", ".join(function.ret) + ";\n"
+
+    return result + "}\n"
+
+
+def render(program):
+
+    return "\n".join(render_function(x) for x in program.functions)
+
+
+"""
+
+    TRAVERSAL
+
+"""
+
+def sub_blocks(instruction):
+
+    if isinstance(instruction, If):
+
+        return [x for x in [instruction.then, instruction.orelse] if x is not None]
+
+    if isinstance(instruction, While):
+
+        return [x for x in [instruction.pre, instruction.body] if x is not None]
+
+    if isinstance(instruction, For):
+
+        return [instruction.body]
+
+    return []
+
+
+def walk_instructions(instructions):
+
+    for instruction in instructions:
+
+        yield instruction
+
+        for block in sub_blocks(instruction):
+
+            yield from walk_instructions(block)
+
+
+def instruction_expressions(instruction):
+
+    if isinstance(instruction, Assign):
+
+        return [x for x in instruction.lvals if x is not None] + [instruction.expr]
+
+    if isinstance(instruction, Call):
+
+        return [x for x in instruction.lvals if x is not None] + list(instruction.args)
+
+    if isinstance(instruction, (If, While)):
+
+        return [instruction.cond]
+
+    if isinstance(instruction, For):
+
+        return [Var(instruction.var), instruction.start, instruction.end]
+
+    return []
+
+
+def sub_expressions(expr):
+
+    if isinstance(expr, Index):
+
+        return [expr.index]
+
+    if isinstance(expr, Unop):
+
+        return [expr.expr]
+
+    if isinstance(expr, Binop):
+
+        return [expr.left, expr.right]
+
+    if isinstance(expr, Prim):
+
+        return list(expr.args)
+
+    return []
+
+
+def walk_expression(expr):
+
+    yield expr
+
+    for sub in sub_expressions(expr):
+
+        yield from walk_expression(sub)
+
+
+def walk_expressions(instructions):
+
+    for instruction in walk_instructions(instructions):
+
+        for expr in instruction_expressions(instruction):
+
+            yield from walk_expression(expr)
+
+
+def used_variables(function):
+
+    """
+
+        All variable names read or written in the body and return of a function
+
+    """
+
+    names = set(function.ret)
+
+    for expr in walk_expressions(function.body):
+
+        if isinstance(expr, (Var, Index)):
+
+            names.add(expr.name)
+
+    return names
+
+
+"""
+
+    PATHS
+
+    A path is a tuple of keys from the Program down to a node, field names for namedtuples and integers for the
+    positions in a block or argument list, e.g. ("functions", 0, "body", 2, "then", 0, "expr").
+
+"""
+
+BLOCK_FIELDS = ["then", "orelse", "pre", "body"]
+
+
+def get_at(node, path):
+
+    for key in path:
+
+        node = node[key] if isinstance(key, int) else getattr(node, key)
+
+    return node
+
+
+def set_at(node, path, value):
+
+    if len(path) == 0:
+
+        return value
+
+    key   = path[0]
+    child = set_at(get_at(node, path[:1]), path[1:], value)
+
+    if isinstance(key, int):
+
+        return node[:key] + (child,) + node[key + 1:]
+
+    return node._replace(**{key: child})
+
+
+def block_paths(program):
+
+    """
+
+        Paths of every instruction block, function bodies first and nested blocks after their parent
+
+    """
+
+    for index in range(len(program.functions)):
+
+        yield from nested_block_paths(program, ("functions", index, "body"))
+
+
+def nested_block_paths(program, path):
+
+    yield path
+
+    for index, instruction in enumerate(get_at(program, path)):
+
+        for field in BLOCK_FIELDS:
+
+            if field in instruction._fields and getattr(instruction, field) is not None:
+
+                yield from nested_block_paths(program, path + (index, field))
+
+
+def expression_paths(program):
+
+    """
+
+        Paths of every expression, outer expressions before the expressions they contain
+
+    """
+
+    for path in block_paths(program):
+
+        for index, instruction in enumerate(get_at(program, path)):
+
+            instruction_path = path + (index,)
+
+            if isinstance(instruction, Assign):
+
+                fields = [("expr",)]
+
+            elif isinstance(instruction, Call):
+
+                fields = [("args", x) for x in range(len(instruction.args))]
+
+            elif isinstance(instruction, (If, While)):
+
+                fields = [("cond",)]
+
+            elif isinstance(instruction, For):
+
+                fields = [("start",), ("end",)]
+
+            else:
+
+                fields = []
+
+            for field in fields:
+
+                yield from nested_expression_paths(program, instruction_path + field)
+
+
+def nested_expression_paths(program, path):
+
+    yield path
+
+    expr = get_at(program, path)
+
+    if isinstance(expr, Index):
+
+        yield from nested_expression_paths(program, path + ("index",))
+
+    elif isinstance(expr, Unop):
+
+        yield from nested_expression_paths(program, path + ("expr",))
+
+    elif isinstance(expr, Binop):
+
+        yield from nested_expression_paths(program, path + ("left",))
+        yield from nested_expression_paths(program, path + ("right",))
+
+    elif isinstance(expr, Prim):
+
+        for index in range(len(expr.args)):
+
+            yield from nested_expression_paths(program, path + ("args", index))
+
+
+def variable_declarations(function):
+
+    """
+
+        Name to Decl for the parameters and declared variables of a function
+
+    """
+
+    return {x.name: x for x in function.params + function.decls}
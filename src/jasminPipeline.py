@@ -0,0 +1,264 @@
+"""
+
+    Overlapped generate / compile pipeline with bounded queues.
+
+    The fuzzer generates a program, writes it, compiles it and checks its safety one after another, so jasminc waits
+    for Python while a program is generated and Python waits for jasminc while it compiles. The pipeline runs the
+    stages at the same time:
+
+        generate    - produce(item) in producers worker processes (in the feeding thread when producers is 0),
+                      the rendered programs go into a queue of at most queue_size items
+        compile     - consume(item, product) in consumers threads, jasminc runs in subprocesses so the threads do
+                      not hold the GIL while they wait for it
+        record      - the caller, results are handed back in the order of the items whatever thread finished first
+
+    Every stage counts its busy time, the time it was starved (waiting for input) and the time it was blocked
+    (waiting for room in the next queue). A generate stage that is often blocked is faster than the compilers, a
+    compile stage that is often starved waits on generation.
+
+
+    Methods:
+
+        Pipeline.run:
+
+            - yield (item, product, result) for every item, in order
+
+        Pipeline.print_table:
+
+            - the work, utilisation and backpressure of every stage
+
+"""
+
+import collections
+import queue
+import sys
+import threading
+import time
+
+
+DONE = object()
+
+
+def timed(produce, item):
+
+    start = time.time()
+
+    return produce(item), time.time() - start
+
+
+class StageStats:
+
+    def __init__(self, name, workers):
+
+        self.name       = name
+        self.workers    = max(workers, 1)
+        self.items      = 0
+        self.busy       = 0.0
+        self.starved    = 0.0
+        self.blocked    = 0.0
+        self.lock       = threading.Lock()
+
+    def add(self, items=0, busy=0.0, starved=0.0, blocked=0.0):
+
+        with self.lock:
+
+            self.items   += items
+            self.busy    += busy
+            self.starved += starved
+            self.blocked += blocked
+
+    def utilisation(self, wall):
+
+        return 0.0 if wall == 0 else self.busy / (wall * self.workers)
+
+
+class Pipeline:
+
+    def __init__(self, produce, consume, producers=1, consumers=1, queue_size=16):
+
+        """
+
+            produce must be a module level function when producers > 0, it runs in other processes
+
+        """
+
+        self.produce    = produce
+        self.consume    = consume
+        self.producers  = producers
+        self.consumers  = consumers
+        self.programs   = queue.Queue(queue_size)
+        self.results    = queue.Queue(queue_size)
+        self.stats      = [StageStats("generate", producers), StageStats("compile", consumers),
+                           StageStats("record", 1)]
+        self.error      = None
+        self.wall       = 0.0
+
+    def put(self, target, value, stats):
+
+        start = time.time()
+        target.put(value)
+        stats.add(blocked=time.time() - start)
+
+    def feed(self, items):
+
+        stats = self.stats[0]
+
+        try:
+
+            if self.producers == 0:
+
+                for index, item in enumerate(items):
+
+                    if self.error is not None:
+
+                        break
+
+                    product, seconds = timed(self.produce, item)
+                    stats.add(items=1, busy=seconds)
+                    self.put(self.programs, (index, item, product), stats)
+
+            else:
+
+                from concurrent.futures import ProcessPoolExecutor
+
+                with ProcessPoolExecutor(max_workers=self.producers) as executor:
+
+                    pending = collections.deque()
+
+                    for index, item in enumerate(items):
+
+                        if self.error is not None:
+
+                            break
+
+                        pending.append((index, item, executor.submit(timed, self.produce, item)))
+
+                        # Keep every producer busy with one job ahead, the queue bounds the rest
+                        if len(pending) > 2 * self.producers:
+
+                            self.hand_over(pending.popleft(), stats)
+
+                    while len(pending) > 0:
+
+                        self.hand_over(pending.popleft(), stats)
+
+        except BaseException as error:
+
+            self.error = error
+
+        finally:
+
+            for _ in range(self.consumers):
+
+                self.programs.put(DONE)
+
+    def hand_over(self, job, stats):
+
+        index, item, future = job
+        product, seconds    = future.result()
+
+        stats.add(items=1, busy=seconds)
+        self.put(self.programs, (index, item, product), stats)
+
+    def drain(self):
+
+        """
+
+            After an error the remaining programs are still taken from the queue, so the feeder never blocks
+
+        """
+
+        stats = self.stats[1]
+
+        while True:
+
+            start = time.time()
+            job   = self.programs.get()
+
+            stats.add(starved=time.time() - start)
+
+            if job is DONE:
+
+                break
+
+            if self.error is not None:
+
+                continue
+
+            index, item, product = job
+
+            try:
+
+                start  = time.time()
+                result = self.consume(item, product)
+
+            except BaseException as error:
+
+                self.error = error
+                continue
+
+            stats.add(items=1, busy=time.time() - start)
+            self.put(self.results, (index, item, product, result), stats)
+
+        self.results.put(DONE)
+
+    def run(self, items):
+
+        start   = time.time()
+        threads = [threading.Thread(target=self.feed, args=(items,), daemon=True)]
+        threads += [threading.Thread(target=self.drain, daemon=True) for _ in range(self.consumers)]
+
+        for thread in threads:
+
+            thread.start()
+
+        stats    = self.stats[2]
+        finished = 0
+        waiting  = {}
+        next     = 0
+
+        while finished < self.consumers:
+
+            wait_start = time.time()
+            job        = self.results.get()
+
+            stats.add(starved=time.time() - wait_start)
+
+            if job is DONE:
+
+                finished += 1
+                continue
+
+            waiting[job[0]] = job[1:]
+
+            while next in waiting:
+
+                record_start = time.time()
+
+                yield waiting.pop(next)
+
+                stats.add(items=1, busy=time.time() - record_start)
+                next += 1
+
+        for thread in threads:
+
+            thread.join()
+
+        self.wall = time.time() - start
+
+        if self.error is not None:
+
+            raise self.error
+
+    def print_table(self, file=sys.stdout):
+
+        print("%-10s %8s %8s %10s %10s %10s %8s" % ("Stage", "Workers", "Items", "Busy s", "Starved s", "Blocked s",
+                                                     "Util %"), file=file)
+
+        for stats in self.stats:
+
+            print("%-10s %8d %8d %10.2f %10.2f %10.2f %8.1f" % (stats.name, stats.workers, stats.items, stats.busy,
+                                                                 stats.starved, stats.blocked,
+                                                                 100 * stats.utilisation(self.wall)), file=file)
+
+        print("WALL:", round(self.wall, 2), "s", file=file)
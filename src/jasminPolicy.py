@@ -0,0 +1,220 @@
+"""
+
+    Stage policies: which jasminc runs a program gets and how.
+
+    By default every program is compiled (jasminc -o) and then safety checked (jasminc -checksafety). The safety check
+    is the expensive stage, and after a front-end error (a typing error) its result only repeats that error. A
+    StagePolicy can
+
+        skip-frontend   - skip the safety check when the compiler reported a front-end error
+        concurrent      - start the compiler and the safety check together on the same source, with skip-frontend
+                          the safety check is killed as soon as the compiler reports a front-end error
+        sample=<rate>   - safety check only a fraction of the programs, whether a seed is checked only depends on
+                          the seed so a rerun checks the same programs
+        filter          - do not run jasminc on a program jasminValidator rejects, its compile errors are the
+                          validator's, which jasminBuckets files like the jasminc errors they predict
+        repair          - repair what jasminValidator can repair before compiling, and filter the rest
+        rules=<a>/<b>   - the jasminValidator signatures filter and repair act on, by default only the precise ones
+                          (jasminValidator.PRECISE), whose rules jasminc confirmed in agreement; a rule whose
+                          precision is not near 1 would lose the programs it flags wrongly, e.g.
+                          "filter,rules=typing error/already allocated" also filters on the allocation rule
+
+    A policy is written as a comma separated list of these, e.g. "skip-frontend,concurrent,sample=0.25", and
+    "default" is the sequential policy that always runs both stages. Every result records the policy and the stages
+    it skipped ("safety:frontend", "safety:sampled" or "compile:validator" and "safety:validator" for a filtered
+    program); the safe verdict of a program whose safety check was skipped is None.
+
+
+    Methods:
+
+        StagePolicy.parse / name:
+
+            - a policy from / as its text form
+
+        StagePolicy.prepare / evaluate:
+
+            - the program to compile (repaired with repair) / run the stages of one program
+
+"""
+
+import hashlib
+import time
+
+import jasminBackend as JBE
+import jasminBuckets as JB
+import jasminValidator as JV
+
+
+FRONTEND_SIGNATURES = ["typing error"]
+
+
+def start_compiler(compiler, source_file, assembly_file="asm.s", pass_fds=(), flags=()):
+
+    """
+
+        compiler is the path of a jasminc or a jasminBackend.Backend
+
+    """
+
+    return JBE.get_backend(compiler).start_compile(source_file, assembly_file, pass_fds, flags)
+
+
+def start_safety_check(compiler, source_file, pass_fds=(), flags=()):
+
+    return JBE.get_backend(compiler).start_checksafety(source_file, pass_fds, flags)
+
+
+def finish(process):
+
+    _, stderr = process.communicate()
+
+    return stderr.decode("utf-8")
+
+
+def safety_lines(result):
+
+    return [line for line in result.splitlines() if "Fatal" in line or "WARNING" in line or "error" in line.lower()]
+
+
+def frontend_failed(compile_lines):
+
+    return any(x is not None and x[0] in FRONTEND_SIGNATURES for x in map(JB.classify, compile_lines))
+
+
+class StagePolicy:
+
+    def __init__(self, skip_after_frontend=False, concurrent=False, safety_rate=1.0, validate=None, rules=None):
+
+        self.skip_after_frontend = skip_after_frontend
+        self.concurrent          = concurrent
+        self.safety_rate         = safety_rate
+        self.validate            = validate
+        self.rules               = list(JV.PRECISE if rules is None else rules)
+
+    @staticmethod
+    def parse(text):
+
+        policy = StagePolicy()
+
+        for part in text.split(","):
+
+            part = part.strip()
+
+            if part == "skip-frontend":
+
+                policy.skip_after_frontend = True
+
+            elif part == "concurrent":
+
+                policy.concurrent = True
+
+            elif part.startswith("sample="):
+
+                policy.safety_rate = float(part[len("sample="):])
+
+            elif part in ["filter", "repair"]:
+
+                policy.validate = part
+
+            elif part.startswith("rules="):
+
+                policy.rules = [x.strip() for x in part[len("rules="):].split("/") if x.strip() != ""]
+                unknown      = [x for x in policy.rules if x not in JV.SIGNATURES]
+
+                if unknown:
+
+                    raise ValueError("unknown validator rule " + ", ".join(unknown))
+
+            elif part not in ["", "default"]:
+
+                raise ValueError("unknown stage policy " + part)
+
+        return policy
+
+    def name(self):
+
+        parts = (["skip-frontend"] if self.skip_after_frontend else []) + (["concurrent"] if self.concurrent else [])
+
+        if self.safety_rate < 1:
+
+            parts.append("sample=" + str(self.safety_rate))
+
+        if self.validate is not None:
+
+            parts.append(self.validate)
+
+        if sorted(self.rules) != sorted(JV.PRECISE):
+
+            parts.append("rules=" + "/".join(self.rules))
+
+        return ",".join(parts) or "default"
+
+    def sampled(self, seed):
+
+        if self.safety_rate >= 1:
+
+            return True
+
+        digest = hashlib.blake2b(("safety/" + str(seed)).encode("utf-8"), digest_size=4).digest()
+
+        return int.from_bytes(digest, "little") < self.safety_rate * 2**32
+
+    def prepare(self, source):
+
+        return JV.repair_source(source, self.rules) if self.validate == "repair" else source
+
+    def evaluate(self, compiler, source_file, assembly_file, seed, pass_fds=(), source=None):
+
+        """
+
+            Returns error_codes, safe, compile time, safety check time and the skipped stages. safe and the safety
+            check time are None when the safety check was skipped. filter and repair need the source text and only
+            act on the issues of the policy's rules. compiler is the path of a jasminc or a jasminBackend.Backend.
+
+        """
+
+        if self.validate is not None and source is not None:
+
+            start  = time.time()
+            issues = [x for x in JV.validate_source(source) if x.signature in self.rules]
+
+            if issues:
+
+                return ([[JV.error_line(x) for x in issues], []], None, time.time() - start, None,
+                        ["compile:validator", "safety:validator"])
+
+        skipped = [] if self.sampled(seed) else ["safety:sampled"]
+        start   = time.time()
+        compile = start_compiler(compiler, source_file, assembly_file, pass_fds)
+        safety  = None
+
+        if self.concurrent and len(skipped) == 0:
+
+            safety = start_safety_check(compiler, source_file, pass_fds)
+
+        error_codes  = [finish(compile).splitlines(), []]
+        compile_time = time.time() - start
+
+        if len(skipped) == 0 and self.skip_after_frontend and frontend_failed(error_codes[0]):
+
+            skipped.append("safety:frontend")
+
+            if safety is not None:
+
+                safety.kill()
+                safety.communicate()
+
+        if len(skipped) > 0:
+
+            return error_codes, None, compile_time, None, skipped
+
+        if safety is None:
+
+            start  = time.time()
+            safety = start_safety_check(compiler, source_file, pass_fds)
+
+        result = finish(safety)
+
+        error_codes[1] += safety_lines(result)
+
+        return error_codes, "Program is not safe!" not in result, compile_time, time.time() - start, skipped
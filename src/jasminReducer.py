@@ -0,0 +1,436 @@
+"""
+
+    Delta debugging reducer for generated programs.
+
+    Given a program that triggers an interesting jasminc error (a PLEASE REPORT, a register allocation error, a typing
+    error on valid input, ...) or that does not terminate, the reducer repeatedly tries smaller variants of the program
+    and keeps the first one that is still interesting, until no variant is.
+
+    The variants are built on the parsed program (jasminParser) instead of on text, so every candidate is well formed:
+
+        1) remove chunks of instructions from a block, halves first and single instructions last
+        2) replace an if/while/for by the instructions of one of its blocks
+        3) replace an expression by one of its operands or by a literal of the same kind
+        4) remove declarations of variables that are no longer used
+
+    Candidates are tested in parallel batches, the first interesting candidate of a batch (in candidate order) wins so
+    the result does not depend on which worker finished first. Every verdict is cached by the hash of the rendered
+    candidate, a candidate that shows up again is never tested twice.
+
+    A candidate is interesting for a jasminc error if its error classes, as classified by jasminFuzzer.error_classes,
+    still contain the target classes (a target may be a prefix such as "please report"). A candidate is interesting
+    for nontermination if the reference interpreter runs out of its step budget on one of the inputs.
+
+
+    Usage:
+
+        python jasminReducer.py <jasminc> (<seed> | <program.jazz>) [--hang] [--target CLASS] [--workers N]
+
+    jazzy.py reduce runs main with the backend of the configuration (jasminBackend.from_config) instead of a jasminc.
+
+"""
+
+import hashlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import jasminFuzzer as JF
+import jasminGenerator as JPG
+import jasminInterpreter as JI
+import jasminParser as JP
+import jasminPrettyPrint as JPP
+import jasminScratch as JSC
+from jasminTypes import JasminTypes as JT
+
+
+COMPARE_OPS = ["==", "!=", "<", "<=", ">", ">="]
+LOGIC_OPS   = ["&&", "||"]
+
+
+def source_hash(source):
+
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+class JasmincTester:
+
+    """
+
+        Interesting if jasminc still reports all target error classes
+
+    """
+
+    def __init__(self, compiler, target=None):
+
+        # The path of a jasminc or a jasminBackend.Backend
+        self.compiler       = compiler
+        self.target         = target
+        # Every worker thread compiles its candidates in its own scratch directory
+        self.scratch        = JSC.ScratchSpace(prefix="jazzyreduce")
+
+    def classify(self, source):
+
+        source_file = self.scratch.write("candidate.jazz", source)
+        error_codes = [JF.run_compiler(self.compiler, source_file, self.scratch.path("candidate.s"),
+                                       self.scratch.pass_fds()).splitlines(),
+                       JF.safety_lines(JF.run_safety_check(self.compiler, source_file, self.scratch.pass_fds()))]
+
+        return JF.error_classes(error_codes)
+
+    def set_target(self, source):
+
+        """
+
+            Without an explicit target every non-warning class of the original program is the target
+
+        """
+
+        if self.target is None:
+
+            classes     = self.classify(source)
+            self.target = [x for x in classes if not x.startswith("warning")] or classes
+
+        return self.target
+
+    def __call__(self, source):
+
+        classes = self.classify(source)
+
+        return all(any(x.startswith(target) for x in classes) for target in self.target)
+
+    def close(self):
+
+        self.scratch.close()
+
+
+class NonterminationTester:
+
+    """
+
+        Interesting if the reference interpreter runs out of steps on any of the inputs
+
+    """
+
+    def __init__(self, inputs=None, step_budget=10000):
+
+        self.inputs      = np.arange(-64, 64) if inputs is None else inputs
+        self.step_budget = step_budget
+        self.target      = ["nontermination"]
+
+    def set_target(self, source):
+
+        return self.target
+
+    def __call__(self, source):
+
+        try:
+
+            return JI.predicts_nontermination(source, self.inputs, step_budget=self.step_budget)
+
+        except JI.InterpreterError:
+
+            return False
+
+    def close(self):
+
+        pass
+
+
+class JasminReducer:
+
+    def __init__(self, tester, workers=4):
+
+        self.tester     = tester
+        self.workers    = workers
+        self.cache      = {}
+        self.tests      = 0
+        self.cache_hits = 0
+
+    """
+
+        CANDIDATES
+
+    """
+
+    def candidates(self, program):
+
+        yield from self.instruction_removals(program)
+        yield from self.block_hoists(program)
+        yield from self.expression_simplifications(program)
+        yield from self.declaration_removals(program)
+
+    def instruction_removals(self, program):
+
+        for path in JP.block_paths(program):
+
+            block = JP.get_at(program, path)
+            size  = len(block)
+
+            while size > 0:
+
+                for start in range(0, len(block), size):
+
+                    yield JP.set_at(program, path, block[:start] + block[start + size:])
+
+                size = size // 2
+
+    def block_hoists(self, program):
+
+        for path in JP.block_paths(program):
+
+            block = JP.get_at(program, path)
+
+            for index, instruction in enumerate(block):
+
+                for field in JP.BLOCK_FIELDS:
+
+                    if field in instruction._fields and getattr(instruction, field) is not None:
+
+                        inner = getattr(instruction, field)
+
+                        yield JP.set_at(program, path, block[:index] + inner + block[index + 1:])
+
+    def expression_simplifications(self, program):
+
+        for path in JP.expression_paths(program):
+
+            expr  = JP.get_at(program, path)
+            types = JP.variable_declarations(JP.get_at(program, path[:2]))
+
+            for replacement in self.simpler_expressions(expr, types):
+
+                yield JP.set_at(program, path, replacement)
+
+    def simpler_expressions(self, expr, types):
+
+        if isinstance(expr, (JP.Const, JP.Bool, JP.Prim)):
+
+            return []
+
+        result = []
+
+        if isinstance(expr, JP.Binop) and expr.op not in COMPARE_OPS:
+
+            result += [expr.left, expr.right]
+
+        if isinstance(expr, JP.Unop):
+
+            result.append(expr.expr)
+
+        if self.is_bool(expr, types):
+
+            result += [JP.Bool(True), JP.Bool(False)]
+
+        elif not (isinstance(expr, JP.Var) and types[expr.name].size is not None):
+
+            result.append(JP.Const(0))
+
+        return result
+
+    def is_bool(self, expr, types):
+
+        if isinstance(expr, JP.Bool):
+
+            return True
+
+        if isinstance(expr, (JP.Var, JP.Index)):
+
+            return expr.name in types and types[expr.name].type == JT.BOOL
+
+        if isinstance(expr, JP.Unop):
+
+            return self.is_bool(expr.expr, types)
+
+        if isinstance(expr, JP.Binop):
+
+            return expr.op in COMPARE_OPS or expr.op in LOGIC_OPS or self.is_bool(expr.left, types)
+
+        return False
+
+    def declaration_removals(self, program):
+
+        for index, function in enumerate(program.functions):
+
+            used = JP.used_variables(function)
+
+            for position, decl in enumerate(function.decls):
+
+                if decl.name not in used:
+
+                    decls = function.decls[:position] + function.decls[position + 1:]
+
+                    yield JP.set_at(program, ("functions", index, "decls"), decls)
+
+    """
+
+        TESTING
+
+    """
+
+    def verdict(self, source):
+
+        key = source_hash(source)
+
+        if key not in self.cache:
+
+            self.cache[key] = self.tester(source)
+            self.tests += 1
+
+        return self.cache[key]
+
+    def first_interesting(self, candidates, executor):
+
+        """
+
+            Test the candidates in batches of one per worker, return the first interesting one in candidate order
+
+        """
+
+        batch = []
+
+        for candidate in candidates:
+
+            source = JP.render(candidate)
+
+            if source_hash(source) in self.cache:
+
+                self.cache_hits += 1
+
+                if self.cache[source_hash(source)]:
+
+                    return candidate
+
+                continue
+
+            batch.append((candidate, source))
+
+            if len(batch) == self.workers:
+
+                found = self.test_batch(batch, executor)
+
+                if found is not None:
+
+                    return found
+
+                batch = []
+
+        if len(batch) > 0:
+
+            return self.test_batch(batch, executor)
+
+        return None
+
+    def test_batch(self, batch, executor):
+
+        verdicts = list(executor.map(self.tester, [x[1] for x in batch]))
+
+        for (candidate, source), verdict in zip(batch, verdicts):
+
+            self.cache[source_hash(source)] = verdict
+            self.tests += 1
+
+        for (candidate, _), verdict in zip(batch, verdicts):
+
+            if verdict:
+
+                return candidate
+
+        return None
+
+    def reduce(self, program):
+
+        if isinstance(program, str):
+
+            program = JP.parse(program)
+
+        source = JP.render(program)
+        self.tester.set_target(source)
+
+        if not self.verdict(source):
+
+            raise Exception("the original program is not interesting for " + str(self.tester.target))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+
+            while True:
+
+                smaller = self.first_interesting(self.candidates(program), executor)
+
+                if smaller is None:
+
+                    return program
+
+                program = smaller
+
+
+def main(compiler=None):
+
+    """
+
+        compiler is a jasminBackend.Backend, without one the path of a jasminc is the first argument
+
+    """
+
+    args = sys.argv[1:]
+
+    workers = 4
+    target  = None
+    hang    = "--hang" in args
+
+    if hang:
+
+        args.remove("--hang")
+
+    if "--workers" in args:
+
+        workers = int(args[args.index("--workers") + 1])
+        del args[args.index("--workers"):args.index("--workers") + 2]
+
+    if "--target" in args:
+
+        target = [args[args.index("--target") + 1]]
+        del args[args.index("--target"):args.index("--target") + 2]
+
+    if compiler is None:
+
+        compiler, program = args
+
+    else:
+
+        [program] = args
+
+    if program.endswith(".jazz"):
+
+        with open(program, "r") as file:
+            source = file.read()
+
+        out_path = program[:-len(".jazz")] + ".reduced.jazz"
+
+    else:
+
+        source   = JPP.jasmin_pretty_print("".join(str(x) for x in JPG.JasminGenerator(int(program)).get_program()))
+        out_path = program + ".reduced.jazz"
+
+    tester  = NonterminationTester() if hang else JasmincTester(compiler, target)
+    reducer = JasminReducer(tester, workers=workers)
+
+    try:
+
+        reduced = JP.render(reducer.reduce(source))
+
+    finally:
+
+        tester.close()
+
+    with open(out_path, "w") as file:
+        file.write(reduced)
+
+    print(reduced)
+    print("TARGET:", tester.target, "TESTS:", reducer.tests, "CACHE HITS:", reducer.cache_hits,
+          "SIZE:", len(source), "->", len(reduced))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,489 @@
+"""
+
+    Code size and instruction count regressions between jasminc builds.
+
+    Compiles a fixed set of programs (a seed range, or the programs of a jasminCorpus archive) with every build of a
+    jasminDifferential matrix file, normalises the assembly and compares every build with the baseline (the first
+    cell of the matrix unless --baseline names another) on
+
+        Instructions        - instructions in the assembly
+        Frame               - bytes of stack the functions reserve: pushes and subtractions from %rsp
+        Spills / Reloads    - stores to / loads from the stack other than push and pop
+        MinCycles/MaxCycles - the static estimate of jasminCost
+
+    The normalised assembly has no comments or assembler bookkeeping directives, one space between the mnemonic and
+    the operands and its local labels renamed L0, L1, ... in the order they are defined, so two builds that only
+    number their labels differently write the same text. Every normalised assembly is stored once, compressed, under
+    its sha1 with its metrics, and every compilation is stored under (program hash, build hash) as in
+    jasminDifferential. Running the same programs against a third build only compiles that build.
+
+
+    Methods:
+
+        normalise:
+
+            - the normalised text of an assembly
+
+        metrics:
+
+            - the regression metrics of a normalised assembly
+
+        RegressionStore.lookup / store:
+
+            - the stored compilation of a program by a build / store one, its assembly only when it is new
+
+        compare:
+
+            - one row per program and build with its metrics and the difference to the baseline
+
+
+    Usage:
+
+        python jasminRegression.py <builds.json> <start> <end> [--corpus <archive>] [--baseline <name>] [--top N]
+                                   [--workers N] [--store <regression.sqlite>] [--terminating] [--diff <seed>]
+
+            - compile the seeds start to end (or the archive seeds in that range) with every build, print the
+              programs with the largest regressions and write <data_path>regression_<start>_<end>.csv, --diff
+              prints the normalised assembly diff of one seed between the baseline and every build
+
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import zlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+import jasminConfig as JCF
+import jasminCost as JCO
+import jasminDifferential as JDF
+import jasminFuzzer as JF
+import jasminGenerator as JPG
+import jasminPolicy as JPO
+import jasminScratch as JSC
+
+
+SCHEMA = """
+
+    CREATE TABLE IF NOT EXISTS assemblies (
+        hash                TEXT PRIMARY KEY,
+        assembly            BLOB NOT NULL,
+        metrics             TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS compilations (
+        program             TEXT NOT NULL,
+        build               TEXT NOT NULL,
+        assembly            TEXT,
+        errors              TEXT,
+        time                REAL,
+        PRIMARY KEY (program, build)
+    );
+
+"""
+
+METRICS     = ["Instructions", "Frame", "Spills", "Reloads", "MinCycles", "MaxCycles"]
+
+# Bookkeeping of the assembler that does not change the code
+SKIPPED     = (".cfi_", ".file", ".ident", ".size", ".type", ".section\t.note", ".section .note", ".loc")
+
+TOKEN_RE    = re.compile(r"[A-Za-z_.$][\w.$@]*")
+
+STACK       = {"rsp", "rbp"}
+
+
+def normalise(text):
+
+    """
+
+        The assembly without comments and bookkeeping directives, single spaced, with its local labels renumbered
+
+    """
+
+    lines   = []
+    symbols = set()
+
+    for line in text.splitlines():
+
+        line = " ".join(line.split("#")[0].split())
+
+        if line == "" or line.startswith(SKIPPED):
+
+            continue
+
+        match = JCO.GLOBL_RE.match(line)
+
+        if match is not None:
+
+            symbols.add(match.group(1))
+
+        lines.append(line)
+
+    labels = {}
+
+    for line in lines:
+
+        match = JCO.LABEL_RE.match(line)
+
+        if match is not None and match.group(1) not in symbols and match.group(1) not in labels:
+
+            labels[match.group(1)] = "L" + str(len(labels))
+
+    # Mnemonics and registers never collide with a label name, %rax is not matched as rax
+    return "".join(TOKEN_RE.sub(lambda x: labels.get(x.group(0), x.group(0)), line) + "\n" for line in lines)
+
+
+def immediate(operand):
+
+    try:
+
+        return int(operand[1:], 0) if operand.startswith("$") else None
+
+    except ValueError:
+
+        return None
+
+
+def metrics(assembly):
+
+    analysis = JCO.Analysis(assembly)
+    pushes   = 0
+    reserved = 0
+    spills   = 0
+    reloads  = 0
+
+    for instruction in analysis.instructions:
+
+        _, _, loads, stores, _, _ = instruction.effects()
+        operands                  = instruction.operands
+
+        if instruction.base == "push":
+
+            pushes += 1
+            continue
+
+        if instruction.base == "pop":
+
+            continue
+
+        if instruction.base == "sub" and operands[-1:] == ["%rsp"] and immediate(operands[0]) is not None:
+
+            reserved += immediate(operands[0])
+
+        if instruction.base == "lea" and operands[-1:] == ["%rsp"] and operands[0].endswith("(%rsp)"):
+
+            offset    = operands[0][:-len("(%rsp)")]
+            reserved -= int(offset, 0) if offset not in ["", "-"] else 0
+
+        spills  += sum(1 for x in stores if 0 < len(JCO.address_registers(x)) and JCO.address_registers(x) <= STACK)
+        reloads += sum(1 for x in loads if 0 < len(JCO.address_registers(x)) and JCO.address_registers(x) <= STACK)
+
+    return {"Instructions": len(analysis.instructions), "Frame": 8 * pushes + reserved, "Spills": spills,
+            "Reloads": reloads, "MinCycles": analysis.paths[1], "MaxCycles": analysis.paths[2]}
+
+
+class RegressionStore:
+
+    def __init__(self, path):
+
+        self.connection = sqlite3.connect(path)
+        self.compiled   = 0
+        self.cached     = 0
+
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+
+        self.connection.close()
+
+    def lookup(self, program, build):
+
+        """
+
+            (assembly hash or None, errors) of a stored compilation, None when the pair was never compiled
+
+        """
+
+        row = self.connection.execute("SELECT assembly, errors FROM compilations WHERE program = ? AND build = ?",
+                                      (program, build.hash)).fetchone()
+
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def assembly(self, digest):
+
+        row = self.connection.execute("SELECT assembly FROM assemblies WHERE hash = ?", (digest,)).fetchone()
+
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def metrics(self, digest):
+
+        row = self.connection.execute("SELECT metrics FROM assemblies WHERE hash = ?", (digest,)).fetchone()
+
+        return json.loads(row[0])
+
+    def store(self, program, build, assembly, errors, seconds):
+
+        """
+
+            Store a compilation, the normalised assembly is only stored and measured when it is new
+
+        """
+
+        digest = None
+
+        if assembly is not None:
+
+            digest = hashlib.sha1(assembly.encode("utf-8")).hexdigest()
+
+            if self.connection.execute("SELECT 1 FROM assemblies WHERE hash = ?", (digest,)).fetchone() is None:
+
+                self.connection.execute("INSERT INTO assemblies VALUES (?, ?, ?)",
+                                        (digest, zlib.compress(assembly.encode("utf-8"), 9),
+                                         json.dumps(metrics(assembly))))
+
+        self.connection.execute("INSERT OR REPLACE INTO compilations VALUES (?, ?, ?, ?, ?)",
+                                (program, build.hash, digest, json.dumps(errors), seconds))
+
+        return digest, errors
+
+
+def compile_program(build, source, scratch):
+
+    """
+
+        The normalised assembly (None when it did not compile) and the stderr lines of one build
+
+    """
+
+    source_file   = scratch.write(build.hash + ".jazz", source)
+    assembly_file = scratch.path(build.hash + ".s")
+
+    if os.path.exists(assembly_file):
+
+        os.remove(assembly_file)
+
+    process = JPO.start_compiler(build.backend, source_file, assembly_file, scratch.pass_fds(), build.flags)
+    errors  = JPO.finish(process).splitlines()
+
+    if process.returncode != 0 or not os.path.exists(assembly_file):
+
+        return None, errors
+
+    with open(assembly_file, "r") as file:
+
+        return normalise(file.read()), errors
+
+
+def compare(store, builds, programs, baseline, workers=None, scratch=None):
+
+    """
+
+        Yields one row per program and build: Seed, Build, Compiled, the METRICS and their difference to the
+        baseline (Delta<metric>), programs is a list of (seed, source)
+
+    """
+
+    scratch = JSC.ScratchSpace(prefix="jazzyregression") if scratch is None else scratch
+    workers = workers or os.cpu_count() or 1
+
+    def compile(build, source):
+
+        start = time.time()
+
+        return compile_program(build, source, scratch) + (time.time() - start,)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        for batch_start in range(0, len(programs), JDF.BATCH):
+
+            batch   = [(seed, source, JDF.program_hash(source))
+                       for seed, source in programs[batch_start:batch_start + JDF.BATCH]]
+            results = {}
+            pending = {}
+
+            for _, source, program in batch:
+
+                for build in builds:
+
+                    result = store.lookup(program, build)
+
+                    if result is not None:
+
+                        results[(program, build.name)] = result
+                        store.cached += 1
+
+                    elif (program, build.name) not in pending:
+
+                        pending[(program, build.name)] = (build, executor.submit(compile, build, source))
+
+            with store.connection:
+
+                for (program, name), (build, future) in pending.items():
+
+                    assembly, errors, seconds = future.result()
+
+                    results[(program, name)] = store.store(program, build, assembly, errors, seconds)
+                    store.compiled          += 1
+
+            for seed, _, program in batch:
+
+                base = results[(program, baseline.name)][0]
+                base = None if base is None else store.metrics(base)
+
+                for build in builds:
+
+                    digest = results[(program, build.name)][0]
+                    row    = {"Seed": seed, "Build": build.name, "Compiled": digest is not None, "Assembly": digest}
+                    values = None if digest is None else store.metrics(digest)
+
+                    for metric in METRICS:
+
+                        row[metric]            = None if values is None else values[metric]
+                        row["Delta" + metric] = (None if values is None or base is None
+                                                  else values[metric] - base[metric])
+
+                    yield row
+
+
+def load_programs(start, end, corpus=None, generator_options=None):
+
+    options = {} if generator_options is None else generator_options
+
+    if corpus is not None:
+
+        import jasminCorpus as JCP
+
+        config   = JF.program_config(options, JPG.JD.config_hash(), JPG.JD.config_hash())
+        reader   = JCP.CorpusReader(corpus)
+        programs = [(seed, reader.get(seed, config)) for seed in reader.seeds(config) if start <= seed < end]
+
+        reader.close()
+
+        return programs
+
+    return [(seed, JF.render(JPG.JasminGenerator(seed, **options))) for seed in range(start, end)]
+
+
+def print_diff(store, builds, baseline, program):
+
+    base = store.lookup(program, baseline)
+
+    for build in builds:
+
+        result = store.lookup(program, build)
+
+        if build is baseline or result is None or base is None:
+
+            continue
+
+        old = [] if base[0] is None else store.assembly(base[0]).splitlines(True)
+        new = [] if result[0] is None else store.assembly(result[0]).splitlines(True)
+
+        sys.stdout.writelines(difflib.unified_diff(old, new, baseline.name, build.name))
+
+
+def main(config=None):
+
+    config = JCF.load() if config is None else config
+
+    if len(sys.argv) < 4:
+
+        print(__doc__)
+        sys.exit(1)
+
+    options = {}
+
+    for flag, default, kind in [("--corpus", None, str), ("--baseline", None, str), ("--top", 20, int),
+                                ("--workers", None, int), ("--store", config["data_path"] + "regression.sqlite", str),
+                                ("--diff", None, int)]:
+
+        options[flag] = default
+
+        if flag in sys.argv:
+
+            options[flag] = kind(sys.argv[sys.argv.index(flag) + 1])
+            del sys.argv[sys.argv.index(flag):sys.argv.index(flag) + 2]
+
+    terminating = "--terminating" in sys.argv
+
+    if terminating:
+        sys.argv.remove("--terminating")
+
+    import pandas as pd
+
+    builds, _, _ = JDF.load_matrix(sys.argv[1])
+    start        = int(sys.argv[2])
+    end          = int(sys.argv[3])
+    baseline     = builds[0] if options["--baseline"] is None else next(x for x in builds
+                                                                         if x.name == options["--baseline"])
+    programs     = load_programs(start, end, options["--corpus"], {"terminating": terminating})
+    store        = RegressionStore(options["--store"])
+    scratch      = JSC.ScratchSpace(config["scratch_path"], prefix="jazzyregression", memfd=config["scratch_memfd"])
+    begin        = time.time()
+    results      = pd.DataFrame(list(compare(store, builds, programs, baseline, options["--workers"], scratch)))
+    path         = config["data_path"] + "regression_" + str(start) + "_" + str(end) + ".csv"
+
+    scratch.close()
+    results.to_csv(path)
+
+    print("PROGRAMS:", len(programs), "COMPILED:", store.compiled, "CACHED:", store.cached,
+          "ASSEMBLIES:", store.connection.execute("SELECT COUNT(*) FROM assemblies").fetchone()[0],
+          "TIME: %.2f s" % (time.time() - begin))
+
+    base = results[results["Build"] == baseline.name].set_index("Seed")
+
+    for build in builds:
+
+        if build is baseline:
+
+            continue
+
+        rows     = results[results["Build"] == build.name].set_index("Seed")
+        both     = rows[rows["Compiled"] & base["Compiled"]]
+        broken   = rows.index[~rows["Compiled"] & base["Compiled"]]
+
+        print(build.name, "AGAINST", baseline.name)
+        print("%-14s %12s %12s %10s" % ("Metric", baseline.name[:12], build.name[:12], "Change"))
+
+        for metric in METRICS:
+
+            old = base.loc[both.index, metric].sum()
+            new = both[metric].sum()
+
+            change = "%9.2f%%" % (100.0 * (new - old) / old) if old else "%10s" % ("-" if new == old else "new")
+
+            print("%-14s %12.1f %12.1f %s" % (metric, old, new, change))
+
+        print("REGRESSED:", int((both["DeltaInstructions"] > 0).sum()), "IMPROVED:",
+              int((both["DeltaInstructions"] < 0).sum()), "NO LONGER COMPILE:", len(broken),
+              "" if len(broken) == 0 else list(broken[:10]))
+
+        worst = both.sort_values(["DeltaInstructions", "DeltaMaxCycles", "DeltaSpills"], ascending=False)
+        worst = worst[(worst[["Delta" + x for x in METRICS]] > 0).any(axis=1)].head(options["--top"])
+
+        if len(worst) > 0:
+
+            print(worst.reset_index()[["Seed"] + ["Delta" + x for x in METRICS]].to_string(index=False))
+
+    if options["--diff"] is not None:
+
+        source = dict(programs).get(options["--diff"])
+
+        if source is not None:
+
+            print_diff(store, builds, baseline, JDF.program_hash(source))
+
+    store.close()
+
+    print("RESULTS:", path)
+
+
+if __name__ == '__main__':
+    main()
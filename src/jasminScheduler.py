@@ -0,0 +1,225 @@
+"""
+
+    Power scheduling of seeds and generator configurations.
+
+    Sweeping a contiguous seed range spends most executions on programs that end in the same couple of outcomes. The
+    scheduler instead splits the range into families of consecutive seeds and combines every family with every
+    generator configuration (CONFIGS). Such an (configuration, family) arm hands out its seeds in order, and the next
+    arm is drawn with a probability proportional to its energy:
+
+        energy = (1 + reward_weight * score) / (1 + runs)
+
+    where score is a decayed sum of the rewards of the arm's programs: 1 for every new bucket, unsafe_reward for a
+    program that is not safe and slow_reward for a compile that took slow_factor times the running mean. Arms that
+    were never run start at energy 1, arms that keep producing the same outcomes fade out, and an exhausted arm has
+    energy 0.
+
+    Every execution is written to a JSON lines log with the seed, the configuration, the energy of the arm when it was
+    drawn and the outcome. The arm's configuration is merged with the generator options of the campaign (--swarm,
+    --terminating, ...), so the log also keeps the options the program was actually generated with and the hashes of
+    its distribution config and adaptive weights. Every result of a scheduled campaign can be regenerated with
+    JasminGenerator(seed, **options) and the distribution config of the logged hash.
+
+
+    Methods:
+
+        plan:
+
+            - yield (seed, configuration) decisions, report must be called for each before the next is drawn
+
+        report:
+
+            - record the outcome of the last decision
+
+        generator / replay:
+
+            - the JasminGenerator of a scheduled decision and the (seed, configuration, options) decisions of a log
+
+"""
+
+import json
+import sys
+
+import numpy as np
+
+import jasminGenerator as JPG
+
+
+"""
+
+    Generator configurations, name -> JasminGenerator keyword arguments
+
+"""
+
+CONFIGS = {
+
+    "default"           : {},
+    "swarm"             : {"swarm": True},
+    "terminating"       : {"terminating": True},
+    "swarm_terminating" : {"swarm": True, "terminating": True}
+
+}
+
+
+def generator(seed, config="default", **kwargs):
+
+    options = dict(CONFIGS[config])
+    options.update(kwargs)
+
+    return JPG.JasminGenerator(seed, **options)
+
+
+def replay(log_path):
+
+    """
+
+        The (seed, configuration, options) decisions of a schedule log, in the order they were executed. options are
+        the effective generator options, a log written before they were logged falls back to the configuration's
+
+    """
+
+    with open(log_path, "r") as file:
+
+        for line in file:
+
+            entry = json.loads(line)
+
+            yield entry["seed"], entry["config"], entry.get("options", CONFIGS[entry["config"]])
+
+
+class Arm:
+
+    def __init__(self, config, family, start, end):
+
+        self.config = config
+        self.family = family
+        self.next   = start
+        self.end    = end
+        self.runs   = 0
+        self.score  = 0.0
+
+
+class PowerScheduler:
+
+    def __init__(self, start, end, family_size=100, configs=None, log_path=None, schedule_seed=0,
+                 reward_weight=4.0, decay=0.9, unsafe_reward=0.25, slow_reward=0.5, slow_factor=3.0):
+
+        self.configs        = list(CONFIGS) if configs is None else configs
+        self.log_path       = log_path
+        self.state          = np.random.RandomState(schedule_seed)
+        self.reward_weight  = reward_weight
+        self.decay          = decay
+        self.unsafe_reward  = unsafe_reward
+        self.slow_reward    = slow_reward
+        self.slow_factor    = slow_factor
+
+        self.arms           = [Arm(config, family, family, min(family + family_size, end))
+                               for config in self.configs for family in range(start, end, family_size)]
+        self.steps          = 0
+        self.time_total     = 0.0
+        self.pending        = None
+
+    def energy(self, arm):
+
+        if arm.next >= arm.end:
+
+            return 0.0
+
+        return (1 + self.reward_weight * arm.score) / (1 + arm.runs)
+
+    def choose(self):
+
+        energies = np.array([self.energy(arm) for arm in self.arms])
+        total    = energies.sum()
+
+        if total == 0:
+
+            return None, 0.0
+
+        index = self.state.choice(len(self.arms), p=energies / total)
+
+        return self.arms[index], energies[index]
+
+    def plan(self, budget):
+
+        for _ in range(budget):
+
+            arm, energy = self.choose()
+
+            if arm is None:
+
+                return
+
+            seed      = arm.next
+            arm.next += 1
+
+            self.pending = (arm, seed, energy)
+
+            yield seed, arm.config
+
+    def is_slow(self, seconds):
+
+        # The first executions only build up the mean
+        if self.steps < 20:
+
+            return False
+
+        return seconds > self.slow_factor * self.time_total / self.steps
+
+    def report(self, new_buckets, safe, seconds, options=None, distributions=None, weights=None):
+
+        """
+
+            Record the outcome of the last decision. options are the generator options it ran with, the distribution
+            config itself is logged by its hash (distributions), weights is the hash of adaptive weights if any
+
+        """
+
+        arm, seed, energy = self.pending
+        slow              = self.is_slow(seconds)
+        reward            = len(new_buckets) + (0 if safe else self.unsafe_reward) + (self.slow_reward if slow else 0)
+
+        arm.runs         += 1
+        arm.score         = self.decay * arm.score + reward
+
+        self.steps       += 1
+        self.time_total  += seconds
+        self.pending      = None
+
+        if self.log_path is not None:
+
+            with open(self.log_path, "a") as file:
+                entry = {"step": self.steps, "seed": seed, "config": arm.config, "family": arm.family,
+                         "energy": round(float(energy), 6), "new_buckets": list(new_buckets), "safe": bool(safe),
+                         "seconds": round(seconds, 4), "slow": slow}
+
+                if options is not None:
+
+                    entry["options"] = {x: options[x] for x in options if x != "distribution_config"}
+
+                if distributions is not None:
+
+                    entry["distributions"] = distributions
+
+                if weights:
+
+                    entry["weights"] = weights
+
+                file.write(json.dumps(entry) + "\n")
+
+        return reward
+
+    def print_table(self, top=20, file=sys.stdout):
+
+        """
+
+            The arms with the most energy left
+
+        """
+
+        print("%-18s %8s %6s %8s %8s" % ("Config", "Family", "Runs", "Score", "Energy"), file=file)
+
+        for arm in sorted(self.arms, key=lambda x: -self.energy(x))[:top]:
+
+            print("%-18s %8d %6d %8.3f %8.3f" % (arm.config, arm.family, arm.runs, arm.score, self.energy(arm)),
+                  file=file)
@@ -0,0 +1,179 @@
+"""
+
+    Scratch space for the files jasminc and gcc read and write.
+
+    Every program is written to a .jazz file, compiled to assembly and (for the timing runs) linked to a binary, all
+    of which is thrown away right after. A ScratchSpace puts these files on /dev/shm (a tmpfs, memory only) when it
+    exists and in the temporary directory otherwise, so many parallel workers do not turn into disk traffic.
+
+    Every ScratchSpace is its own directory named after the process, and every thread gets its own subdirectory, so
+    workers never overwrite each other's files. The directory is removed on close and at exit, and directories of
+    processes that died without cleaning up are removed when the next ScratchSpace is created.
+
+    With memfd=True (Linux) write keeps a file in an anonymous memory file instead and returns its /proc/self/fd/N
+    path, which a child process can open when the descriptor is passed on (pass_fds). Only files written with write
+    can be memory files, outputs of the compiler still go to path.
+
+
+    Methods:
+
+        path / write:
+
+            - the path of a scratch file of the calling thread / write a scratch file and return its path
+
+        pass_fds:
+
+            - the memory file descriptors of the calling thread, for subprocess.Popen(pass_fds=...)
+
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+
+
+PREFIX = "jazzy"
+
+
+def default_root():
+
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+
+        return "/dev/shm"
+
+    return tempfile.gettempdir()
+
+
+def process_alive(pid):
+
+    try:
+
+        os.kill(pid, 0)
+
+    except ProcessLookupError:
+
+        return False
+
+    except PermissionError:
+
+        return True
+
+    return True
+
+
+def remove_stale(root, prefix=PREFIX):
+
+    """
+
+        Remove the scratch directories of processes that no longer exist
+
+    """
+
+    for name in os.listdir(root):
+
+        parts = name.split("_")
+
+        if len(parts) >= 3 and parts[0] == prefix and parts[1].isdigit() and not process_alive(int(parts[1])):
+
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+class ScratchSpace:
+
+    def __init__(self, root=None, prefix=PREFIX, memfd=False):
+
+        self.root       = default_root() if root is None else root
+        self.prefix     = prefix
+        self.memfd      = memfd and hasattr(os, "memfd_create")
+        self.local      = threading.local()
+        self.fds        = []
+
+        # A configured scratch_path need not exist yet
+        os.makedirs(self.root, exist_ok=True)
+        remove_stale(self.root, prefix)
+
+        self.directory  = tempfile.mkdtemp(prefix=prefix + "_" + str(os.getpid()) + "_", dir=self.root)
+
+        atexit.register(self.close)
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def worker_directory(self):
+
+        if not hasattr(self.local, "directory"):
+
+            self.local.directory = os.path.join(self.directory, str(threading.get_ident()))
+            self.local.memory    = {}
+
+            os.makedirs(self.local.directory, exist_ok=True)
+
+        return self.local.directory
+
+    def path(self, name):
+
+        return os.path.join(self.worker_directory(), name)
+
+    def write(self, name, text):
+
+        """
+
+            Write a scratch file of the calling thread, returns the path to hand to the compiler
+
+        """
+
+        if not self.memfd:
+
+            with open(self.path(name), "w") as file:
+                file.write(text)
+
+            return self.path(name)
+
+        self.worker_directory()
+
+        if name not in self.local.memory:
+
+            fd = os.memfd_create(name)
+            self.local.memory[name] = fd
+            self.fds.append(fd)
+
+        fd   = self.local.memory[name]
+        data = text.encode("utf-8")
+
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, data, 0)
+
+        return "/proc/self/fd/" + str(fd)
+
+    def pass_fds(self):
+
+        if not self.memfd:
+
+            return ()
+
+        self.worker_directory()
+
+        return tuple(self.local.memory.values())
+
+    def close(self):
+
+        for fd in self.fds:
+
+            try:
+
+                os.close(fd)
+
+            except OSError:
+
+                pass
+
+        self.fds = []
+
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,453 @@
+"""
+
+    SQLite store for campaign results.
+
+    The fuzzer and the timing runner write one CSV per seed range, and the timing runner reads its seeds from a
+    pickled list. The store keeps all of it in one SQLite database (WAL mode, so analyses can read while a campaign
+    writes) with one row per program and indexes on the columns the analyses filter on:
+
+        seeds           - seed, config, campaign, size, generation time, distribution config hash, stage policy,
+                          skipped stages (see jasminPolicy), program hash (see program_hash, none for imported CSVs)
+        compile_outcomes- seed, config, compile time, compiler stderr lines (JSON)
+        safety_verdicts - seed, config, safe, safety check time, safety lines (JSON), no row if the check was skipped
+        bucket_hits     - seed, config, bucket id (see jasminBuckets), stage, signature
+        buckets         - bucket id, stage, signature, normalised text, example line
+        timing_runs     - seed, time, fastest, slowest, inputs, total running time, timed out, campaign
+        program_sets    - named sets of seeds (the secure programs the timing runner measures)
+
+    A program is identified by (seed, config), config is "" for the default generator and otherwise names the generator
+    options, distribution config and adaptive weights of the program (see jasminFuzzer.program_config). Running a
+    seed again with the same config replaces its rows. Inserts are buffered and written in one transaction per batch_size programs.
+
+
+    Methods:
+
+        add_result / add_timing / add_program_set:
+
+            - buffer one fuzzer result / timing run / set of seeds
+
+        import_results_csv / import_timing_csv / import_program_set:
+
+            - import the existing result CSVs and the pickled list of secure programs
+
+        query / safe_seeds_with_bucket:
+
+            - run SQL against the store
+
+
+    Usage:
+
+        python jasminStore.py <store.sqlite> import <results_*.csv | time_measure_results_*.csv | *.p> ...
+
+        python jasminStore.py <store.sqlite> query "<sql>"
+
+"""
+
+import ast
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import time
+
+import jasminBuckets as JB
+
+
+SCHEMA = """
+
+    CREATE TABLE IF NOT EXISTS seeds (
+        seed                INTEGER NOT NULL,
+        config              TEXT NOT NULL DEFAULT '',
+        campaign            TEXT,
+        size                INTEGER,
+        generation_time     REAL,
+        distributions       TEXT,
+        policy              TEXT,
+        skipped             TEXT,
+        program             TEXT,
+        PRIMARY KEY (seed, config)
+    );
+
+    CREATE TABLE IF NOT EXISTS compile_outcomes (
+        seed                INTEGER NOT NULL,
+        config              TEXT NOT NULL DEFAULT '',
+        compile_time        REAL,
+        errors              TEXT,
+        PRIMARY KEY (seed, config)
+    );
+
+    CREATE TABLE IF NOT EXISTS safety_verdicts (
+        seed                INTEGER NOT NULL,
+        config              TEXT NOT NULL DEFAULT '',
+        safe                INTEGER,
+        safety_check_time   REAL,
+        errors              TEXT,
+        PRIMARY KEY (seed, config)
+    );
+
+    CREATE TABLE IF NOT EXISTS bucket_hits (
+        seed                INTEGER NOT NULL,
+        config              TEXT NOT NULL DEFAULT '',
+        bucket              TEXT NOT NULL,
+        stage               TEXT,
+        signature           TEXT,
+        PRIMARY KEY (seed, config, bucket)
+    );
+
+    CREATE TABLE IF NOT EXISTS buckets (
+        bucket              TEXT PRIMARY KEY,
+        stage               TEXT,
+        signature           TEXT,
+        text                TEXT,
+        example             TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS timing_runs (
+        id                  INTEGER PRIMARY KEY AUTOINCREMENT,
+        seed                INTEGER NOT NULL,
+        time                REAL,
+        fastest             REAL,
+        slowest             REAL,
+        fastest_input       INTEGER,
+        slowest_input       INTEGER,
+        total_running_time  REAL,
+        timed_out           INTEGER NOT NULL DEFAULT 0,
+        campaign            TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS program_sets (
+        name                TEXT NOT NULL,
+        seed                INTEGER NOT NULL,
+        PRIMARY KEY (name, seed)
+    );
+
+    CREATE INDEX IF NOT EXISTS seeds_size        ON seeds (size);
+    CREATE INDEX IF NOT EXISTS safety_safe       ON safety_verdicts (safe, seed);
+    CREATE INDEX IF NOT EXISTS bucket_hits_bucket ON bucket_hits (bucket, config, seed);
+    CREATE INDEX IF NOT EXISTS timing_runs_seed  ON timing_runs (seed);
+
+"""
+
+"""
+
+    Columns added after the first stores were created, (table, column, type)
+
+"""
+
+ADDED_COLUMNS = [
+
+    ("seeds", "distributions", "TEXT"),
+    ("seeds", "policy", "TEXT"),
+    ("seeds", "skipped", "TEXT"),
+    ("seeds", "program", "TEXT")
+
+]
+
+
+def skipped_stages(value):
+
+    """
+
+        The Skipped column of a result CSV as a list, empty cells are read as NaN
+
+    """
+
+    return [x for x in value.split(",") if x != ""] if isinstance(value, str) else []
+
+
+def safety_skipped(skipped):
+
+    return any(x.startswith("safety") for x in skipped)
+
+
+def program_hash(source):
+
+    """
+
+        The sha1 of a program without its comment lines, the header carries the time it was generated at
+
+    """
+
+    code = "\n".join(x for x in source.splitlines() if not x.startswith("//"))
+
+    return hashlib.sha1(code.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+
+    def __init__(self, path, batch_size=500):
+
+        self.path       = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        self.pending    = {"seeds": [], "compile_outcomes": [], "safety_verdicts": [], "bucket_hits": [],
+                           "buckets": [], "timing_runs": [], "program_sets": []}
+        self.programs   = 0
+
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        for table, column, column_type in ADDED_COLUMNS:
+
+            if column not in [x[1] for x in self.connection.execute("PRAGMA table_info(" + table + ")")]:
+
+                self.connection.execute("ALTER TABLE " + table + " ADD COLUMN " + column + " " + column_type)
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    """
+
+        WRITING
+
+    """
+
+    def add_result(self, seed, error_codes, size, safe, generation_time=None, safety_check_time=None,
+                   compile_time=None, config="", campaign=None, distributions=None, policy=None, skipped=(),
+                   program=None):
+
+        """
+
+            One fuzzer result, error_codes is the [[compile lines], [safety lines]] list of the fuzzer. safe is None
+            when the safety check was skipped. program is the program_hash of the source.
+
+        """
+
+        seed = int(seed)
+
+        # a program queued again in the same batch replaces its pending rows, like flush replaces the stored ones
+        for table in ["seeds", "compile_outcomes", "safety_verdicts", "bucket_hits"]:
+
+            self.pending[table] = [x for x in self.pending[table] if (x[0], x[1]) != (seed, config)]
+
+        self.pending["seeds"].append((seed, config, campaign, int(size), generation_time, distributions, policy,
+                                      ",".join(skipped), program))
+        self.pending["compile_outcomes"].append((seed, config, compile_time, json.dumps(error_codes[0])))
+
+        if safe is not None:
+
+            self.pending["safety_verdicts"].append((seed, config, int(bool(safe)), safety_check_time,
+                                                    json.dumps(error_codes[1])))
+
+        for key, (stage, signature, text, line) in JB.buckets_of(error_codes).items():
+
+            self.pending["bucket_hits"].append((seed, config, key, stage, signature))
+            self.pending["buckets"].append((key, stage, signature, text, line))
+
+        self.programs += 1
+
+        if self.programs % self.batch_size == 0:
+
+            self.flush()
+
+    def add_timing(self, seed, run_time, fastest, slowest, fastest_input, slowest_input, total_running_time,
+                   timed_out=False, campaign=None):
+
+        self.pending["timing_runs"].append((int(seed), run_time, fastest, slowest, fastest_input, slowest_input,
+                                            total_running_time, int(timed_out), campaign))
+
+        if len(self.pending["timing_runs"]) >= self.batch_size:
+
+            self.flush()
+
+    def add_program_set(self, name, seeds):
+
+        self.pending["program_sets"] += [(name, int(x)) for x in seeds]
+        self.flush()
+
+    def flush(self):
+
+        """
+
+            Write everything buffered in one transaction. A re-run program replaces its old rows, bucket hits
+            included.
+
+        """
+
+        with self.connection:
+
+            keys = [(x[0], x[1]) for x in self.pending["seeds"]]
+
+            self.connection.executemany("DELETE FROM bucket_hits WHERE seed = ? AND config = ?", keys)
+            self.connection.executemany("DELETE FROM safety_verdicts WHERE seed = ? AND config = ?", keys)
+
+            for table, statement in [
+                ("seeds",            "INSERT OR REPLACE INTO seeds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"),
+                ("compile_outcomes", "INSERT OR REPLACE INTO compile_outcomes VALUES (?, ?, ?, ?)"),
+                ("safety_verdicts",  "INSERT OR REPLACE INTO safety_verdicts VALUES (?, ?, ?, ?, ?)"),
+                ("bucket_hits",      "INSERT OR REPLACE INTO bucket_hits VALUES (?, ?, ?, ?, ?)"),
+                ("buckets",          "INSERT OR IGNORE INTO buckets VALUES (?, ?, ?, ?, ?)"),
+                ("timing_runs",      "INSERT INTO timing_runs (seed, time, fastest, slowest, fastest_input, "
+                                     "slowest_input, total_running_time, timed_out, campaign) "
+                                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"),
+                ("program_sets",     "INSERT OR IGNORE INTO program_sets VALUES (?, ?)")
+            ]:
+
+                if len(self.pending[table]) > 0:
+
+                    self.connection.executemany(statement, self.pending[table])
+                    self.pending[table] = []
+
+    def close(self):
+
+        self.flush()
+        self.connection.execute("PRAGMA optimize")
+        self.connection.close()
+
+    """
+
+        IMPORTING
+
+    """
+
+    def import_results_csv(self, csv_path):
+
+        import pandas as pd
+
+        campaign = os.path.splitext(os.path.basename(csv_path))[0]
+        results  = pd.read_csv(csv_path)
+        count    = 0
+
+        for row in results.itertuples(index=False):
+
+            try:
+
+                error_codes = ast.literal_eval(row.Errors)
+
+            except (ValueError, SyntaxError):
+
+                continue
+
+            skipped = skipped_stages(getattr(row, "Skipped", ""))
+            safe    = None if safety_skipped(skipped) else row.Safe in [True, "True"]
+
+            self.add_result(row.Seed, error_codes, row.Size, safe,
+                            generation_time=row.GenerationTime, safety_check_time=row.SafetyCheckTime,
+                            compile_time=getattr(row, "CompileTime", None), config=getattr(row, "Config", "") or "",
+                            campaign=campaign, distributions=getattr(row, "Distributions", None),
+                            policy=getattr(row, "Policy", None), skipped=skipped)
+            count += 1
+
+        self.flush()
+
+        return count
+
+    def import_timing_csv(self, csv_path):
+
+        """
+
+            The last row of a timing CSV holds the seeds that timed out, as a list in every column
+
+        """
+
+        import pandas as pd
+
+        campaign = os.path.splitext(os.path.basename(csv_path))[0]
+        results  = pd.read_csv(csv_path, dtype=str)
+        count    = 0
+
+        for row in results.itertuples(index=False):
+
+            if str(row.Seed).startswith("["):
+
+                for seed in ast.literal_eval(row.Seed):
+
+                    self.add_timing(seed, None, None, None, None, None, None, timed_out=True, campaign=campaign)
+                    count += 1
+
+                continue
+
+            self.add_timing(int(row.Seed), float(row.Time), float(row.Fastest), float(row.Slowest),
+                            int(row.F_input), int(row.S_input), float(row.Total_running_time), campaign=campaign)
+            count += 1
+
+        self.flush()
+
+        return count
+
+    def import_program_set(self, pickle_path, name=None):
+
+        name = os.path.splitext(os.path.basename(pickle_path))[0] if name is None else name
+
+        with open(pickle_path, "rb") as file:
+            seeds = pickle.load(file)
+
+        self.add_program_set(name, seeds)
+
+        return len(seeds)
+
+    def import_file(self, path):
+
+        if path.endswith(".p"):
+
+            return self.import_program_set(path)
+
+        if os.path.basename(path).startswith("time_measure_results"):
+
+            return self.import_timing_csv(path)
+
+        return self.import_results_csv(path)
+
+    """
+
+        READING
+
+    """
+
+    def query(self, sql, parameters=()):
+
+        self.flush()
+
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def safe_seeds_with_bucket(self, bucket, min_size=0, config=""):
+
+        # CROSS JOIN keeps SQLite from starting at the (unselective) safe index, the bucket index drives the join
+        return [x[0] for x in self.query(
+            "SELECT h.seed FROM bucket_hits h "
+            "CROSS JOIN safety_verdicts v ON v.seed = h.seed AND v.config = h.config "
+            "CROSS JOIN seeds s ON s.seed = h.seed AND s.config = h.config "
+            "WHERE h.bucket = ? AND h.config = ? AND v.safe = 1 AND s.size >= ? ORDER BY h.seed",
+            (bucket, config, min_size))]
+
+
+def main():
+
+    store = ResultStore(sys.argv[1])
+
+    try:
+
+        if sys.argv[2] == "import":
+
+            for path in sys.argv[3:]:
+
+                start = time.time()
+                count = store.import_file(path)
+
+                print("IMPORTED", count, "ROWS FROM", path, "IN", round(time.time() - start, 2), "s")
+
+        elif sys.argv[2] == "query":
+
+            start = time.time()
+
+            for row in store.query(sys.argv[3]):
+
+                print(*row, sep="\t")
+
+            print("TIME:", round((time.time() - start) * 1000, 2), "ms", file=sys.stderr)
+
+    finally:
+
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,10 @@
 import os
+import jasminConfig as JCF
 import jasminPrettyPrint as JPP
 import jasminGenerator as JPG
 DIR_PATH = os.path.dirname(os.path.realpath(__file__))
-target_folder = f"{DIR_PATH}/../evaluation/generated_data/NonterminatingPrograms"
-jasminc = "/Users/josefgharib/Desktop/jasmin/compiler./jasminc"
+target_folder = JCF.load()["evaluation_path"] + "generated_data/NonterminatingPrograms"
+jasminc = JCF.load()["compiler_path"]
 non_terminating_seeds = [30068, 31542, 33216, 33770, 34620, 35353, 35625, 35951, 39907, 44706, 44964, 45240, 45676]
 
 for prog_seed in non_terminating_seeds:
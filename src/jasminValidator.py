@@ -0,0 +1,998 @@
+"""
+
+    Typing and storage pre-check of generated programs, without launching jasminc.
+
+    global_declarations patches programs up so they typecheck, but a share of them still fails in the front end of
+    jasminc ("typing error") or in the register allocation ("the variable is already allocated"), which costs a full
+    compiler launch each. The validator applies the rules behind these errors to the jasminParser tree:
+
+        typing      - words are implicitly cast down but never up, an int is cast to any word: the type of a binary
+                      operation is the smaller of its word operands (a shift has the type of its left operand), the
+                      value of an assignment is cast into the type of its left value, x op= e is x = x op e
+                    - #CMP compares two u64, the return variables have exactly the declared return types, conditions
+                      are bool, the arguments of a call are cast into the parameter types
+        storage     - the count of a shift by a variable lives in RCX, so it can not be a parameter of an export
+                      function (RDI, RSI, RDX, R8, R9) or the variable it returns (RAX), also through inlined calls
+                    - a bool lives in a flag, a bool that is assigned two different flags of #CMP can not be allocated
+
+    The messages follow jasminc, so jasminBuckets files them in the buckets jasminc itself would. Three of the
+    problems can be repaired: a #CMP operand that is not a u64 is replaced with a fresh u64, a returned variable of
+    another type is cast into a fresh variable of the return type, and a pinned shift count is copied into a fresh
+    variable first. The other problems (an assignment that would widen a word, a bool on two flags) are only
+    reported, and the stage policies filter or repair programs with them, see jasminPolicy.
+
+    The rules are an approximation, agreement compares the verdicts with the ones jasminc gave for the programs in a
+    result store.
+
+
+    Methods:
+
+        validate / validate_source:
+
+            - the problems of a Program / of source text
+
+        repair / repair_source:
+
+            - a Program / source text with the problems that can be repaired repaired
+
+        agreement:
+
+            - the confusion of the validator and jasminc on the programs of a result store
+
+
+    Usage:
+
+        python jasminValidator.py check <seed | program.jazz> ...
+
+        python jasminValidator.py repair <seed | program.jazz>
+
+        python jasminValidator.py agreement <store.sqlite> [--limit N]
+
+"""
+
+import json
+import sys
+from collections import namedtuple
+
+import jasminParser as JP
+from jasminTypes import JasminTypes as JT
+
+
+Issue       = namedtuple("Issue", ["signature", "function", "text", "repair"])
+
+WORD_SIZES  = {JT.U8: 8, JT.U16: 16, JT.U32: 32, JT.U64: 64, JT.U128: 128, JT.U256: 256}
+
+COMPARE_OPS = ["==", "!=", "<", "<=", ">", ">="]
+LOGIC_OPS   = ["&&", "||"]
+SHIFT_OPS   = ["<<", ">>"]
+
+ARGUMENT_REGISTERS  = ["RDI", "RSI", "RDX", "RCX", "R8", "R9"]
+FLAGS               = ["OF", "CF", "SF", "PF", "ZF"]
+
+SIGNATURES          = ["typing error", "already allocated"]
+
+# The signatures whose rules jasminc confirmed on (nearly) every program they flagged in agreement, the stage
+# policies only filter and repair these unless a policy names its own (see jasminPolicy)
+PRECISE             = ["typing error"]
+
+"""
+
+    The operators jasminc folds on int constants, the bitwise ones are left for run time
+
+"""
+
+CONSTANT_OPS        = {
+    "+" : lambda x, y: x + y,       "-" : lambda x, y: x - y,       "*" : lambda x, y: x * y,
+    "==": lambda x, y: x == y,      "!=": lambda x, y: x != y,      "<" : lambda x, y: x < y,
+    "<=": lambda x, y: x <= y,      ">" : lambda x, y: x > y,       ">=": lambda x, y: x >= y,
+    "&&": lambda x, y: x and y,     "||": lambda x, y: x or y
+}
+
+U64                 = (JT.U64, None)
+BOOL                = (JT.BOOL, None)
+INT                 = (JT.INT, None)
+
+
+class TypingError(Exception):
+    pass
+
+
+def type_name(var_type):
+
+    base = var_type[0].value
+
+    if var_type[0] in WORD_SIZES:
+
+        base = base.upper()
+
+    return base if var_type[1] is None else base + "[" + str(var_type[1]) + "]"
+
+
+def is_word(var_type):
+
+    return var_type[0] in WORD_SIZES and var_type[1] is None
+
+
+def join(left, right):
+
+    """
+
+        The type of a binary operation on words / ints, None if there is none
+
+    """
+
+    if left == right:
+
+        return left
+
+    if left == INT and is_word(right):
+
+        return right
+
+    if right == INT and is_word(left):
+
+        return left
+
+    if is_word(left) and is_word(right):
+
+        return min(left, right, key=lambda x: WORD_SIZES[x[0]])
+
+    return None
+
+
+def castable(source, target):
+
+    if source == target:
+
+        return True
+
+    if source == INT and is_word(target) or is_word(source) and target == INT:
+
+        return True
+
+    return is_word(source) and is_word(target) and WORD_SIZES[source[0]] >= WORD_SIZES[target[0]]
+
+
+def cast(source, target):
+
+    if not castable(source, target):
+
+        raise TypingError("can not implicitly cast " + type_name(source) + " into " + type_name(target))
+
+
+def check(source, target):
+
+    if source != target:
+
+        raise TypingError("the expression has type " + type_name(source) + " instead of " + type_name(target))
+
+
+def environment(function):
+
+    return {x.name: (x.type, x.size) for x in function.params + function.decls}
+
+
+def expression_type(expr, env):
+
+    if isinstance(expr, JP.Const):
+
+        return INT
+
+    if isinstance(expr, JP.Bool):
+
+        return BOOL
+
+    if isinstance(expr, JP.Var):
+
+        if expr.name not in env:
+
+            raise TypingError("unknown variable " + expr.name)
+
+        return env[expr.name]
+
+    if isinstance(expr, JP.Index):
+
+        if expr.name not in env or env[expr.name][1] is None:
+
+            raise TypingError("the variable " + expr.name + " is not an array")
+
+        index = expression_type(expr.index, env)
+
+        if index != INT and not is_word(index):
+
+            raise TypingError("the expression has type " + type_name(index) + " instead of int")
+
+        return env[expr.name][0], None
+
+    if isinstance(expr, JP.Unop):
+
+        operand = expression_type(expr.expr, env)
+
+        if expr.op == "!":
+
+            check(operand, BOOL)
+
+        return operand
+
+    if isinstance(expr, JP.Binop):
+
+        left  = expression_type(expr.left, env)
+        right = expression_type(expr.right, env)
+
+        if expr.op in LOGIC_OPS:
+
+            check(left, BOOL)
+            check(right, BOOL)
+
+            return BOOL
+
+        if expr.op in SHIFT_OPS:
+
+            cast(right, (JT.U8, None) if is_word(right) else INT)
+
+            return left
+
+        operand = join(left, right)
+
+        if operand is None:
+
+            raise TypingError("can not implicitly cast " + type_name(right) + " into " + type_name(left))
+
+        return BOOL if expr.op in COMPARE_OPS else operand
+
+    if isinstance(expr, JP.Prim):
+
+        raise TypingError("#" + expr.name + " in an expression")
+
+    raise TypingError("unknown expression " + repr(expr))
+
+
+def constant(expr):
+
+    """
+
+        The value of an expression without variables, None if it has any. jasminc folds these conditions and drops
+        the branches they never take before the register allocation.
+
+    """
+
+    if isinstance(expr, JP.Const):
+
+        return expr.value
+
+    if isinstance(expr, JP.Bool):
+
+        return expr.value
+
+    if isinstance(expr, JP.Unop):
+
+        value = constant(expr.expr)
+
+        if value is None:
+
+            return None
+
+        return (not value) if expr.op == "!" else -value
+
+    if isinstance(expr, JP.Binop):
+
+        left  = constant(expr.left)
+        right = constant(expr.right)
+
+        if left is None or right is None or expr.op not in CONSTANT_OPS:
+
+            return None
+
+        return CONSTANT_OPS[expr.op](left, right)
+
+    return None
+
+
+def reads(instruction):
+
+    """
+
+        The variables an instruction reads itself, without its nested blocks
+
+    """
+
+    if isinstance(instruction, JP.Assign):
+
+        expressions = [instruction.expr] + [x.index for x in instruction.lvals if isinstance(x, JP.Index)]
+
+        if instruction.op != "=":
+
+            expressions += [x for x in instruction.lvals if x is not None]
+
+    elif isinstance(instruction, JP.For):
+
+        expressions = [instruction.start, instruction.end]
+
+    else:
+
+        expressions = [x for x in JP.instruction_expressions(instruction) if not isinstance(x, JP.Var) or
+                       not isinstance(instruction, JP.Call) or x not in instruction.lvals]
+
+    return set(x.name for expr in expressions for x in JP.walk_expression(expr) if isinstance(x, (JP.Var, JP.Index)))
+
+
+def lvalue_type(lval, env):
+
+    if isinstance(lval, JP.Index):
+
+        return expression_type(lval, env)
+
+    return expression_type(JP.Var(lval.name), env)
+
+
+class Validator:
+
+    def __init__(self, program):
+
+        self.program   = program
+        self.functions = {x.name: x for x in program.functions}
+        self.issues    = []
+
+    def issue(self, signature, function, text, repair=None):
+
+        self.issues.append(Issue(signature, function.name, text, repair))
+
+    """
+
+        TYPING
+
+    """
+
+    def typing(self, function):
+
+        env = environment(function)
+
+        for path, instruction in self.instructions(function.body, ("body",)):
+
+            try:
+
+                self.instruction(instruction, env, function, path)
+
+            except TypingError as error:
+
+                self.issue("typing error", function, str(error))
+
+        for name, declared in zip(function.ret, function.returns):
+
+            if name in env and env[name] != (declared.type, declared.size):
+
+                repair = ("return", name) if castable(env[name], (declared.type, declared.size)) else None
+
+                self.issue("typing error", function, "the expression has type " + type_name(env[name]) +
+                           " instead of " + type_name((declared.type, declared.size)), repair)
+
+    def instructions(self, body, path, live=False):
+
+        """
+
+            (path, instruction) of every instruction in textual order, with live the branches that a constant
+            condition never takes are left out
+
+        """
+
+        for index, instruction in enumerate(body):
+
+            yield path + (index,), instruction
+
+            condition = constant(instruction.cond) if live and isinstance(instruction, (JP.If, JP.While)) else None
+
+            if isinstance(instruction, JP.If):
+
+                if condition is not False:
+
+                    yield from self.instructions(instruction.then, path + (index, "then"), live)
+
+                if condition is not True:
+
+                    yield from self.instructions(instruction.orelse or (), path + (index, "orelse"), live)
+
+            elif isinstance(instruction, JP.While):
+
+                yield from self.instructions(instruction.pre or (), path + (index, "pre"), live)
+
+                if condition is not False:
+
+                    yield from self.instructions(instruction.body or (), path + (index, "body"), live)
+
+            elif isinstance(instruction, JP.For):
+
+                yield from self.instructions(instruction.body, path + (index, "body"), live)
+
+    def instruction(self, instruction, env, function, path):
+
+        if isinstance(instruction, (JP.If, JP.While)):
+
+            check(expression_type(instruction.cond, env), BOOL)
+
+        elif isinstance(instruction, JP.For):
+
+            check(expression_type(JP.Var(instruction.var), env), INT)
+            cast(expression_type(instruction.start, env), INT)
+            cast(expression_type(instruction.end, env), INT)
+
+        elif isinstance(instruction, JP.Call):
+
+            callee = self.functions.get(instruction.name)
+
+            if callee is None:
+
+                raise TypingError("unknown function " + instruction.name)
+
+            for arg, param in zip(instruction.args, callee.params):
+
+                cast(expression_type(arg, env), (param.type, param.size))
+
+            for lval, declared in zip(instruction.lvals, callee.returns):
+
+                if lval is not None:
+
+                    cast((declared.type, declared.size), lvalue_type(lval, env))
+
+        elif isinstance(instruction.expr, JP.Prim):
+
+            for position, arg in enumerate(instruction.expr.args):
+
+                arg_type = expression_type(arg, env)
+
+                if instruction.expr.name == "CMP" and not castable(arg_type, U64):
+
+                    self.issue("typing error", function, "can not implicitly cast " + type_name(arg_type) +
+                               " into U64", ("cmp", path, position))
+
+            for lval in instruction.lvals:
+
+                if lval is not None:
+
+                    check(BOOL, lvalue_type(lval, env))
+
+        else:
+
+            target = lvalue_type(instruction.lvals[0], env)
+            value  = expression_type(instruction.expr, env)
+
+            if instruction.op != "=":
+
+                operator = instruction.op[:-1]
+                value    = target if operator in SHIFT_OPS else join(target, value)
+
+                if value is None:
+
+                    raise TypingError("can not implicitly cast " + type_name(expression_type(instruction.expr, env)) +
+                                      " into " + type_name(target))
+
+            cast(value, target)
+
+    """
+
+        STORAGE
+
+    """
+
+    def storage(self, function):
+
+        """
+
+            Follow the inlined calls of an export function with the registers its variables are pinned to
+
+        """
+
+        pinned = {param.name: register for param, register in zip(function.params, ARGUMENT_REGISTERS)}
+
+        for name in function.ret[:1]:
+
+            pinned.setdefault(name, "RAX")
+
+        self.pinned_shifts(function, pinned, function, set())
+
+    def pinned_shifts(self, function, pinned, export, visiting):
+
+        visiting    = visiting | {function.name}
+        order, live = self.liveness(function)
+
+        for position, (instruction_path, instruction) in enumerate(order):
+
+            if isinstance(instruction, JP.Assign) and instruction.op in ["<<=", ">>="] and \
+               isinstance(instruction.expr, JP.Var) and pinned.get(instruction.expr.name, "RCX") != "RCX" and \
+               live(instruction.lvals[0].name, position):
+
+                repair = ("shift", instruction_path) if function is export else None
+
+                self.issue("already allocated", export, "can not allocate " + instruction.expr.name + " into RCX, "
+                           "the variable is already allocated in " + pinned[instruction.expr.name], repair)
+
+            elif isinstance(instruction, JP.Call) and instruction.name in self.functions and \
+                 instruction.name not in visiting:
+
+                callee = self.functions[instruction.name]
+                inner  = {}
+
+                for param, arg in zip(callee.params, instruction.args):
+
+                    if isinstance(arg, JP.Var) and arg.name in pinned:
+
+                        inner[param.name] = pinned[arg.name]
+
+                for name, lval in zip(callee.ret, instruction.lvals):
+
+                    if isinstance(lval, JP.Var) and lval.name in pinned:
+
+                        inner[name] = pinned[lval.name]
+
+                self.pinned_shifts(callee, inner, export, visiting)
+
+    def liveness(self, function):
+
+        """
+
+            The live instructions of a function in textual order and a test whether a variable written by the
+            instruction at a position is read again: a read by another instruction further down or anywhere in a
+            loop around it, or the return, keep it alive. jasminc drops the assignments that are not.
+
+        """
+
+        order    = list(self.instructions(function.body, ("body",), live=True))
+        loops    = []
+        read_at  = {}
+
+        for position, (path, instruction) in enumerate(order):
+
+            for name in reads(instruction):
+
+                read_at.setdefault(name, []).append(position)
+
+            if isinstance(instruction, (JP.While, JP.For)):
+
+                end = position
+
+                while end + 1 < len(order) and order[end + 1][0][:len(path)] == path:
+
+                    end += 1
+
+                loops.append((position, end))
+
+        def live(name, position):
+
+            if name in function.ret:
+
+                return True
+
+            return any(x > position or any(start <= x <= end and start <= position <= end for start, end in loops)
+                       for x in read_at.get(name, []) if x != position)
+
+        return order, live
+
+    def flags(self, function):
+
+        """
+
+            The live flags every bool is assigned
+
+        """
+
+        order, live = self.liveness(function)
+        assigned    = {}
+
+        for position, (_, instruction) in enumerate(order):
+
+            if isinstance(instruction, JP.Assign) and isinstance(instruction.expr, JP.Prim):
+
+                for flag, lval in zip(FLAGS, instruction.lvals):
+
+                    if isinstance(lval, JP.Var) and live(lval.name, position):
+
+                        assigned.setdefault(lval.name, [])
+
+                        if flag not in assigned[lval.name]:
+
+                            assigned[lval.name].append(flag)
+
+        for name, flags in assigned.items():
+
+            if len(flags) > 1:
+
+                self.issue("already allocated", function, "can not allocate " + name + " into " + flags[1] +
+                           ", the variable is already allocated in " + flags[0])
+
+    def run(self):
+
+        for function in self.program.functions:
+
+            self.typing(function)
+
+        # jasminc stops after the front end when the program does not typecheck
+        if len(self.issues) > 0:
+
+            return self.issues
+
+        for function in self.reachable():
+
+            self.flags(function)
+
+            if function.call_conv == "export":
+
+                self.storage(function)
+
+        return self.issues
+
+    def reachable(self):
+
+        """
+
+            The export functions and the functions they call, an inline function nobody calls is dropped by jasminc
+
+        """
+
+        pending = [x for x in self.program.functions if x.call_conv == "export"]
+        found   = []
+
+        while len(pending) > 0:
+
+            function = pending.pop()
+
+            if function in found:
+
+                continue
+
+            found.append(function)
+
+            for _, instruction in self.instructions(function.body, ("body",), live=True):
+
+                if isinstance(instruction, JP.Call) and instruction.name in self.functions:
+
+                    pending.append(self.functions[instruction.name])
+
+        return [x for x in self.program.functions if x in found]
+
+
+def validate(program):
+
+    return Validator(program).run()
+
+
+def validate_source(source):
+
+    """
+
+        The problems of a program, None if the program is outside of the subset jasminParser reads or nested too deep
+
+    """
+
+    # Very deeply nested programs exceed the recursion limit of the parser
+    try:
+
+        return validate(JP.parse(source))
+
+    except (JP.ParseError, RecursionError):
+
+        return None
+
+
+def error_line(issue):
+
+    """
+
+        An issue as a jasminc style error line, classified by jasminBuckets like the line jasminc would print
+
+    """
+
+    if issue.signature == "already allocated":
+
+        return "validator: " + issue.function + ": " + issue.text
+
+    return "validator: " + issue.function + ": typing error: " + issue.text
+
+
+"""
+
+    REPAIRS
+
+"""
+
+
+def fresh_name(function, base):
+
+    names = set(environment(function))
+    index = 0
+
+    while base + str(index) in names:
+
+        index += 1
+
+    return base + str(index)
+
+
+def insert_before(function, path, instructions):
+
+    block = JP.get_at(function, path[:-1])
+    block = block[:path[-1]] + tuple(instructions) + block[path[-1]:]
+
+    return JP.set_at(function, path[:-1], block)
+
+
+def repair_function(function, repair):
+
+    kind = repair[0]
+
+    if kind == "return":
+
+        declared = function.returns[function.ret.index(repair[1])]
+        name     = fresh_name(function, "ret")
+        copy     = JP.Assign((JP.Var(name),), "=", JP.Var(repair[1]))
+
+        return function._replace(decls=function.decls + (JP.Decl("reg", declared.type, declared.size, name),),
+                                 body=function.body + (copy,),
+                                 ret=tuple(name if x == repair[1] else x for x in function.ret))
+
+    if kind == "cmp":
+
+        _, path, position = repair
+        name              = fresh_name(function, "cmp")
+        instruction       = JP.get_at(function, path)
+        args              = list(instruction.expr.args)
+        args[position]    = JP.Var(name)
+        function          = JP.set_at(function, path, instruction._replace(expr=instruction.expr._replace(
+                                                                                                   args=tuple(args))))
+        function          = insert_before(function, path, [JP.Assign((JP.Var(name),), "=", JP.Const(0))])
+
+        return function._replace(decls=function.decls + (JP.Decl("reg", JT.U64, None, name),))
+
+    if kind == "shift":
+
+        path        = repair[1]
+        instruction = JP.get_at(function, path)
+        count       = environment(function)[instruction.expr.name]
+        name        = fresh_name(function, "count")
+        function    = JP.set_at(function, path, instruction._replace(expr=JP.Var(name)))
+        function    = insert_before(function, path, [JP.Assign((JP.Var(name),), "=", instruction.expr)])
+
+        return function._replace(decls=function.decls + (JP.Decl("reg", count[0], count[1], name),))
+
+    return function
+
+
+def repair(program, signatures=None):
+
+    """
+
+        Repair one problem at a time until none is left that can be repaired, returns the program and the amount of
+        repairs. With signatures only the problems of these signatures are repaired.
+
+    """
+
+    repairs = 0
+
+    while True:
+
+        issues = [x for x in validate(program) if x.repair is not None
+                  and (signatures is None or x.signature in signatures)]
+
+        if len(issues) == 0 or repairs >= 64:
+
+            return program, repairs
+
+        functions = list(program.functions)
+        index     = [x.name for x in functions].index(issues[0].function)
+
+        functions[index] = repair_function(functions[index], issues[0].repair)
+        program          = JP.Program(tuple(functions))
+        repairs         += 1
+
+
+def repair_source(source, signatures=None):
+
+    """
+
+        The source of the repaired program, unchanged when it can not be parsed or had nothing to repair. The comment
+        header is kept.
+
+    """
+
+    try:
+
+        program, repairs = repair(JP.parse(source), signatures)
+
+    except (JP.ParseError, RecursionError):
+
+        return source
+
+
+    if repairs == 0:
+
+        return source
+
+    header = "".join(x + "\n" for x in source.splitlines() if x.startswith("//"))
+
+    return header + JP.render(program)
+
+
+"""
+
+    AGREEMENT
+
+"""
+
+
+def jasminc_verdict(compile_lines):
+
+    """
+
+        The validator signatures among the compiler lines of a program, and whether jasminc failed at all
+
+    """
+
+    import jasminBuckets as JB
+
+    signatures = set(x[0] for x in map(JB.classify, compile_lines) if x is not None)
+
+    return sorted(signatures.intersection(SIGNATURES)), len(signatures - {"warning"}) > 0
+
+
+def agreement(store_path, limit=None):
+
+    """
+
+        Regenerate the default programs of a result store and compare the validator with the compile errors jasminc
+        reported for them. Returns a dictionary of counts per signature (and "any"): both, validator (only), failed
+        (validator only, but jasminc failed with another error, so nothing would be lost filtering it), jasminc
+        (only), neither, the programs that could not be parsed and the skipped rows: mismatched, a regenerated
+        program whose program hash is not the recorded one is not the program jasminc compiled (the generator
+        changed since), and unhashed, a row without a program hash (imported from a CSV) can not be matched.
+
+    """
+
+    import jasminFuzzer as JF
+    import jasminGenerator as JPG
+    import jasminStore as JRS
+
+    store   = JRS.ResultStore(store_path)
+    sql     = "SELECT s.seed, s.program, c.errors FROM seeds s JOIN compile_outcomes c ON s.seed = c.seed " \
+              "AND s.config = c.config WHERE s.config = '' AND (s.distributions IS NULL OR s.distributions = ?) " \
+              "AND (s.skipped IS NULL OR s.skipped NOT LIKE '%compile%') ORDER BY s.seed"
+    rows    = store.query(sql + ("" if limit is None else " LIMIT " + str(int(limit))), (JPG.JD.config_hash(),))
+    counts  = {name: {"both": 0, "validator": 0, "failed": 0, "jasminc": 0, "neither": 0}
+               for name in SIGNATURES + ["any"]}
+    counts["unparsed"]   = 0
+    counts["mismatched"] = 0
+    counts["unhashed"]   = 0
+
+    store.close()
+
+    for seed, program, errors in rows:
+
+        if program is None:
+
+            counts["unhashed"] += 1
+            continue
+
+        source = JF.render(JPG.JasminGenerator(seed))
+
+        if JRS.program_hash(source) != program:
+
+            counts["mismatched"] += 1
+            continue
+
+        issues = validate_source(source)
+
+        if issues is None:
+
+            counts["unparsed"] += 1
+            continue
+
+        predicted        = sorted(set(x.signature for x in issues))
+        reported, failed = jasminc_verdict(json.loads(errors or "[]"))
+
+        for name in SIGNATURES + ["any"]:
+
+            left  = len(predicted) > 0 if name == "any" else name in predicted
+            right = len(reported) > 0 if name == "any" else name in reported
+
+            if left and right:
+
+                counts[name]["both"] += 1
+
+            elif left:
+
+                counts[name]["validator"] += 1
+                counts[name]["failed"]    += int(failed)
+
+            else:
+
+                counts[name]["jasminc" if right else "neither"] += 1
+
+    return counts
+
+
+def print_agreement(counts, file=sys.stdout):
+
+    """
+
+        Agreement counts the programs both reject or both accept, precision the rejected programs jasminc rejects
+        too, recall the programs jasminc rejects that the validator rejects
+
+    """
+
+    print("%-18s %8s %10s %8s %8s %8s %10s %10s %8s" % ("Signature", "Both", "Validator", "Failed", "Jasminc",
+                                                         "Neither", "Agreement", "Precision", "Recall"), file=file)
+
+    for name in SIGNATURES + ["any"]:
+
+        row   = counts[name]
+        total = row["both"] + row["validator"] + row["jasminc"] + row["neither"]
+
+        print("%-18s %8d %10d %8d %8d %8d %9.2f%% %9.2f%% %7.2f%%" % (
+            name, row["both"], row["validator"], row["failed"], row["jasminc"], row["neither"],
+            100 * (row["both"] + row["neither"]) / max(total, 1),
+            100 * row["both"] / max(row["both"] + row["validator"], 1),
+            100 * row["both"] / max(row["both"] + row["jasminc"], 1)), file=file)
+
+    print("UNPARSED:", counts["unparsed"], "MISMATCHED (skipped):", counts["mismatched"], "UNHASHED (skipped):",
+          counts["unhashed"], file=file)
+
+
+def read_program(argument):
+
+    if argument.isdigit():
+
+        import jasminFuzzer as JF
+        import jasminGenerator as JPG
+
+        return JF.render(JPG.JasminGenerator(int(argument)))
+
+    with open(argument, "r") as file:
+
+        return file.read()
+
+
+def main():
+
+    if len(sys.argv) < 3:
+
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == "check":
+
+        for argument in sys.argv[2:]:
+
+            issues = validate_source(read_program(argument))
+
+            if issues is None:
+
+                print(argument, ": NOT PARSED")
+                continue
+
+            print(argument, ":", "OK" if len(issues) == 0 else "")
+
+            for issue in issues:
+
+                print("   ", error_line(issue), "(repairable)" if issue.repair is not None else "")
+
+    elif command == "repair":
+
+        print(repair_source(read_program(sys.argv[2])))
+
+    elif command == "agreement":
+
+        limit = None
+
+        if "--limit" in sys.argv:
+
+            limit = int(sys.argv[sys.argv.index("--limit") + 1])
+
+        print_agreement(agreement(sys.argv[2], limit))
+
+    else:
+
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
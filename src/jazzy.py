@@ -0,0 +1,220 @@
+"""
+
+    One entry point for the tools, with the paths from jasminConfig.
+
+    Every subcommand imports the modules it needs when it runs, so generating a program does not pay for pandas,
+    the result store or the compiler harness. NumPy cannot be skipped, the random stream of the generator is
+    np.random. A driver that generates many programs should use generate --serve, which starts once and then
+    answers one seed per line.
+
+
+    Usage:
+
+        python jazzy.py [--config <jazzy.json>] <subcommand> ...
+
+        generate <seed> ... [--terminating] [--swarm] [--split] [--distributions <config.json>] [--out <dir>]
+
+            - print the programs of the seeds, or write them to <dir>/<seed>.jazz
+
+        generate --serve [--terminating] [--swarm] [--split] [--distributions <config.json>]
+
+            - read seeds from stdin, one per line, and answer each with its program followed by a line "// END <seed>",
+              a line that is not a seed is answered with "// ERROR not a seed: <line>" and its END line
+
+        fuzz <seed> | <start> <end> [--terminating] [--adaptive] [--swarm] [--split] [--schedule <budget>]
+             [--distributions <config.json>] [--pipeline <generators> <compilers>] [--policy <policy>]
+
+            - the dry run / campaign of jasminFuzzer
+
+        diff <matrix.json> <start> <end> [--workers N] [--cache <differential.sqlite>]
+
+            - compile the programs with every cell of a jasminDifferential matrix and report the disagreements
+
+        regress <builds.json> <start> <end> [--corpus <archive>] [--baseline <name>] [--top N] [--workers N]
+                [--store <regression.sqlite>] [--terminating] [--diff <seed>]
+
+            - compare the assembly of the builds of a matrix with jasminRegression and report the largest regressions
+
+        time <start> <end> [--terminating]
+
+            - the timing runs of time_measuring/jasminTimemeasure over the secure programs
+
+        cost (<start> <end> [--terminating] | <jazz.s> ... [--entry <function>])
+
+            - the static jasminCost estimate and constant time findings of the compiled programs, without running them
+
+        reduce (<seed> | <program.jazz>) [--target <class>] [--workers N] [--hang]
+
+            - reduce a program with jasminReducer and the configured backend
+
+        config
+
+            - print the configuration in use
+
+"""
+
+import json
+import os
+import sys
+
+import jasminConfig as JCF
+
+
+def generator_options(args):
+
+    options = {}
+
+    for flag in ["terminating", "swarm", "split"]:
+
+        if "--" + flag in args:
+
+            args.remove("--" + flag)
+            options[flag] = True
+
+    if "--distributions" in args:
+
+        import jasminDistribution as JD
+
+        options["distribution_config"] = JD.load_config(args[args.index("--distributions") + 1])
+        del args[args.index("--distributions"):args.index("--distributions") + 2]
+
+    return options
+
+
+def generate(args, config):
+
+    import jasminGenerator as JPG
+    import jasminPrettyPrint as JPP
+
+    options = generator_options(args)
+    out_dir = None
+
+    def program(seed):
+
+        return JPP.jasmin_pretty_print("".join(str(x) for x in JPG.JasminGenerator(seed, **options).get_program()))
+
+    if "--out" in args:
+
+        out_dir = args[args.index("--out") + 1]
+        del args[args.index("--out"):args.index("--out") + 2]
+        os.makedirs(out_dir, exist_ok=True)
+
+    if "--serve" in args:
+
+        for line in sys.stdin:
+
+            if line.strip() == "":
+
+                continue
+
+            try:
+
+                seed = int(line)
+
+            except ValueError:
+
+                # A bad line must not stop the server, the driver still gets an END line for it
+                sys.stdout.write("// ERROR not a seed: " + line.strip() + "\n// END " + line.strip() + "\n")
+                sys.stdout.flush()
+
+                continue
+
+            sys.stdout.write(program(seed) + "\n// END " + line.strip() + "\n")
+            sys.stdout.flush()
+
+        return
+
+    for seed in args:
+
+        if out_dir is None:
+
+            print(program(int(seed)))
+
+        else:
+
+            with open(os.path.join(out_dir, seed + ".jazz"), "w") as file:
+                file.write(program(int(seed)))
+
+
+def fuzz(args, config):
+
+    import jasminFuzzer as JF
+
+    sys.argv = [JF.__file__] + args
+    JF.main(config)
+
+
+def differential(args, config):
+
+    import jasminDifferential as JDF
+
+    sys.argv = [JDF.__file__] + args
+    JDF.main(config)
+
+
+def regression(args, config):
+
+    import jasminRegression as JRG
+
+    sys.argv = [JRG.__file__] + args
+    JRG.main(config)
+
+
+def time_measure(args, config):
+
+    directory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "time_measuring")
+
+    sys.path.insert(1, directory)
+
+    import jasminTimemeasure as JTM
+
+    sys.argv = [JTM.__file__] + args
+    JTM.main(config)
+
+
+def cost(args, config):
+
+    import jasminCost as JCO
+
+    sys.argv = [JCO.__file__] + args
+    JCO.main(config)
+
+
+def reduce(args, config):
+
+    import jasminBackend as JBE
+    import jasminReducer as JR
+
+    sys.argv = [JR.__file__] + args
+    JR.main(JBE.from_config(config))
+
+
+def show_config(args, config):
+
+    print(json.dumps(config, indent=4))
+
+
+SUBCOMMANDS = {"generate": generate, "fuzz": fuzz, "diff": differential, "regress": regression,
+               "time": time_measure, "cost": cost, "reduce": reduce, "config": show_config}
+
+
+def main():
+
+    args        = sys.argv[1:]
+    config_path = None
+
+    if "--config" in args:
+
+        config_path = args[args.index("--config") + 1]
+        del args[args.index("--config"):args.index("--config") + 2]
+
+    if len(args) == 0 or args[0] not in SUBCOMMANDS:
+
+        print(__doc__)
+        sys.exit(1)
+
+    SUBCOMMANDS[args[0]](args[1:], JCF.load(config_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+
+// Batched harness, calls the exported Jasmin function once for every input in a single process
+//
+// KØR MED gcc -O2 -DJAZZ_FN=f0 -o test jazz.s batch_main.c
+//
+// ./test [inputs.bin|-] [results.bin|-] [chunk]
+//
+// Inputs are read as packed native-endian int64_t values from the input file (stdin when it is missing or "-"),
+// the results are written packed the same way to the result file (stdout when it is missing or "-").
+// Results are flushed per chunk of inputs (at most and by default 4096), so a timeout kill keeps the results of the
+// chunks that were flushed before the hanging input and loses the rest of its chunk. A run with a timeout passes
+// chunk 1, then every result computed before the hanging input survives.
+
+#include <stdlib.h>
+#include <inttypes.h>
+#include <stdio.h>
+#include <string.h>
+
+#ifndef JAZZ_FN
+#define JAZZ_FN f0
+#endif
+
+#define CHUNK 4096
+
+extern int64_t JAZZ_FN(int64_t p);
+
+static FILE * open_stream(int argc, char ** argv, int index, const char * mode, FILE * fallback)
+{
+FILE * stream;
+
+if (argc <= index || strcmp(argv[index], "-") == 0)
+{
+return fallback;
+}
+
+stream = fopen(argv[index], mode);
+
+if (stream == NULL)
+{
+perror(argv[index]);
+exit(2);
+}
+
+return stream;
+}
+
+int main(int argc, char ** argv)
+{
+static int64_t inputs[CHUNK];
+static int64_t results[CHUNK];
+FILE * in;
+FILE * out;
+size_t count;
+size_t chunk;
+size_t i;
+
+in    = open_stream(argc, argv, 1, "rb", stdin);
+out   = open_stream(argc, argv, 2, "wb", stdout);
+chunk = argc > 3 ? strtoul(argv[3], NULL, 10) : CHUNK;
+
+if (chunk == 0 || chunk > CHUNK)
+{
+chunk = CHUNK;
+}
+
+while ((count = fread(inputs, sizeof(int64_t), chunk, in)) > 0)
+{
+for (i = 0; i < count; i++)
+{
+results[i] = JAZZ_FN(inputs[i]);
+}
+
+if (fwrite(results, sizeof(int64_t), count, out) != count)
+{
+perror("fwrite");
+return 2;
+}
+
+fflush(out);
+}
+
+if (ferror(in))
+{
+perror("fread");
+return 2;
+}
+
+fclose(out);
+return 0;
+}
@@ -5,9 +5,13 @@ import sys
 import os
 DIR_PATH = os.path.dirname(os.path.realpath(__file__))
 sys.path.insert(1, f'{DIR_PATH}/..')
+import jasminConfig as JCF
 import jasminGenerator as JPG
 import jasminPrettyPrint as JPP
+import jasminScratch as JSC
+import jasminStore as JRS
 import pickle
+import shutil
 
 import signal
 from contextlib import contextmanager
@@ -27,11 +31,15 @@ from contextlib import contextmanager
 
 class JasminTimeMeasurer:
 
-    def __init__(self, jasmin_file, main_c_file):
+    def __init__(self, jasmin_file, main_c_file, compiler_path=None, work_dir="."):
 
         self.jasmin_file = jasmin_file
         self.jasmin_func_name = None
         self.main_c_file = main_c_file
+        self.compiler_path = JCF.load()["compiler_path"] if compiler_path is None else compiler_path
+        # The assembly and the binary are written to work_dir
+        self.assembly_file = os.path.join(work_dir, "jazz.s")
+        self.binary_file = os.path.join(work_dir, "test")
 
     def get_jasmin_func_name(self):
 
@@ -79,9 +87,8 @@ class JasminTimeMeasurer:
         writing_file.close()
 
     def compile_jasmin(self):
-        compiler_path = "/home/josefgharib/Desktop/Uni Projects/jasmin/compiler/./jasminc" #"/Users/thorjakobsen/GIT/jasmin/compiler/./jasminc"
 
-        process = subprocess.Popen([compiler_path, self.jasmin_file, "-o", "jazz.s"],
+        process = subprocess.Popen([self.compiler_path, self.jasmin_file, "-o", self.assembly_file],
                                    stdout=subprocess.PIPE,
                                    stderr=subprocess.PIPE)
         _, stderr = process.communicate()
@@ -90,7 +97,7 @@ class JasminTimeMeasurer:
 
     def compile_main_c(self):
 
-        process = subprocess.Popen(["gcc", "-o", "test", "jazz.s", "main.c"],
+        process = subprocess.Popen(["gcc", "-o", self.binary_file, self.assembly_file, self.main_c_file],
                                    stdout=subprocess.PIPE,
                                    stderr=subprocess.PIPE)
         _, stderr = process.communicate()
@@ -99,7 +106,7 @@ class JasminTimeMeasurer:
 
     def run_main_c(self):
 
-        process = subprocess.Popen(["./test"], stdout=subprocess.PIPE)
+        process = subprocess.Popen([os.path.abspath(self.binary_file)], stdout=subprocess.PIPE)
         start = time.time()
         time_start = time.time()
         result = [None] * 7
@@ -164,13 +171,27 @@ def timeout(time, seed):
         signal.signal(signal.SIGALRM, signal.SIG_IGN)
 def raise_timeout(signum, frame):
     raise TimeoutError
-def main():
+def number(value, kind=float):
+    # A run that was stopped early has no Fastest/Slowest
+    return None if value is None else kind(value)
+def main(config=None):
+    config = JCF.load() if config is None else config
+    # --terminating bounds the while loops, the programs are then no longer the safety checked programs of the
+    # seed list, only the same seeds
+    terminating = "--terminating" in sys.argv
+    if terminating:
+        sys.argv.remove("--terminating")
     start = sys.argv[1]
     end   = sys.argv[2]
 
     result_outputs = pd.DataFrame(columns=["Seed", "Time", "Fastest", "Slowest", "F_input", "S_input", "Total_running_time"])
     next = 0
-    list_of_secure_programs = pickle.load(open(f"{DIR_PATH}/../../evaluation/list_of_secure_programs.p", "rb" ) )
+    store    = JRS.ResultStore(config["data_path"] + "results.sqlite")
+    campaign = "time_measure_results_" + start + "_" + end
+    scratch  = JSC.ScratchSpace(config["scratch_path"])
+    main_c   = scratch.path("main.c")
+    shutil.copy(f"{DIR_PATH}/main.c", main_c)
+    list_of_secure_programs = pickle.load(open(config["evaluation_path"] + "list_of_secure_programs.p", "rb" ) )
     #nonterminating_seeds = [30068,30179,31542,33216]
 
     for i in range(int(start), int(end)):
@@ -179,17 +200,15 @@ def main():
         with timeout(15,program_seed):
             print(program_seed)
 
-            program_generator = JPG.JasminGenerator(program_seed)
+            program_generator = JPG.JasminGenerator(program_seed, terminating=terminating)
             out = program_generator.get_program()
             out = [str(x) for x in out]
             out = "".join(out)
             out = JPP.jasmin_pretty_print(out)
 
-            with open(f"{DIR_PATH}/test.jazz", "w") as file:
-                file.write(out)
-                file.close()
+            jasmin_file = scratch.write("test.jazz", out)
 
-            jasmin_t = JasminTimeMeasurer("test.jazz", "main.c")
+            jasmin_t = JasminTimeMeasurer(jasmin_file, main_c, config["compiler_path"], scratch.worker_directory())
             jasmin_t.get_jasmin_func_name()
             jasmin_t.change_name_in_main()
             jasmin_t.compile_jasmin()
@@ -197,18 +216,27 @@ def main():
             result = jasmin_t.run_main_c()
 
             result[0] = list_of_secure_programs[i]
-            result[1] = float(result[3]) - float(result[2])
+            # A run that was stopped early has no spread
+            result[1] = None if None in result[2:4] else number(result[3]) - number(result[2])
 
             result_outputs.loc[next] = result
             next += 1
 
+            store.add_timing(result[0], result[1], number(result[2]), number(result[3]), number(result[4], int),
+                             number(result[5], int), result[6], campaign=campaign)
+
             print(next, "DONE")
 
     global nonterminating_seeds
     # Quick and dirty - last row will be multiple arrays of the samenon-terminating seeds.
     result_outputs.loc[next] = str(nonterminating_seeds)
     print(nonterminating_seeds)
-    result_outputs.to_csv(f"{DIR_PATH}/../../evaluation/data/time_measure_results_" + start + "_" + end + ".csv")
+    result_outputs.to_csv(config["data_path"] + campaign + ".csv")
+
+    for seed in nonterminating_seeds:
+        store.add_timing(seed, None, None, None, None, None, None, timed_out=True, campaign=campaign)
+    store.close()
+    scratch.close()
 
 
 if __name__ == '__main__':